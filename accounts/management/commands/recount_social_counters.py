@@ -0,0 +1,71 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from accounts.models import CustomUser
+
+
+def _connection_counts(Connection):
+    """Accepted connections per user, whichever side sent the request"""
+    accepted = Connection.objects.filter(status='accepted')
+    counts = Counter(dict(accepted.values_list('sender').annotate(n=Count('id')).order_by()))
+    counts.update(dict(accepted.values_list('receiver').annotate(n=Count('id')).order_by()))
+    return counts
+
+
+class Command(BaseCommand):
+    """Repair drift in the denormalized followers/following/posts/connections counters"""
+
+    help = 'Recount followers_count, following_count, posts_count and connections_count for all students'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users written per bulk UPDATE',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted users without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        from social.models import Connection, Follow, Post
+
+        # One grouped aggregate per counter
+        actual = {
+            'followers_count': dict(
+                Follow.objects.values_list('following').annotate(n=Count('id')).order_by()
+            ),
+            'following_count': dict(
+                Follow.objects.values_list('follower').annotate(n=Count('id')).order_by()
+            ),
+            'posts_count': dict(
+                Post.objects.values_list('author').annotate(n=Count('id')).order_by()
+            ),
+            'connections_count': _connection_counts(Connection),
+        }
+        fields = list(CustomUser.SOCIAL_COUNTER_FIELDS)
+
+        drifted = []
+        for row in CustomUser.objects.values('pk', *fields).iterator():
+            changes = {}
+            for field in fields:
+                expected = actual[field].get(row['pk'], 0)
+                if row[field] != expected:
+                    changes[field] = expected
+            if changes:
+                drifted.append(CustomUser(**{**row, **changes}))
+
+        if drifted and not options['dry_run']:
+            with transaction.atomic():
+                CustomUser.objects.bulk_update(
+                    drifted, fields, batch_size=options['batch_size']
+                )
+
+        verb = 'Would repair' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} counters for {len(drifted)} user(s)'))
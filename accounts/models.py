@@ -1,8 +1,13 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.core.validators import RegexValidator
+from django.utils import timezone
 import re
 
+from .signals import social_counters_adjusted
+
 
 class CustomUser(AbstractUser):
     """Custom user model for Green University students"""
@@ -86,6 +91,7 @@ class CustomUser(AbstractUser):
     
     is_verified = models.BooleanField(default=False, help_text="Email verification status")
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Variant files (uploads.images.record_variants)
     bio = models.TextField(max_length=500, blank=True)
     
     # LinkedIn-like professional fields
@@ -104,9 +110,16 @@ class CustomUser(AbstractUser):
     followers_count = models.PositiveIntegerField(default=0)
     following_count = models.PositiveIntegerField(default=0)
     posts_count = models.PositiveIntegerField(default=0)
+    connections_count = models.PositiveIntegerField(default=0)  # Accepted social.Connection rows
     
     date_joined = models.DateTimeField(auto_now_add=True)
     last_active = models.DateTimeField(auto_now=True)
+    # Bumped by every write, targeted saves and counter UPDATEs included;
+    # other processes poll it for changes (search.autocomplete)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    # Denormalized counters maintained by adjust_social_counters()
+    SOCIAL_COUNTER_FIELDS = ('followers_count', 'following_count', 'posts_count', 'connections_count')
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'student_id', 'department', 'batch']
@@ -117,16 +130,48 @@ class CustomUser(AbstractUser):
         verbose_name_plural = 'Green University Students'
     
     def save(self, *args, **kwargs):
-        # Auto-generate username from student ID if not provided
-        if not self.username:
-            self.username = self.student_id
+        from uploads.images import pending_images, process_images
+        new_images = pending_images(self, 'profile_picture')
         
-        # Ensure email matches student ID
-        if self.student_id and not self.email.startswith(self.student_id):
-            if not self.email:
-                self.email = f"{self.student_id}@student.green.ac.bd"
+        # Targeted saves (update_fields) skip the identity fix-ups below
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'username', 'email'} & set(update_fields):
+            # Auto-generate username from student ID if not provided
+            if not self.username:
+                self.username = self.student_id
+            
+            # Ensure email matches student ID
+            if self.student_id and not self.email.startswith(self.student_id):
+                if not self.email:
+                    self.email = f"{self.student_id}@student.green.ac.bd"
         
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
         super().save(*args, **kwargs)
+        process_images(self, new_images)
+    
+    def adjust_social_counters(self, refresh=True, **deltas):
+        """Atomically apply deltas to the denormalized social counters
+        
+        Issues a single UPDATE with F() expressions so concurrent follows
+        and posts never lose increments. Decrements are clamped at zero.
+        """
+        updates = {}
+        for field, delta in deltas.items():
+            if field not in self.SOCIAL_COUNTER_FIELDS:
+                raise ValueError(f"{field} is not a social counter")
+            if delta > 0:
+                updates[field] = F(field) + delta
+            elif delta < 0:
+                updates[field] = Greatest(F(field) + delta, 0)
+        
+        if not updates:
+            return
+        
+        type(self).objects.filter(pk=self.pk).update(updated_at=timezone.now(), **updates)
+        social_counters_adjusted.send(sender=type(self), instance=self)
+        if refresh:
+            self.refresh_from_db(fields=list(updates))
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.student_id})"
@@ -135,10 +180,11 @@ class CustomUser(AbstractUser):
     def get_display_name(self):
         return self.get_full_name() or self.username
     
-    @property
-    def get_profile_picture(self):
+    def get_profile_picture(self, size='avatar'):
+        """URL of the profile picture variant ('avatar', 'card' or 'full')"""
         if self.profile_picture:
-            return self.profile_picture.url
+            from uploads.images import variant_url
+            return variant_url(self.profile_picture, size)
         return '/static/images/default-avatar.svg'
 
 
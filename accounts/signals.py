@@ -0,0 +1,9 @@
+"""
+Signals sent by the accounts app
+"""
+
+from django.dispatch import Signal
+
+# Sent with the user as instance after adjust_social_counters() has run its
+# UPDATE, which bypasses post_save
+social_counters_adjusted = Signal()
@@ -0,0 +1,67 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from social.models import Follow, Post
+
+from .models import CustomUser
+
+
+def make_student(n):
+    student_id = str(222000000 + n)
+    return CustomUser.objects.create_user(
+        username=student_id,
+        email=f'{student_id}@student.green.ac.bd',
+        password='campus-pass-123',
+        student_id=student_id,
+        department='CSE',
+        batch='Fall 2023',
+    )
+
+
+class SocialCounterTests(TestCase):
+    def setUp(self):
+        self.student = make_student(1)
+
+    def test_increment_and_decrement(self):
+        self.student.adjust_social_counters(followers_count=3, posts_count=1)
+        self.student.adjust_social_counters(followers_count=-1)
+        self.assertEqual((self.student.followers_count, self.student.posts_count), (2, 1))
+
+    def test_decrement_floors_at_zero(self):
+        self.student.adjust_social_counters(followers_count=1)
+        self.student.adjust_social_counters(followers_count=-5, following_count=-1)
+        self.student.refresh_from_db()
+        self.assertEqual((self.student.followers_count, self.student.following_count), (0, 0))
+
+    def test_unknown_counter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.student.adjust_social_counters(likes_count=1)
+
+
+class RecountSocialCountersTests(TestCase):
+    def setUp(self):
+        self.student = make_student(1)
+        self.friend = make_student(2)
+        Follow.objects.create(follower=self.friend, following=self.student)
+        Post.objects.create(author=self.student, content='First post')
+        CustomUser.objects.filter(pk=self.student.pk).update(followers_count=7, posts_count=0)
+
+    def recount(self, *args):
+        out = io.StringIO()
+        call_command('recount_social_counters', *args, stdout=out)
+        return out.getvalue()
+
+    def test_repairs_drift(self):
+        self.assertIn('Repaired counters for 2 user(s)', self.recount())
+        self.student.refresh_from_db()
+        self.friend.refresh_from_db()
+        self.assertEqual((self.student.followers_count, self.student.posts_count), (1, 1))
+        self.assertEqual(self.friend.following_count, 1)
+        self.assertIn('Repaired counters for 0 user(s)', self.recount())
+
+    def test_dry_run_writes_nothing(self):
+        self.assertIn('Would repair counters for 2 user(s)', self.recount('--dry-run'))
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.followers_count, 7)
@@ -75,10 +75,10 @@ def verify_email(request, user_id, code):
         
         user.is_active = True
         user.is_verified = True
-        user.save()
+        user.save(update_fields=['is_active', 'is_verified'])
         
         verification.is_used = True
-        verification.save()
+        verification.save(update_fields=['is_used'])
         
         messages.success(request, 'Email verified successfully! You can now login.')
         return redirect('accounts:login')
@@ -93,11 +93,15 @@ def profile_setup(request):
     """Complete profile setup after registration"""
     if request.method == 'POST':
         user = request.user
+        update_fields = []
         if 'profile_picture' in request.FILES:
             user.profile_picture = request.FILES['profile_picture']
+            update_fields.append('profile_picture')
         if 'bio' in request.POST:
             user.bio = request.POST['bio']
-        user.save()
+            update_fields.append('bio')
+        if update_fields:
+            user.save(update_fields=update_fields)
         
         messages.success(request, 'Profile updated successfully!')
         return redirect('profiles:dashboard')
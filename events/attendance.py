@@ -0,0 +1,125 @@
+"""
+RSVP writes for social.Event
+
+Every change to an EventAttendance row goes through here so the event's
+per-status counters (going_count, maybe_count...) stay in step with it. The
+counters are adjusted with a single conditional UPDATE, never by reading,
+incrementing and saving the Event.
+
+Capacity is enforced the same way: a seat is claimed with
+
+    UPDATE event SET going_count = going_count + 1
+    WHERE id = %s AND going_count < max_attendees
+
+which the database applies atomically, so concurrent RSVPs can never push
+going_count past max_attendees. Whoever does not get a seat is waitlisted,
+and the oldest waitlisted student is promoted when a seat frees up.
+"""
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from social.models import Event, EventAttendance
+from social.notifications import notify_users
+
+
+def _adjust_counters(event_id, deltas):
+    """Apply {status: delta} to the event's counters in one UPDATE"""
+    changes = {}
+    for status, delta in deltas.items():
+        field = EventAttendance.COUNTER_FIELDS.get(status)
+        if field is None or not delta:
+            continue
+        if delta > 0:
+            changes[field] = F(field) + delta
+        else:
+            changes[field] = Greatest(F(field) + delta, 0)
+    if changes:
+        Event.objects.filter(pk=event_id).update(**changes)
+
+
+def _claim_seat(event_id, release=None):
+    """Atomically take a going seat if one is free; returns True on success
+
+    release is the status the attendee is leaving, decremented in the same
+    UPDATE.
+    """
+    changes = {'going_count': F('going_count') + 1}
+    release_field = EventAttendance.COUNTER_FIELDS.get(release)
+    if release_field:
+        changes[release_field] = Greatest(F(release_field) - 1, 0)
+    has_seat = Q(max_attendees__isnull=True) | Q(going_count__lt=F('max_attendees'))
+    return bool(Event.objects.filter(has_seat, pk=event_id).update(**changes))
+
+
+def set_attendance(event, user, status):
+    """Record user's RSVP for event and return the status actually stored
+
+    Asking to go to a full event stores 'waitlisted' instead of 'going'.
+    """
+    if status not in EventAttendance.COUNTER_FIELDS or status == 'waitlisted':
+        raise ValueError(f'Unknown attendance status {status!r}')
+
+    with transaction.atomic():
+        attendance, created = EventAttendance.objects.select_for_update().get_or_create(
+            event=event, user=user, defaults={'status': status}
+        )
+        previous = None if created else attendance.status
+        if previous == status or (previous == 'waitlisted' and status == 'going'):
+            return previous
+
+        if status == 'going':
+            if not _claim_seat(event.pk, release=previous):
+                status = 'waitlisted'
+                _adjust_counters(event.pk, {previous: -1, status: 1})
+        else:
+            _adjust_counters(event.pk, {previous: -1, status: 1})
+
+        if not created or attendance.status != status:
+            attendance.status = status
+            attendance.save(update_fields=['status', 'updated_at'])
+
+        if previous == 'going':
+            promote_waitlist(event)
+    return status
+
+
+def clear_attendance(event, user):
+    """Remove user's RSVP; returns the status it had or None"""
+    with transaction.atomic():
+        attendance = EventAttendance.objects.select_for_update().filter(event=event, user=user).first()
+        if attendance is None:
+            return None
+        attendance.delete()
+        _adjust_counters(event.pk, {attendance.status: -1})
+        if attendance.status == 'going':
+            promote_waitlist(event)
+        return attendance.status
+
+
+def promote_waitlist(event):
+    """Move waitlisted students into free seats, oldest first
+
+    Returns the promoted user ids; each is notified.
+    """
+    promoted = []
+    with transaction.atomic():
+        waiting = (
+            EventAttendance.objects.select_for_update()
+            .filter(event=event, status='waitlisted')
+            .order_by('created_at', 'id')
+        )
+        for attendance in waiting.iterator(chunk_size=50):
+            if not _claim_seat(event.pk, release='waitlisted'):
+                break
+            attendance.status = 'going'
+            attendance.save(update_fields=['status', 'updated_at'])
+            promoted.append(attendance.user_id)
+
+    if promoted:
+        notify_users(
+            promoted, event.organizer_id, 'event',
+            f'A spot opened up: you are now going to {event.title}'[:255],
+        )
+    return promoted
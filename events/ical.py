@@ -0,0 +1,166 @@
+"""
+iCalendar (.ics) feeds of GreenLink events
+
+Calendar apps subscribe to a secret, signed URL and poll it, so every feed
+request first computes a cheap fingerprint (one aggregate query) and answers
+with 304 Not Modified when it matches the client's ETag or Last-Modified.
+Only a changed feed is rendered, streamed event by event from an iterator.
+
+    user feed   events the student is going to
+    group feed  public events hosted by a group
+
+A feed URL works for whoever holds it, so a group feed carries only the
+events anyone may see; members reach the rest through their own feed.
+"""
+
+import hashlib
+from datetime import timezone as dt_timezone
+
+from django.core import signing
+from django.db.models import Count, Max
+from django.urls import reverse
+
+from social.models import Event, EventAttendance
+
+TOKEN_SALT = 'events.calendar-feed'
+
+PRODUCT_ID = '-//Green University//GreenLink//EN'
+
+
+# Tokens
+
+def feed_token(kind, object_id):
+    """Signed token naming a feed; it never expires, so treat the URL as a secret"""
+    return signing.Signer(salt=TOKEN_SALT).sign(f'{kind}.{object_id}')
+
+
+def feed_url(request, kind, object_id):
+    """Absolute webcal:// URL for subscribing to a feed"""
+    url = request.build_absolute_uri(reverse('events:calendar_feed', args=[feed_token(kind, object_id)]))
+    return 'webcal://' + url.split('://', 1)[1]
+
+
+def read_feed_token(token):
+    """Return (kind, object_id) or None for a forged or malformed token"""
+    try:
+        value = signing.Signer(salt=TOKEN_SALT).unsign(token)
+        kind, object_id = value.split('.', 1)
+        return kind, int(object_id)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+# Feed contents and fingerprints
+
+def user_feed_events(user_id):
+    return Event.objects.filter(
+        eventattendance__user_id=user_id, eventattendance__status='going'
+    ).select_related('organizer')
+
+
+def group_feed_events(group_id):
+    return Event.objects.filter(group_id=group_id, is_public=True).select_related('organizer')
+
+
+def user_feed_fingerprint(user_id):
+    """(etag, last_modified) for a user feed from one aggregate query
+
+    The row count catches removed RSVPs, which leave no timestamp behind.
+    """
+    state = EventAttendance.objects.filter(user_id=user_id, status='going').aggregate(
+        count=Count('id'), attendance=Max('updated_at'), event=Max('event__updated_at'),
+    )
+    return _fingerprint('user', user_id, state['count'], state['attendance'], state['event'])
+
+
+def group_feed_fingerprint(group_id):
+    state = Event.objects.filter(group_id=group_id, is_public=True).aggregate(
+        count=Count('id'), event=Max('updated_at'),
+    )
+    return _fingerprint('group', group_id, state['count'], state['event'])
+
+
+def _fingerprint(kind, object_id, count, *timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    last_modified = max(timestamps) if timestamps else None
+    raw = f'{kind}:{object_id}:{count}:' + ':'.join(timestamp.isoformat() for timestamp in timestamps)
+    etag = '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+    return etag, last_modified
+
+
+# Rendering
+
+def _escape(text):
+    return (
+        (text or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _param(text):
+    """A parameter value as an RFC 5545 quoted-string (DQUOTE and controls dropped)
+
+    Quoting lets names contain ':', ';' and ','; backslash escapes do not
+    apply inside parameters.
+    """
+    safe = (char for char in (text or '') if char == '\t' or (char != '"' and ord(char) >= 32 and char != '\x7f'))
+    return '"%s"' % ''.join(safe)
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74  # Continuation lines start with a space
+        # Never split a multi-byte character
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    parts.append(data.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_event(event, host):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@{host}',
+        f'DTSTAMP:{_utc(event.updated_at)}',
+        f'LAST-MODIFIED:{_utc(event.updated_at)}',
+        f'DTSTART:{_utc(event.start_datetime)}',
+        f'DTEND:{_utc(event.end_datetime)}',
+        f'SUMMARY:{_escape(event.title)}',
+        f'LOCATION:{_escape(event.location)}',
+        f'DESCRIPTION:{_escape(event.description)}',
+        f'ORGANIZER;CN={_param(event.organizer.get_display_name)}:mailto:{event.organizer.email}',
+        f'CATEGORIES:{_escape(event.get_event_type_display())}',
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def stream_calendar(events, name, host):
+    """Yield the feed piece by piece; events is a queryset"""
+    yield ''.join(_fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODUCT_ID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+    ])
+    for event in events.order_by('start_datetime', 'id').iterator(chunk_size=200):
+        yield render_event(event, host)
+    yield 'END:VCALENDAR\r\n'
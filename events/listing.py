@@ -0,0 +1,129 @@
+"""
+Read-side queries for the events pages
+
+Listings and the month calendar filter public events on a start_datetime
+range, which the (is_public, start_datetime) index serves directly. Pages
+use keyset pagination on (start_datetime, id) rather than OFFSET, so deep
+pages cost the same as the first. Attendance numbers come from the event's
+denormalized counters; the viewer's own RSVPs are fetched in one extra
+query, so a page or a whole month renders in a fixed number of queries.
+"""
+
+import base64
+import calendar
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from social.models import Event, EventAttendance
+
+PAGE_SIZE = 20
+
+# Multi-day events are picked up by looking back this far before a range
+MAX_EVENT_SPAN = timedelta(days=14)
+
+LISTINGS = {
+    'upcoming': 'Upcoming',
+    'today': 'Today',
+    'week': 'This Week',
+    'past': 'Past Events',
+}
+
+
+def public_events():
+    return Event.objects.filter(is_public=True).select_related('organizer')
+
+
+def listing_queryset(name, now=None):
+    """Return (queryset, newest_first) for one of LISTINGS"""
+    now = now or timezone.now()
+    events = public_events()
+    if name == 'past':
+        return events.filter(start_datetime__lt=now), True
+    if name == 'today':
+        start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        return events.filter(start_datetime__gte=start, start_datetime__lt=start + timedelta(days=1)), False
+    if name == 'week':
+        return events.filter(start_datetime__gte=now, start_datetime__lt=now + timedelta(days=7)), False
+    return events.filter(start_datetime__gte=now), False
+
+
+def encode_cursor(event):
+    raw = f'{event.start_datetime.isoformat()}|{event.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (start_datetime, id) or None for a missing or malformed cursor"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        start, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def events_page(queryset, cursor=None, newest_first=False, page_size=PAGE_SIZE):
+    """One keyset page; returns (events, next_cursor or None)"""
+    position = decode_cursor(cursor)
+    if newest_first:
+        queryset = queryset.order_by('-start_datetime', '-id')
+        if position:
+            start, pk = position
+            queryset = queryset.filter(Q(start_datetime__lt=start) | Q(start_datetime=start, id__lt=pk))
+    else:
+        queryset = queryset.order_by('start_datetime', 'id')
+        if position:
+            start, pk = position
+            queryset = queryset.filter(Q(start_datetime__gt=start) | Q(start_datetime=start, id__gt=pk))
+
+    events = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(events[page_size - 1]) if len(events) > page_size else None
+    return events[:page_size], next_cursor
+
+
+def month_bounds(year, month):
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+def month_events(year, month):
+    """Public events overlapping the month, in start order (one query)"""
+    start, end = month_bounds(year, month)
+    return list(
+        public_events()
+        .filter(start_datetime__gte=start - MAX_EVENT_SPAN, start_datetime__lt=end, end_datetime__gte=start)
+        .order_by('start_datetime', 'id')
+    )
+
+
+def month_grid(year, month, events):
+    """Weeks of (date, [events on that date]) for rendering a calendar"""
+    by_day = {}
+    for event in events:
+        day = timezone.localtime(event.start_datetime).date()
+        last = timezone.localtime(event.end_datetime).date()
+        while day <= last:
+            by_day.setdefault(day, []).append(event)
+            day += timedelta(days=1)
+
+    weeks = calendar.Calendar(firstweekday=calendar.SATURDAY).monthdatescalendar(year, month)
+    return [[(day, by_day.get(day, [])) for day in week] for week in weeks]
+
+
+def attach_viewer_status(events, user):
+    """Set event.viewer_status to the user's RSVP status (or None), one query"""
+    statuses = dict(
+        EventAttendance.objects.filter(user=user, event_id__in=[event.pk for event in events])
+        .values_list('event_id', 'status')
+    )
+    for event in events:
+        event.viewer_status = statuses.get(event.pk)
+    return events
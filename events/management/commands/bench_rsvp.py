@@ -0,0 +1,134 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from events.attendance import set_attendance
+from social.models import Event, EventAttendance
+
+
+class Command(BaseCommand):
+    """Hammer one event with concurrent RSVPs and check capacity held"""
+
+    help = 'Benchmark concurrent event RSVPs against the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--capacity', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument(
+            '--naive',
+            action='store_true',
+            help='Use a check-then-insert RSVP instead, to show it oversubscribing',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        organizer, students = self.create_students(options['students'])
+        now = timezone.now()
+        event = Event.objects.create(
+            title='RSVP benchmark',
+            description='Temporary event created by bench_rsvp',
+            organizer=organizer,
+            location='Nowhere',
+            start_datetime=now + timedelta(days=1),
+            end_datetime=now + timedelta(days=1, hours=2),
+            max_attendees=options['capacity'],
+        )
+        rsvp = self.naive_rsvp if options['naive'] else set_attendance
+        rng = random.Random(options['seed'])
+        rng.shuffle(students)
+        retries = []
+
+        def attend(student):
+            try:
+                for attempt in range(50):
+                    started = time.perf_counter()
+                    try:
+                        status = rsvp(event, student, 'going')
+                        return status, (time.perf_counter() - started) * 1000
+                    except OperationalError:
+                        # SQLite allows one writer at a time: "database is locked"
+                        retries.append(1)
+                        time.sleep(rng.uniform(0.001, 0.01) * (attempt + 1))
+                return 'error', 0.0
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                results = list(pool.map(attend, students))
+            elapsed = time.perf_counter() - started
+
+            event.refresh_from_db()
+            going_rows = EventAttendance.objects.filter(event=event, status='going').count()
+            waitlisted_rows = EventAttendance.objects.filter(event=event, status='waitlisted').count()
+        finally:
+            event.delete()
+            CustomUser.objects.filter(pk__in=[organizer.pk, *[student.pk for student in students]]).delete()
+
+        timings = sorted(ms for status, ms in results if status != 'error')
+        errors = sum(1 for status, _ in results if status == 'error')
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] if timings else 0.0
+
+        self.stdout.write(
+            f'{vendor}: {len(results)} RSVPs from {options["threads"]} threads in {elapsed:.2f} s '
+            f'({len(results) / elapsed:.0f}/s), {len(retries)} lock retries, {errors} gave up'
+        )
+        self.stdout.write(
+            f'latency p50 {percentile(0.50):.1f} ms, p99 {percentile(0.99):.1f} ms, '
+            f'max {timings[-1] if timings else 0:.1f} ms'
+        )
+        self.stdout.write(
+            f'capacity {options["capacity"]}: going_count {event.going_count}, '
+            f'going rows {going_rows}, waitlisted rows {waitlisted_rows}'
+        )
+        if going_rows > options['capacity'] or event.going_count != going_rows:
+            self.stdout.write(self.style.ERROR('Capacity violated'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Capacity held'))
+
+    def create_students(self, count):
+        """Bulk-create throwaway accounts with unused 99xxxxxxx student IDs"""
+        taken = set(CustomUser.objects.filter(student_id__startswith='99').values_list('student_id', flat=True))
+        student_ids = []
+        candidate = 990000000 + random.randint(0, 5000000)
+        while len(student_ids) < count + 1:
+            if str(candidate) not in taken:
+                student_ids.append(str(candidate))
+            candidate += 1
+
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'bench{student_id}',
+                email=f'{student_id}@bench.invalid',
+                student_id=student_id,
+                department='CSE',
+                batch='Benchmark',
+            )
+            for student_id in student_ids
+        ])
+        users = list(CustomUser.objects.filter(student_id__in=student_ids).order_by('student_id'))
+        return users[0], users[1:]
+
+    @staticmethod
+    def naive_rsvp(event, user, status):
+        """Check-then-insert without any locking: the pattern this replaces"""
+        going = EventAttendance.objects.filter(event=event, status='going').count()
+        if going < event.max_attendees:
+            EventAttendance.objects.create(event=event, user=user, status='going')
+            Event.objects.filter(pk=event.pk).update(going_count=F('going_count') + 1)
+            return 'going'
+        EventAttendance.objects.create(event=event, user=user, status='waitlisted')
+        Event.objects.filter(pk=event.pk).update(waitlisted_count=F('waitlisted_count') + 1)
+        return 'waitlisted'
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from social.models import Event, EventAttendance, Group, GroupMembership
+
+from . import ical
+from .attendance import clear_attendance, set_attendance
+
+User = get_user_model()
+
+
+class GroupCalendarFeedTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user(
+            username='222000001', email='222000001@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000001', department='CSE', batch='Fall 2023',
+            first_name='Rahim', last_name='Uddin, PhD: CSE; Lab',
+        )
+        self.group = Group.objects.create(name='Robotics Club', description='Robots', creator=self.organizer)
+        GroupMembership.objects.create(group=self.group, user=self.organizer)
+        start = timezone.now() + timedelta(days=3)
+        self.public_event = self.make_event('Robot demo day', start, is_public=True)
+        self.private_event = self.make_event('Committee meeting', start, is_public=False)
+        self.client.force_login(self.organizer)
+
+    def make_event(self, title, start, is_public):
+        return Event.objects.create(
+            title=title, description='', organizer=self.organizer, group=self.group, location='Lab 3',
+            start_datetime=start, end_datetime=start + timedelta(hours=2), is_public=is_public,
+        )
+
+    def feed(self):
+        response = self.client.get(reverse('social:group_detail', args=[self.group.pk]))
+        url = response.context['calendar_url']
+        self.assertTrue(url.startswith('webcal://'))
+        self.client.logout()  # Calendar apps hold only the URL
+        feed = self.client.get(url.split('testserver', 1)[1])
+        self.assertEqual(feed.status_code, 200)
+        return b''.join(feed.streaming_content).decode()
+
+    def test_group_feed_lists_only_public_events(self):
+        body = self.feed()
+        self.assertIn('SUMMARY:Robot demo day', body)
+        self.assertNotIn('Committee meeting', body)
+
+    def test_organizer_name_is_quoted(self):
+        body = self.feed().replace('\r\n ', '')  # Unfold
+        self.assertIn('ORGANIZER;CN="Rahim Uddin, PhD: CSE; Lab":mailto:222000001@student.green.ac.bd', body)
+
+    def test_user_token_does_not_open_a_group_feed(self):
+        token = ical.feed_token('user', self.organizer.pk)
+        self.assertEqual(ical.read_feed_token(token), ('user', self.organizer.pk))
+        self.assertIsNone(ical.read_feed_token(token.replace('user', 'group', 1)))
+
+
+class CapacityTests(TestCase):
+    def setUp(self):
+        self.students = [
+            User.objects.create_user(
+                username=str(222000000 + n), email=f'{222000000 + n}@student.green.ac.bd',
+                password='campus-pass-123', student_id=str(222000000 + n), department='CSE', batch='Fall 2023',
+            )
+            for n in range(1, 5)
+        ]
+        start = timezone.now() + timedelta(days=3)
+        self.event = Event.objects.create(
+            title='Thesis workshop', description='', organizer=self.students[0], location='Room 402',
+            start_datetime=start, end_datetime=start + timedelta(hours=2), max_attendees=2,
+        )
+
+    def test_full_event_waitlists_the_next_rsvp(self):
+        first, second, third, _ = self.students
+        self.assertEqual(set_attendance(self.event, first, 'going'), 'going')
+        self.assertEqual(set_attendance(self.event, second, 'going'), 'going')
+        # The in-memory event still says 0 going; the UPDATE checks the row
+        self.assertEqual(set_attendance(self.event, third, 'going'), 'waitlisted')
+
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.going_count, self.event.waitlisted_count), (2, 1))
+        self.assertEqual(EventAttendance.objects.filter(event=self.event, status='going').count(), 2)
+
+    def test_freed_seat_goes_to_the_waitlist_without_overbooking(self):
+        first, second, third, fourth = self.students
+        for student in self.students:
+            set_attendance(self.event, student, 'going')
+        self.assertEqual(clear_attendance(self.event, first), 'going')
+
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.going_count, self.event.waitlisted_count), (2, 1))
+        self.assertEqual(EventAttendance.objects.get(event=self.event, user=third).status, 'going')
+        self.assertEqual(EventAttendance.objects.get(event=self.event, user=fourth).status, 'waitlisted')
+        self.assertEqual(set_attendance(self.event, first, 'going'), 'waitlisted')
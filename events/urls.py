@@ -5,4 +5,6 @@ app_name = 'events'
 
 urlpatterns = [
     path('', views.events_list, name='events_list'),
+    path('<int:event_id>/rsvp/', views.rsvp, name='rsvp'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
 ]
@@ -1,7 +1,140 @@
-from django.shortcuts import render
+from datetime import date
+
+from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST, require_safe
+
+from accounts.models import CustomUser
+from social.models import Event, EventAttendance, Group
+from . import ical
+from .attendance import clear_attendance, set_attendance
+from .listing import (
+    LISTINGS, attach_viewer_status, events_page, listing_queryset, month_events, month_grid,
+)
 
 @login_required
 def events_list(request):
     """Display events list for the authenticated user"""
-    return render(request, 'events/events_list.html')
+    if request.GET.get('view') == 'month':
+        return events_month(request)
+    
+    when = request.GET.get('when', 'upcoming')
+    if when not in LISTINGS:
+        when = 'upcoming'
+    queryset, newest_first = listing_queryset(when)
+    events, next_cursor = events_page(queryset, request.GET.get('after'), newest_first)
+    attach_viewer_status(events, request.user)
+    
+    context = {
+        'events': events,
+        'when': when,
+        'listings': LISTINGS,
+        'next_cursor': next_cursor,
+        'now': timezone.now(),
+        'calendar_url': ical.feed_url(request, 'user', request.user.pk),
+    }
+    return render(request, 'events/events_list.html', context)
+
+def events_month(request):
+    """Calendar of one month of public events"""
+    today = timezone.localdate()
+    try:
+        year, month = map(int, request.GET.get('month', '').split('-'))
+        if not 1 <= month <= 12:
+            raise ValueError
+    except ValueError:
+        year, month = today.year, today.month
+    
+    events = attach_viewer_status(month_events(year, month), request.user)
+    previous_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    context = {
+        'weeks': month_grid(year, month, events),
+        'month_start': date(year, month, 1),
+        'previous_month': '%04d-%02d' % previous_month,
+        'next_month': '%04d-%02d' % next_month,
+        'today': today,
+        'listings': LISTINGS,
+        'when': 'month',
+    }
+    return render(request, 'events/events_month.html', context)
+
+@login_required
+@require_POST
+def rsvp(request, event_id):
+    """Set or clear the user's RSVP for an event"""
+    event = get_object_or_404(Event, pk=event_id)
+    status = request.POST.get('status', '')
+    
+    if status == 'clear':
+        clear_attendance(event, request.user)
+        status = None
+    elif status in EventAttendance.COUNTER_FIELDS and status != 'waitlisted':
+        # May come back as 'waitlisted' when the event is full
+        status = set_attendance(event, request.user, status)
+    else:
+        return JsonResponse({'error': 'Invalid status'}, status=400)
+    
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        event.refresh_from_db(fields=list(EventAttendance.COUNTER_FIELDS.values()))
+        return JsonResponse({
+            'status': status,
+            'going_count': event.going_count,
+            'interested_count': event.interested_count,
+            'waitlisted_count': event.waitlisted_count,
+        })
+    if status == 'waitlisted':
+        messages.info(request, 'This event is full. You are on the waitlist and will be notified if a spot opens up.')
+    else:
+        messages.success(request, 'Your RSVP has been updated.')
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('events:events_list')
+
+@require_safe
+def calendar_feed(request, token):
+    """iCalendar feed for calendar apps; authenticated by the signed token"""
+    feed = ical.read_feed_token(token)
+    if feed is None:
+        raise Http404('Unknown calendar feed')
+    kind, object_id = feed
+    
+    if kind == 'user':
+        owner = CustomUser.objects.filter(pk=object_id, is_active=True).only('first_name', 'last_name', 'username').first()
+        if owner is None:
+            raise Http404('Unknown calendar feed')
+        etag, last_modified = ical.user_feed_fingerprint(object_id)
+        name = f'GreenLink: {owner.get_display_name}'
+        events = ical.user_feed_events(object_id)
+    elif kind == 'group':
+        group = Group.objects.filter(pk=object_id).only('name').first()
+        if group is None:
+            raise Http404('Unknown calendar feed')
+        etag, last_modified = ical.group_feed_fingerprint(object_id)
+        name = f'GreenLink: {group.name}'
+        events = ical.group_feed_events(object_id)
+    else:
+        raise Http404('Unknown calendar feed')
+    
+    # Most polls stop here without rendering anything
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified.timestamp() if last_modified else None,
+    )
+    if response is None:
+        response = StreamingHttpResponse(
+            ical.stream_calendar(events, name, request.get_host()),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="greenlink.ics"'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -44,6 +44,9 @@ INSTALLED_APPS = [
     'social',
     'chat',
     'events',
+    'search',
+    'uploads',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -85,6 +88,29 @@ DATABASES = {
     )
 }
 
+# Cache
+# Must be shared by every gunicorn worker and the job worker, otherwise an
+# invalidation only reaches the process that made the change. Uses Redis
+# when REDIS_URL is set (redis-py comes with channels-redis), else a table
+# created by `python manage.py migrate` (social 0018).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'greenlink_cache',
+            # Room for the buffered story views (see settings.py)
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,13 +140,31 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-# Use WhiteNoise for static file serving in production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    # Uploads are stored once per distinct content under media/cas/ (see uploads.storage)
+    'default': {
+        'BACKEND': 'uploads.storage.ContentAddressedStorage',
+    },
+    # Use WhiteNoise for static file serving in production
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# How uploads.serving sends media bytes: 'python', 'nginx' (X-Accel-Redirect)
+# or 'sendfile' (X-Sendfile)
+MEDIA_SERVE_BACKEND = config('MEDIA_SERVE_BACKEND', default='python')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Background jobs (see jobs.queue) are run by `manage.py run_worker`, started
+# next to the web server (Procfile 'worker'). Set JOBS_EAGER=True to run them
+# inline when no worker process can be deployed.
+JOBS_EAGER = config('JOBS_EAGER', default=False, cast=bool)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
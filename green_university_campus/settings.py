@@ -53,6 +53,9 @@ INSTALLED_APPS = [
     'chat',
     'social',
     'events',
+    'search',
+    'uploads',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -115,6 +118,22 @@ DATABASES = {
 # }
 
 
+# Cache
+# Shared by every process (runserver, run_worker, management commands), so
+# profile and group directory invalidations reach all of them. The table is
+# created by a migration (social 0018), i.e. by `python manage.py migrate`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'greenlink_cache',
+        # The default of 300 entries would cull buffered story views and
+        # their counters (social.stories) long before they are flushed
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -160,6 +179,20 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    # Uploads are stored once per distinct content under media/cas/ (see uploads.storage)
+    'default': {
+        'BACKEND': 'uploads.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Background jobs (see jobs.queue) run inline in development so uploads are
+# processed without `manage.py run_worker`; turn this off to test the worker
+JOBS_EAGER = DEBUG
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
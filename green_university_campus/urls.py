@@ -14,11 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
+from uploads.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,9 +31,13 @@ urlpatterns = [
     path('chat/', include('chat.urls')),
     path('social/', include('social.urls')),
     path('events/', include('events.urls')),
+    path('search/', include('search.urls')),
+    path('uploads/', include('uploads.urls')),
+    # Media is served by the app in every environment so private-group
+    # attachments can be access-checked (see uploads.serving and uploads.access)
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
 ]
 
-# Serve media files during development
+# Serve static files during development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+
+def _work(worker_id, batch, poll_interval, once):
+    """Claim-and-run loop executed in each worker process"""
+    import django
+    django.setup()
+    from jobs.queue import (
+        claim_jobs, purge_finished_jobs, requeue_stale_jobs, run_job, schedule_periodic_jobs,
+    )
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    last_sweep = 0.0
+    while not stopping:
+        close_old_connections()
+        if time.monotonic() - last_sweep > 60:
+            requeue_stale_jobs()
+            purge_finished_jobs()
+            schedule_periodic_jobs()
+            last_sweep = time.monotonic()
+
+        jobs = claim_jobs(worker_id, limit=batch)
+        for job in jobs:
+            run_job(job)
+        if not jobs:
+            if once:
+                break
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    """Run background jobs from the database queue"""
+
+    help = 'Start a pool of worker processes that run queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--batch', type=int, default=1, help='Jobs claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        host = socket.gethostname()
+        arguments = (options['batch'], options['poll_interval'], options['once'])
+
+        if options['processes'] <= 1:
+            _work(f'{host}:{os.getpid()}', *arguments)
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+        processes = [
+            context.Process(target=_work, args=(f'{host}:{os.getpid()}-{n}', *arguments))
+            for n in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Started {len(processes)} worker process(es)')
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['task', 'created_at'], name='jobs_job_task_f28bbf_idx'),
+        ),
+    ]
@@ -0,0 +1,179 @@
+"""
+A small database-backed job queue
+
+Tasks are plain functions registered with @task and enqueued by name with
+JSON-serializable arguments. Workers started with `manage.py run_worker`
+claim queued rows, run them and record the outcome; no external broker is
+involved. With JOBS_EAGER = True (the development default) tasks run inline
+once the enqueuing transaction commits, so nothing waits on a worker.
+
+Tasks registered with @task(every=...) are periodic: each worker's sweep
+queues them again once their interval has passed since the last run was
+queued (schedule_periodic_jobs). Two workers sweeping at the same moment can
+both queue one, so periodic tasks must be safe to run twice.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+# Periodic task name -> interval between runs
+PERIODIC = {}
+
+# A running job whose lock is older than this is assumed to belong to a dead
+# worker and is put back in the queue.
+STALE_AFTER = timedelta(minutes=10)
+
+
+def task(name=None, max_attempts=3, on_failure=None, every=None):
+    """Register a function as a background task
+
+    on_failure is called with the task's arguments once every attempt has
+    failed, e.g. to flag the affected row. every (a timedelta) makes the
+    task periodic; periodic tasks take no arguments.
+    """
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        func.on_failure = on_failure
+        TASKS[func.task_name] = func
+        if every is not None:
+            PERIODIC[func.task_name] = every
+        return func
+    return decorator
+
+
+def enqueue(func_or_name, *args, delay=None, **kwargs):
+    """Queue a task; returns the Job, or None when it ran eagerly"""
+    name = getattr(func_or_name, 'task_name', func_or_name)
+    if name not in TASKS:
+        raise KeyError(f"Unknown task '{name}'")
+
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: _run_eagerly(name, args, kwargs))
+        return None
+
+    return _create_job(name, args, kwargs, delay)
+
+
+def _create_job(name, args=(), kwargs=None, delay=None):
+    return Job.objects.create(
+        task=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        max_attempts=getattr(TASKS[name], 'max_attempts', 3),
+        run_after=timezone.now() + (delay or timedelta()),
+    )
+
+
+def _run_eagerly(name, args, kwargs):
+    """Run a task inline; a failure is logged and handed to on_failure like a worker would"""
+    func = TASKS[name]
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Eager job %s failed', name)
+        on_failure = getattr(func, 'on_failure', None)
+        if on_failure is not None:
+            on_failure(*args, **kwargs)
+
+
+def schedule_periodic_jobs(now=None):
+    """Queue every periodic task that is due; returns the new Jobs
+
+    A task is due when it is neither queued nor running and its last run
+    was queued at least its interval ago. Periodic jobs always go through
+    the queue, JOBS_EAGER or not, since only a worker calls this.
+    """
+    now = now or timezone.now()
+    queued = []
+    for name, every in PERIODIC.items():
+        pending = Job.objects.filter(task=name).filter(
+            Q(status__in=['queued', 'running']) | Q(created_at__gt=now - every)
+        )
+        if not pending.exists():
+            queued.append(_create_job(name))
+    return queued
+
+
+def claim_jobs(worker_id, limit=1):
+    """Atomically lock up to limit due jobs for this worker"""
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(
+                status='running', locked_by=worker_id, locked_at=now
+            )
+        return list(Job.objects.filter(id__in=ids))
+
+    # SQLite: race on a conditional UPDATE, the loser simply gets 0 rows
+    claimed = []
+    for job_id in due.values_list('id', flat=True)[:limit * 4]:
+        won = Job.objects.filter(id=job_id, status='queued').update(
+            status='running', locked_by=worker_id, locked_at=now
+        )
+        if won:
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    return list(Job.objects.filter(id__in=claimed))
+
+
+def run_job(job):
+    """Run a claimed job and record success, retry or failure"""
+    job.attempts += 1
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise KeyError(f"Unknown task '{job.task}'")
+        func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.task, job.attempts)
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            # Exponential backoff: 30s, 2m, 8m...
+            job.run_after = timezone.now() + timedelta(seconds=30 * 4 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            on_failure = getattr(func, 'on_failure', None)
+            if on_failure is not None:
+                on_failure(*job.args, **job.kwargs)
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.last_error = ''
+
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=[
+        'status', 'attempts', 'run_after', 'locked_by', 'locked_at', 'last_error', 'finished_at',
+    ])
+    return job.status
+
+
+def requeue_stale_jobs():
+    cutoff = timezone.now() - STALE_AFTER
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued', locked_by='', locked_at=None
+    )
+
+
+def purge_finished_jobs(older_than=timedelta(days=7)):
+    cutoff = timezone.now() - older_than
+    return Job.objects.filter(status='done', finished_at__lt=cutoff).delete()[0]
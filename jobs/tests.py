@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import PERIODIC, claim_jobs, run_job, schedule_periodic_jobs
+
+
+class PeriodicJobTests(TestCase):
+    def test_maintenance_tasks_are_periodic(self):
+        self.assertIn('social.refresh_trending', PERIODIC)
+        self.assertIn('social.purge_expired_stories', PERIODIC)
+        self.assertIn('social.flush_story_views', PERIODIC)
+
+    def test_each_task_is_queued_once_per_interval(self):
+        queued = schedule_periodic_jobs()
+        self.assertEqual(sorted(job.task for job in queued), sorted(PERIODIC))
+        self.assertEqual(schedule_periodic_jobs(), [])  # Still queued
+
+        for job in claim_jobs('test-worker', limit=len(PERIODIC)):
+            self.assertEqual(run_job(job), 'done')
+        self.assertEqual(schedule_periodic_jobs(), [])  # Ran moments ago
+
+        later = timezone.now() + max(PERIODIC.values()) + timedelta(seconds=1)
+        self.assertEqual(len(schedule_periodic_jobs(now=later)), len(PERIODIC))
+        self.assertEqual(Job.objects.filter(status='queued').count(), len(PERIODIC))
@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from accounts.models import CustomUser
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from social.profiles import load_profile
 
 @login_required
 def dashboard(request):
@@ -11,9 +13,13 @@ def dashboard(request):
 @login_required  
 def profile_detail(request, pk):
     """View student profile"""
-    user = CustomUser.objects.get(pk=pk)
+    profile = load_profile(pk)
+    if profile is None:
+        raise Http404('No such student')
+    # The email is left out of the shared cache
+    email = get_user_model().objects.filter(pk=pk).values_list('email', flat=True).first()
     return render(request, 'profiles/profile_detail.html', {
-        'profile_user': user,
+        'profile_user': dict(profile['user'], email=email),
         'university_name': 'Green University of Bangladesh'
     })
 
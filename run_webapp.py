@@ -192,7 +192,7 @@ ALLOWED_HOSTS=localhost,127.0.0.1
             subprocess.run([self.python_exe, 'manage.py', 'makemigrations'], 
                          check=True, capture_output=True, text=True, cwd=self.project_dir)
             
-            # Apply migrations
+            # Apply migrations (this also creates the shared cache table)
             subprocess.run([self.python_exe, 'manage.py', 'migrate'], 
                          check=True, capture_output=True, text=True, cwd=self.project_dir)
             
@@ -247,6 +247,9 @@ ALLOWED_HOSTS=localhost,127.0.0.1
         except:
             pass
             
+        # Background jobs (media processing, trending refresh) run in a worker
+        # next to the web server; with JOBS_EAGER on it simply finds nothing to do
+        worker = self.start_worker()
         try:
             subprocess.run([self.python_exe, 'manage.py', 'runserver'], 
                          cwd=self.project_dir)
@@ -254,6 +257,19 @@ ALLOWED_HOSTS=localhost,127.0.0.1
             print(f"\n\n{Colors.GREEN}👋 GreenLink server stopped. Thanks for using GreenLink!{Colors.END}")
         except subprocess.CalledProcessError as e:
             self.print_error(f"Server failed to start: {e}")
+        finally:
+            if worker is not None:
+                worker.terminate()
+                worker.wait()
+            
+    def start_worker(self):
+        """Start the background job worker; returns the process or None"""
+        try:
+            return subprocess.Popen([self.python_exe, 'manage.py', 'run_worker', '--processes', '1'],
+                                    cwd=self.project_dir)
+        except OSError as e:
+            self.print_warning(f"Background worker failed to start: {e}")
+            return None
             
     def run(self):
         """Main execution method"""
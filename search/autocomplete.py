@@ -0,0 +1,185 @@
+"""
+In-memory prefix index for @mention and tagging autocomplete
+
+Each process keeps a sorted array of (key, user_id) pairs where the keys are
+the lower-cased words of a student's name, their username and their 9-digit
+student ID. A prefix lookup is a bisect into that array, so a keystroke
+never touches the database.
+
+The index is built lazily on first use, patched in place by the save/delete
+signals of the local process, and pulls changes made by other processes
+(gunicorn workers, management commands) from the database every
+AUTOCOMPLETE_REFRESH_SECONDS using updated_at, which every write to a user
+bumps, as the change marker. A full rebuild every
+AUTOCOMPLETE_REBUILD_SECONDS drops anything a delta refresh cannot see, such
+as deleted accounts.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# How many index entries a single lookup may walk before giving up on
+# finding more matches; bounds the worst case for one-letter prefixes.
+MAX_SCAN = 2000
+
+
+def _normalize(text):
+    return (text or '').casefold()
+
+
+class UserEntry:
+    __slots__ = ('id', 'name', 'username', 'student_id', 'avatar', 'words')
+
+    def __init__(self, user):
+        self.id = user.pk
+        self.name = user.get_display_name
+        self.username = user.username
+        self.student_id = user.student_id
+        self.avatar = user.get_profile_picture('avatar')
+        self.words = sorted({
+            *_normalize(user.get_full_name()).split(),
+            _normalize(user.username),
+            user.student_id,
+        } - {''})
+
+    def matches(self, terms):
+        return all(any(word.startswith(term) for word in self.words) for term in terms)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'username': self.username,
+            'student_id': self.student_id,
+            'avatar': self.avatar,
+        }
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over active students"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []  # Sorted list of (word, user_id)
+        self._users = {}  # user_id -> UserEntry
+        self._built_at = None
+        self._synced_at = None
+        self._checked = 0.0
+
+    # Building and incremental maintenance
+
+    def build(self, users):
+        """Replace the index contents with the given users"""
+        entries = {user.pk: UserEntry(user) for user in users}
+        keys = sorted((word, user_id) for user_id, entry in entries.items() for word in entry.words)
+        with self._lock:
+            self._users = entries
+            self._keys = keys
+
+    def add(self, user):
+        entry = UserEntry(user)
+        with self._lock:
+            self._discard(entry.id)
+            self._users[entry.id] = entry
+            for word in entry.words:
+                insort(self._keys, (word, entry.id))
+
+    def remove(self, user_id):
+        with self._lock:
+            self._discard(user_id)
+
+    def _discard(self, user_id):
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return
+        for word in entry.words:
+            position = bisect_left(self._keys, (word, user_id))
+            if position < len(self._keys) and self._keys[position] == (word, user_id):
+                del self._keys[position]
+
+    def sync_user(self, user):
+        """Apply a single saved user to the index if it has been built"""
+        if self._built_at is None:
+            return
+        if user.is_active:
+            self.add(user)
+        else:
+            self.remove(user.pk)
+
+    def __len__(self):
+        return len(self._users)
+
+    # Lookups
+
+    def lookup(self, query, limit=DEFAULT_LIMIT, exclude=()):
+        """Return up to limit UserEntry objects matching every query term"""
+        terms = _normalize(query).split()
+        if not terms:
+            return []
+        # Walk the range of the longest term, it is the most selective
+        anchor = max(terms, key=len)
+        others = [term for term in terms if term != anchor]
+
+        results = []
+        seen = set(exclude)
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, (anchor,))
+            end = min(len(keys), position + MAX_SCAN)
+            while position < end and len(results) < limit:
+                word, user_id = keys[position]
+                if not word.startswith(anchor):
+                    break
+                position += 1
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                entry = self._users[user_id]
+                if not others or entry.matches(others):
+                    results.append(entry)
+        return results
+
+
+def _active_users():
+    return get_user_model().objects.filter(is_active=True).only(
+        'id', 'first_name', 'last_name', 'username', 'student_id', 'profile_picture', 'image_variants'
+    )
+
+
+def _refresh_if_stale(index):
+    refresh = getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 60)
+    rebuild = getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', 15 * 60)
+    now = time.monotonic()
+
+    if index._built_at is None or now - index._built_at > rebuild:
+        synced_at = timezone.now()
+        index.build(_active_users().iterator(chunk_size=2000))
+        index._built_at = index._checked = now
+        index._synced_at = synced_at
+    elif now - index._checked > refresh:
+        synced_at = timezone.now()
+        changed = get_user_model().objects.filter(updated_at__gte=index._synced_at).only(
+            'id', 'first_name', 'last_name', 'username', 'student_id', 'profile_picture', 'image_variants',
+            'is_active',
+        )
+        for user in changed:
+            index.sync_user(user)
+        index._checked = now
+        index._synced_at = synced_at
+
+
+user_index = PrefixIndex()
+
+
+def autocomplete_users(query, limit=DEFAULT_LIMIT, exclude=()):
+    """Look up students by name, username or student ID prefix"""
+    _refresh_if_stale(user_index)
+    return user_index.lookup(query, limit=min(limit, MAX_LIMIT), exclude=exclude)
@@ -0,0 +1,30 @@
+"""
+Pluggable full-text search backends
+
+The backend is chosen from the default database vendor unless
+settings.SEARCH_BACKEND names a backend class explicitly.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils.module_loading import import_string
+
+VENDOR_BACKENDS = {
+    'sqlite': 'search.backends.sqlite.SQLiteFTS5Backend',
+    'postgresql': 'search.backends.postgres.PostgresSearchBackend',
+}
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None) or VENDOR_BACKENDS.get(connection.vendor)
+        if path is None:
+            raise ImproperlyConfigured(
+                f"No search backend for database vendor '{connection.vendor}'; set SEARCH_BACKEND"
+            )
+        _backend = import_string(path)()
+    return _backend
@@ -0,0 +1,39 @@
+import re
+from collections import namedtuple
+
+from django.db import connection
+
+SearchHit = namedtuple('SearchHit', ['kind', 'object_id', 'rank'])
+
+MAX_QUERY_TERMS = 8
+
+
+def tokenize_query(query):
+    """Split free text into lower-cased word terms, dropping any query syntax"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_QUERY_TERMS]
+
+
+class BaseSearchBackend:
+    """Interface implemented by the database-specific search backends
+
+    Every term must match, and each term is matched as a prefix so partial
+    names and student IDs find results.
+    """
+
+    table = 'search_searchdocument'
+
+    def search(self, terms, kinds, offset, limit):
+        """Return a ranked list of SearchHit for one page of results"""
+        raise NotImplementedError
+
+    def count(self, terms, kinds):
+        raise NotImplementedError
+
+    def _kinds_clause(self, kinds, column='d.kind'):
+        placeholders = ', '.join(['%s'] * len(kinds))
+        return f'{column} IN ({placeholders})', list(kinds)
+
+    def _fetch(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
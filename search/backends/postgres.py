@@ -0,0 +1,32 @@
+from .base import BaseSearchBackend, SearchHit
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL full-text search on the GIN-indexed search_vector column
+
+    search_vector is a stored generated column weighting the title as 'A'
+    and the body as 'B' under the 'simple' configuration, so names and
+    student IDs are matched without stemming.
+    """
+
+    def _tsquery(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def search(self, terms, kinds, offset, limit):
+        kinds_sql, kinds_params = self._kinds_clause(kinds)
+        sql = (
+            f'SELECT d.kind, d.object_id, ts_rank(d.search_vector, q) AS rank '
+            f"FROM {self.table} d, to_tsquery('simple', %s) q "
+            f'WHERE d.search_vector @@ q AND {kinds_sql} '
+            f'ORDER BY rank DESC, d.id DESC LIMIT %s OFFSET %s'
+        )
+        params = [self._tsquery(terms)] + kinds_params + [limit, offset]
+        return [SearchHit(*row) for row in self._fetch(sql, params)]
+
+    def count(self, terms, kinds):
+        kinds_sql, kinds_params = self._kinds_clause(kinds)
+        sql = (
+            f'SELECT COUNT(*) FROM {self.table} d '
+            f"WHERE d.search_vector @@ to_tsquery('simple', %s) AND {kinds_sql}"
+        )
+        return self._fetch(sql, [self._tsquery(terms)] + kinds_params)[0][0]
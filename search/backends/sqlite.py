@@ -0,0 +1,35 @@
+from .base import BaseSearchBackend, SearchHit
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """SQLite FTS5 external-content index, kept in sync by triggers"""
+
+    fts_table = 'search_searchdocument_fts'
+
+    # bm25() column weights: title matches count ten times more than body
+    title_weight = 10.0
+    body_weight = 1.0
+
+    def _match_expression(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, terms, kinds, offset, limit):
+        kinds_sql, kinds_params = self._kinds_clause(kinds)
+        sql = (
+            f'SELECT d.kind, d.object_id, bm25({self.fts_table}, %s, %s) AS rank '
+            f'FROM {self.fts_table} JOIN {self.table} d ON d.id = {self.fts_table}.rowid '
+            f'WHERE {self.fts_table} MATCH %s AND {kinds_sql} '
+            f'ORDER BY rank LIMIT %s OFFSET %s'
+        )
+        params = [self.title_weight, self.body_weight, self._match_expression(terms)]
+        params += kinds_params + [limit, offset]
+        return [SearchHit(*row) for row in self._fetch(sql, params)]
+
+    def count(self, terms, kinds):
+        kinds_sql, kinds_params = self._kinds_clause(kinds)
+        sql = (
+            f'SELECT COUNT(*) FROM {self.fts_table} '
+            f'JOIN {self.table} d ON d.id = {self.fts_table}.rowid '
+            f'WHERE {self.fts_table} MATCH %s AND {kinds_sql}'
+        )
+        return self._fetch(sql, [self._match_expression(terms)] + kinds_params)[0][0]
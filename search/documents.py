@@ -0,0 +1,164 @@
+"""
+What gets indexed for each searchable model, and how the index is kept in sync
+"""
+
+from django.apps import apps
+from django.db import transaction
+
+from .models import SearchDocument
+
+
+class DocumentType:
+    """Describes how one model is turned into SearchDocument rows"""
+
+    def __init__(self, kind, model, build, watched_fields, select_related=(), prefetch_related=()):
+        self.kind = kind
+        self.model_label = model
+        self.build = build  # instance -> (title, body), or None to keep it out of the index
+        self.watched_fields = set(watched_fields)
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def queryset(self):
+        return (
+            self.model._default_manager.select_related(*self.select_related)
+            .prefetch_related(*self.prefetch_related)
+        )
+
+    def document_for(self, instance):
+        built = self.build(instance)
+        if built is None:
+            return None
+        title, body = built
+        return SearchDocument(
+            kind=self.kind,
+            object_id=str(instance.pk),
+            title=title[:255],
+            body=body,
+        )
+
+
+def _join(*parts):
+    return ' '.join(part for part in parts if part)
+
+
+def _build_user(user):
+    if not user.is_active:
+        return None
+    skills = ' '.join(skill.name for skill in user.skills.all())
+    return (
+        user.get_full_name() or user.username,
+        _join(
+            user.student_id,
+            user.username,
+            user.department,
+            user.get_department_display(),
+            user.headline,
+            skills,
+            user.interests,
+        ),
+    )
+
+
+def _build_post(post):
+    if not post.is_public or not post.content:
+        return None
+    return post.author.get_display_name, post.content
+
+
+def _build_group(group):
+    if group.group_type == 'secret':
+        return None
+    return group.name, group.description
+
+
+def _build_event(event):
+    if not event.is_public:
+        return None
+    return event.title, _join(event.get_event_type_display(), event.location, event.description)
+
+
+DOCUMENT_TYPES = {
+    doc_type.kind: doc_type
+    for doc_type in [
+        DocumentType(
+            'user', 'accounts.CustomUser', _build_user,
+            watched_fields=[
+                'first_name', 'last_name', 'username', 'student_id', 'department',
+                'headline', 'interests', 'is_active',
+            ],
+            prefetch_related=['skills'],
+        ),
+        DocumentType(
+            'post', 'social.Post', _build_post,
+            watched_fields=['content', 'is_public'],
+            select_related=['author'],
+        ),
+        DocumentType(
+            'group', 'social.Group', _build_group,
+            watched_fields=['name', 'description', 'group_type'],
+        ),
+        DocumentType(
+            'event', 'social.Event', _build_event,
+            watched_fields=['title', 'description', 'location', 'event_type', 'is_public'],
+        ),
+    ]
+}
+
+
+def document_type_for(model):
+    for doc_type in DOCUMENT_TYPES.values():
+        if doc_type.model is model:
+            return doc_type
+    return None
+
+
+def index_instance(instance, doc_type=None):
+    """Insert, refresh or drop the search document for a single instance"""
+    doc_type = doc_type or document_type_for(type(instance))
+    document = doc_type.document_for(instance)
+    if document is None:
+        remove_instance(instance, doc_type)
+        return
+    stored = SearchDocument.objects.filter(
+        kind=doc_type.kind, object_id=document.object_id
+    ).values_list('title', 'body').first()
+    if stored == (document.title, document.body):
+        return  # Unchanged; spare the full-text index a rewrite
+    SearchDocument.objects.update_or_create(
+        kind=doc_type.kind,
+        object_id=document.object_id,
+        defaults={'title': document.title, 'body': document.body},
+    )
+
+
+def remove_instance(instance, doc_type=None):
+    doc_type = doc_type or document_type_for(type(instance))
+    SearchDocument.objects.filter(kind=doc_type.kind, object_id=str(instance.pk)).delete()
+
+
+def rebuild_index(kinds=None, chunk_size=1000):
+    """Rebuild documents from scratch; returns {kind: documents written}"""
+    written = {}
+    for kind in kinds or DOCUMENT_TYPES:
+        doc_type = DOCUMENT_TYPES[kind]
+        with transaction.atomic():
+            SearchDocument.objects.filter(kind=kind).delete()
+            written[kind] = 0
+            batch = []
+            for instance in doc_type.queryset().iterator(chunk_size=chunk_size):
+                document = doc_type.document_for(instance)
+                if document is not None:
+                    batch.append(document)
+                if len(batch) >= chunk_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    written[kind] += len(batch)
+                    batch = []
+            if batch:
+                SearchDocument.objects.bulk_create(batch)
+                written[kind] += len(batch)
+    return written
@@ -0,0 +1,66 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import CustomUser
+from search.autocomplete import PrefixIndex
+
+
+class Command(BaseCommand):
+    """Measure autocomplete lookup latency against a synthetic index"""
+
+    help = 'Benchmark the in-memory autocomplete prefix index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--lookups', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        def word():
+            return rng.choice(string.ascii_uppercase) + ''.join(
+                rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))
+            )
+
+        # Unsaved instances: the index only reads attributes
+        users = []
+        for n in range(options['users']):
+            student_id = str(200000000 + n)
+            users.append(CustomUser(
+                id=n + 1,
+                username=student_id,
+                student_id=student_id,
+                first_name=word(),
+                last_name=word(),
+            ))
+
+        index = PrefixIndex()
+        started = time.perf_counter()
+        index.build(users)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        queries = []
+        for _ in range(options['lookups']):
+            user = rng.choice(users)
+            source = rng.choice([user.first_name, user.last_name, user.student_id])
+            queries.append(source[:rng.randint(1, min(len(source), 6))])
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.lookup(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+        self.stdout.write(f'Built index of {len(index)} users in {build_ms:.0f} ms')
+        self.stdout.write(
+            f'{len(timings)} lookups: p50 {percentile(0.50):.3f} ms, '
+            f'p99 {percentile(0.99):.3f} ms, max {timings[-1]:.3f} ms'
+        )
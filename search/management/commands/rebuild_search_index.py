@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.documents import DOCUMENT_TYPES, rebuild_index
+
+
+class Command(BaseCommand):
+    """Rebuild the full-text search documents from the source tables"""
+
+    help = 'Rebuild the search index for students, posts, groups and events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kinds',
+            nargs='*',
+            help=f"Only rebuild these document kinds: {', '.join(DOCUMENT_TYPES)} (default: all)",
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(DOCUMENT_TYPES)
+        if unknown:
+            raise CommandError(f"Unknown document kind(s): {', '.join(sorted(unknown))}")
+        written = rebuild_index(options['kinds'] or None, chunk_size=options['chunk_size'])
+        for kind, count in written.items():
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {kind} document(s)'))
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """Denormalized searchable text for one user, post, group or event
+
+    The full-text index itself lives outside the ORM: an FTS5 virtual table
+    on SQLite, or a generated tsvector column with a GIN index on PostgreSQL
+    (see migration 0001 and search.backends).
+    """
+    KINDS = [
+        ('user', 'Student'),
+        ('post', 'Post'),
+        ('group', 'Group'),
+        ('event', 'Event'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.CharField(max_length=36)  # Posts use UUID primary keys
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.title[:50]}"
@@ -0,0 +1,77 @@
+"""
+Ranked, paginated search results hydrated into model instances
+"""
+
+from social.groups import filter_visible_posts
+
+from .backends import get_backend
+from .backends.base import tokenize_query
+from .documents import DOCUMENT_TYPES
+
+
+class SearchResults:
+    """Lazy result set that works with django.core.paginator.Paginator
+
+    Only the requested page is fetched from the index, and its hits are
+    hydrated with one in_bulk() query per kind present on the page. With a
+    user, posts from groups they cannot see are dropped from the page (one
+    more query for the whole page).
+    """
+
+    def __init__(self, query, kinds=None, user=None):
+        self.query = query
+        self.user = user
+        self.terms = tokenize_query(query)
+        self.kinds = [kind for kind in (kinds or DOCUMENT_TYPES) if kind in DOCUMENT_TYPES]
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if not self.terms or not self.kinds:
+                self._count = 0
+            else:
+                self._count = get_backend().count(self.terms, self.kinds)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        if not self.terms or not self.kinds or (stop is not None and stop <= start):
+            return []
+        limit = (stop - start) if stop is not None else self.count() - start
+        hits = get_backend().search(self.terms, self.kinds, start, limit)
+        return self._hydrate(hits)
+
+    def _hydrate(self, hits):
+        ids_by_kind = {}
+        for hit in hits:
+            ids_by_kind.setdefault(hit.kind, []).append(hit.object_id)
+
+        objects = {}
+        for kind, ids in ids_by_kind.items():
+            found = DOCUMENT_TYPES[kind].queryset().in_bulk(ids)
+            if kind == 'post' and self.user is not None:
+                visible = filter_visible_posts(list(found.values()), self.user)
+                found = {post.pk: post for post in visible}
+            objects.update({(kind, str(pk)): obj for pk, obj in found.items()})
+
+        results = []
+        for hit in hits:
+            obj = objects.get((hit.kind, hit.object_id))
+            if obj is not None:
+                results.append(SearchResult(hit.kind, obj, hit.rank))
+        return results
+
+
+class SearchResult:
+    def __init__(self, kind, obj, rank):
+        self.kind = kind
+        self.object = obj
+        self.rank = rank
+
+    def __repr__(self):
+        return f'<SearchResult {self.kind}: {self.object}>'
@@ -0,0 +1,63 @@
+"""
+Incremental search index updates driven by model signals
+"""
+
+from django.db.models.signals import post_delete, post_save
+
+from .autocomplete import user_index
+from .documents import DOCUMENT_TYPES, index_instance, remove_instance
+
+AUTOCOMPLETE_FIELDS = {
+    'first_name', 'last_name', 'username', 'student_id', 'profile_picture', 'is_active',
+}
+
+
+def _connect(doc_type):
+    def reindex(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw:
+            return
+        # Counter-only saves (update_fields without any indexed field) are skipped
+        if update_fields is not None and not doc_type.watched_fields & set(update_fields):
+            return
+        index_instance(instance, doc_type)
+
+    def unindex(sender, instance, **kwargs):
+        remove_instance(instance, doc_type)
+
+    post_save.connect(reindex, sender=doc_type.model, weak=False,
+                      dispatch_uid=f'search_reindex_{doc_type.kind}')
+    post_delete.connect(unindex, sender=doc_type.model, weak=False,
+                        dispatch_uid=f'search_unindex_{doc_type.kind}')
+
+
+def _reindex_skill_owner(sender, instance, raw=False, **kwargs):
+    """Skill names are part of the user document"""
+    if not raw:
+        index_instance(instance.user, DOCUMENT_TYPES['user'])
+
+
+for _doc_type in DOCUMENT_TYPES.values():
+    _connect(_doc_type)
+
+post_save.connect(_reindex_skill_owner, sender='social.UserSkill',
+                  dispatch_uid='search_reindex_user_skill')
+post_delete.connect(_reindex_skill_owner, sender='social.UserSkill',
+                    dispatch_uid='search_unindex_user_skill')
+
+
+def _sync_autocomplete(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not AUTOCOMPLETE_FIELDS & set(update_fields):
+        return
+    user_index.sync_user(instance)
+
+
+def _drop_autocomplete(sender, instance, **kwargs):
+    user_index.remove(instance.pk)
+
+
+post_save.connect(_sync_autocomplete, sender=DOCUMENT_TYPES['user'].model,
+                  dispatch_uid='search_autocomplete_sync')
+post_delete.connect(_drop_autocomplete, sender=DOCUMENT_TYPES['user'].model,
+                    dispatch_uid='search_autocomplete_drop')
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from social.groups import join_group, publish_group_post
+from social.models import Group, Post
+
+from .autocomplete import PrefixIndex, _refresh_if_stale
+from .models import SearchDocument
+
+User = get_user_model()
+
+
+class PostIndexTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='222000001', email='222000001@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000001', department='CSE', batch='Fall 2023',
+        )
+        self.post = Post.objects.create(author=self.author, content='Library open late tonight')
+
+    def document(self):
+        return SearchDocument.objects.get(kind='post', object_id=str(self.post.pk))
+
+    def test_counter_save_keeps_document(self):
+        indexed_at = self.document().updated_at
+        self.post.likes_count += 1
+        self.post.save()
+        self.assertEqual(self.document().updated_at, indexed_at)
+
+    def test_content_edit_reindexes(self):
+        self.post.content = 'Library closed tomorrow'
+        self.post.save()
+        self.assertEqual(self.document().body, 'Library closed tomorrow')
+
+
+class GroupPostSearchTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(
+            username='222000002', email='222000002@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000002', department='CSE', batch='Fall 2023',
+        )
+        self.outsider = User.objects.create_user(
+            username='222000003', email='222000003@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000003', department='EEE', batch='Fall 2023',
+        )
+        group = Group.objects.create(name='Robotics Club', description='Robots', creator=self.member)
+        join_group(group, self.member)
+        publish_group_post(Post(author=self.member, content='Servo motors arrived'), group)
+        # Posted while public, so it stays indexed after the group goes private
+        group.group_type = 'private'
+        group.save()
+
+    def search(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse('search:search'), {'q': 'servo', 'type': 'post'})
+        return [result.object.content for result in response.context['results']]
+
+    def test_members_find_the_post(self):
+        self.assertEqual(self.search(self.member), ['Servo motors arrived'])
+
+    def test_outsiders_do_not(self):
+        self.assertEqual(self.search(self.outsider), [])
+
+
+@override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0)
+class PrefixIndexTests(TestCase):
+    def setUp(self):
+        self.students = [
+            User.objects.create_user(
+                username=student_id, email=f'{student_id}@student.green.ac.bd', password='campus-pass-123',
+                student_id=student_id, department='CSE', batch='Fall 2023', first_name=first, last_name=last,
+            )
+            for student_id, first, last in [
+                ('222000011', 'Nusrat', 'Jahan'),
+                ('222000012', 'Nusrat', 'Karim'),
+                ('222000021', 'Arif', 'Hossain'),
+            ]
+        ]
+        # A fresh index sees other processes' writes only through the delta refresh
+        self.index = PrefixIndex()
+        _refresh_if_stale(self.index)
+
+    def lookup(self, query):
+        _refresh_if_stale(self.index)
+        return [entry.name for entry in self.index.lookup(query)]
+
+    def test_prefix_lookup(self):
+        self.assertEqual(self.lookup('nus'), ['Nusrat Jahan', 'Nusrat Karim'])
+        self.assertEqual(self.lookup('nusrat ka'), ['Nusrat Karim'])
+        self.assertEqual(self.lookup('22200001'), ['Nusrat Jahan', 'Nusrat Karim'])
+        self.assertEqual(self.lookup('zz'), [])
+
+    def test_refresh_picks_up_targeted_saves(self):
+        arif = self.students[2]
+        arif.first_name = 'Ariful'
+        arif.save(update_fields=['first_name'])
+        self.assertEqual(self.lookup('ariful'), ['Ariful Hossain'])
+
+        arif.is_active = False
+        arif.save(update_fields=['is_active'])
+        self.assertEqual(self.lookup('arif'), [])
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'search'
+
+urlpatterns = [
+    path('', views.search, name='search'),
+    path('autocomplete/users/', views.user_autocomplete, name='user_autocomplete'),
+]
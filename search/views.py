@@ -0,0 +1,44 @@
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from .autocomplete import DEFAULT_LIMIT, autocomplete_users
+from .models import SearchDocument
+from .query import SearchResults
+
+
+@login_required
+def search(request):
+    """Full-text search across students, posts, groups and events"""
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('type', '')
+    kinds = [kind] if kind in dict(SearchDocument.KINDS) else None
+
+    results = SearchResults(query, kinds, user=request.user)
+    paginator = Paginator(results, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'query': query,
+        'kind': kind,
+        'kinds': SearchDocument.KINDS,
+        'results': page_obj,
+    }
+    return render(request, 'search/results.html', context)
+
+
+@login_required
+def user_autocomplete(request):
+    """JSON prefix lookup of students for @mentions and tagging"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+
+    if not query:
+        return JsonResponse({'results': []})
+
+    entries = autocomplete_users(query, limit=max(limit, 1), exclude=[request.user.pk])
+    return JsonResponse({'results': [entry.as_dict() for entry in entries]})
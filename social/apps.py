@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class SocialConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'social'
+
+    def ready(self):
+        from functools import partial
+
+        from uploads.access import restrict_media
+
+        from . import signals  # noqa: F401 - connects profile cache invalidation
+        from .groups import visible_posts_q
+        from .models import Post, PostImage
+
+        # Attachments of posts in private and secret groups are for members only
+        restrict_media(Post, 'video', visible_posts_q)
+        restrict_media(Post, 'document', visible_posts_q)
+        restrict_media(PostImage, 'image', partial(visible_posts_q, prefix='post__'))
@@ -0,0 +1,155 @@
+"""
+Professional connections: requests, the inbox and accepting
+
+Requests move pending -> accepted or declined through conditional UPDATEs
+(WHERE status = 'pending'), so two clicks or two devices can never accept a
+request twice. Accepting also bumps connections_count on both students in
+the same transaction.
+
+Inbox lists are keyset-paginated on (created_at, id). Received and sent
+requests are index range scans on (receiver, status, created_at) and
+(sender, status, created_at). Accepted connections can sit on either side,
+so that list takes one sorted run from each index and merges them.
+"""
+
+import base64
+import heapq
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Connection
+from .notifications import notify_users
+
+PAGE_SIZE = 20
+
+INBOXES = {
+    'received': 'Received',
+    'sent': 'Sent',
+    'connected': 'Connections',
+}
+
+
+def send_connection_request(sender, receiver, message=''):
+    """Ask receiver to connect; returns the resulting state
+
+    'sent' for a new request, 'pending' or 'declined' for an existing one,
+    'connected' if the pair is already connected. A pending request the
+    other way round is accepted instead of creating a second one.
+    """
+    if sender.pk == receiver.pk:
+        raise ValueError('Cannot connect with yourself')
+
+    # Both directions are point lookups on the (sender, receiver) unique index
+    reverse = Connection.objects.filter(sender=receiver, receiver=sender).first()
+    if reverse is not None:
+        if reverse.status == 'pending' and accept_connection(reverse, sender):
+            return 'connected'
+        if reverse.status == 'accepted':
+            return 'connected'
+
+    try:
+        with transaction.atomic():
+            connection = Connection.objects.create(sender=sender, receiver=receiver, message=message)
+    except IntegrityError:
+        connection = Connection.objects.get(sender=sender, receiver=receiver)
+        return 'connected' if connection.status == 'accepted' else connection.status
+
+    notify_users(
+        [receiver.pk], sender, 'connection',
+        f'{sender.get_display_name} sent you a connection request',
+    )
+    return 'sent'
+
+
+def accept_connection(connection, user):
+    """Accept a pending request addressed to user; returns True on success"""
+    with transaction.atomic():
+        accepted = Connection.objects.filter(
+            pk=connection.pk, receiver=user, status='pending'
+        ).update(status='accepted', updated_at=timezone.now())
+        if not accepted:
+            return False
+        connection.sender.adjust_social_counters(refresh=False, connections_count=1)
+        user.adjust_social_counters(refresh=False, connections_count=1)
+
+    notify_users(
+        [connection.sender_id], user, 'connection',
+        f'{user.get_display_name} accepted your connection request',
+    )
+    return True
+
+
+def decline_connection(connection, user):
+    """Decline a pending request addressed to user; returns True on success"""
+    return bool(
+        Connection.objects.filter(pk=connection.pk, receiver=user, status='pending')
+        .update(status='declined', updated_at=timezone.now())
+    )
+
+
+def withdraw_connection(connection, user):
+    """Cancel a pending request user sent; returns True on success"""
+    deleted, _ = Connection.objects.filter(pk=connection.pk, sender=user, status='pending').delete()
+    return bool(deleted)
+
+
+# Inbox
+
+def encode_cursor(created_at, connection_id):
+    raw = f'{created_at.isoformat()}|{connection_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, id) or None for a missing or malformed cursor"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _run(queryset, position, limit):
+    """Newest-first (created_at, id) keys of queryset after position"""
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit]
+
+
+def connection_inbox(user, box='received', cursor=None, page_size=PAGE_SIZE):
+    """One page of an inbox; returns (connections, next_cursor)
+
+    Each connection gets other_user, the student on the far side.
+    """
+    position = decode_cursor(cursor)
+    if box == 'sent':
+        runs = [_run(Connection.objects.filter(sender=user, status='pending'), position, page_size + 1)]
+    elif box == 'connected':
+        runs = [
+            _run(Connection.objects.filter(receiver=user, status='accepted'), position, page_size + 1),
+            _run(Connection.objects.filter(sender=user, status='accepted'), position, page_size + 1),
+        ]
+    else:
+        runs = [_run(Connection.objects.filter(receiver=user, status='pending'), position, page_size + 1)]
+
+    keys = [key for _, key in zip(range(page_size + 1), heapq.merge(*runs, reverse=True))]
+    next_cursor = encode_cursor(*keys[page_size - 1]) if len(keys) > page_size else None
+    keys = keys[:page_size]
+
+    found = Connection.objects.select_related('sender', 'receiver').in_bulk([pk for _, pk in keys])
+    connections = [found[pk] for _, pk in keys if pk in found]
+    for connection in connections:
+        connection.other_user = connection.receiver if connection.sender_id == user.pk else connection.sender
+    return connections, next_cursor
+
+
+def pending_count(user):
+    """Requests waiting for user's answer (an index-only count)"""
+    return Connection.objects.filter(receiver=user, status='pending').count()
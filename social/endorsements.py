@@ -0,0 +1,86 @@
+"""
+Skill endorsements
+
+endorse_skill and withdraw_endorsement are the only writers of
+SkillEndorsement and adjust UserSkill.endorsements_count with an F() UPDATE
+in the same transaction. profile_skills loads a profile's skills together
+with the first few endorsers of every skill in two queries: one for the
+skills, one window query (ROW_NUMBER() per skill) for the endorsers.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Greatest, RowNumber
+
+from .models import SkillEndorsement, UserSkill
+from .notifications import notify_users
+
+ENDORSERS_PER_SKILL = 3
+
+
+def endorse_skill(user_skill, endorser):
+    """Endorse user_skill; returns True if the endorsement is new
+
+    The skill's owner is notified. Nobody can endorse their own skills.
+    """
+    if user_skill.user_id == endorser.pk:
+        raise ValueError('Cannot endorse your own skill')
+    try:
+        with transaction.atomic():
+            SkillEndorsement.objects.create(user_skill=user_skill, endorser=endorser)
+            UserSkill.objects.filter(pk=user_skill.pk).update(endorsements_count=F('endorsements_count') + 1)
+    except IntegrityError:
+        return False  # Already endorsed
+
+    notify_users(
+        [user_skill.user_id], endorser, 'endorsement',
+        f'{endorser.get_display_name} endorsed you for {user_skill.skill.name}'[:255],
+    )
+    return True
+
+
+def withdraw_endorsement(user_skill, endorser):
+    """Remove endorser's endorsement; returns True if there was one"""
+    with transaction.atomic():
+        deleted, _ = SkillEndorsement.objects.filter(user_skill=user_skill, endorser=endorser).delete()
+        if deleted:
+            UserSkill.objects.filter(pk=user_skill.pk).update(
+                endorsements_count=Greatest(F('endorsements_count') - 1, 0)
+            )
+    return bool(deleted)
+
+
+def profile_skills(user, viewer=None, limit=None, endorsers_per_skill=ENDORSERS_PER_SKILL):
+    """user's skills, most endorsed first, with endorser previews
+
+    Each UserSkill gets top_endorsers (the first endorsers_per_skill users to
+    endorse it) and endorsed_by_viewer. Two queries however many skills.
+    """
+    skills = UserSkill.objects.filter(user=user).select_related('skill').order_by(
+        '-endorsements_count', 'skill__name'
+    )
+    skills = list(skills[:limit] if limit else skills)
+    for user_skill in skills:
+        user_skill.top_endorsers = []
+        user_skill.endorsed_by_viewer = False
+    if not skills:
+        return skills
+
+    by_id = {user_skill.pk: user_skill for user_skill in skills}
+    rank = Window(
+        RowNumber(), partition_by=[F('user_skill_id')], order_by=[F('created_at').asc(), F('id').asc()]
+    )
+    endorsements = (
+        SkillEndorsement.objects.filter(user_skill__in=by_id)
+        .annotate(rank=rank)
+        .filter(Q(rank__lte=endorsers_per_skill) | Q(endorser_id=getattr(viewer, 'pk', None)))
+        .select_related('endorser')
+        .order_by('user_skill_id', 'rank')
+    )
+    for endorsement in endorsements:
+        user_skill = by_id[endorsement.user_skill_id]
+        if viewer is not None and endorsement.endorser_id == viewer.pk:
+            user_skill.endorsed_by_viewer = True
+        if endorsement.rank <= endorsers_per_skill:
+            user_skill.top_endorsers.append(endorsement.endorser)
+    return skills
@@ -3,13 +3,25 @@ Additional Facebook-style views for GreenLink
 """
 
 import json
+import re
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_POST
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.contrib import messages
 from django.db import models
-from .models import Post, PostReaction, Comment, FriendRequest, Friendship
+from django.utils import timezone
+from .models import Post, PostReaction, Comment, FriendRequest, Friendship, Story, Group, GroupMembership
+from . import groups
+from .relationships import attach_relationships
+from .stories import STORY_LIFETIME, STORY_UPLOAD_LIMITS, active_stories, record_story_view
+from .tasks import process_story_media
+from events.ical import feed_url
+from jobs.queue import enqueue
+from uploads.chunked import UploadError, completed_upload, finish_upload
+from uploads.handlers import SizeLimitUploadHandler
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -127,60 +139,198 @@ def decline_friend_request(request, request_id):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+HEX_COLOR_RE = re.compile(r'^#[0-9a-fA-F]{6}$')
+
 @login_required
+@csrf_exempt
 def create_story(request):
     """Create a new story"""
+    # Oversized files are cut off while streaming; this has to happen before
+    # the CSRF check reads request.POST, hence the csrf_exempt/csrf_protect pair
+    request.upload_handlers.insert(0, SizeLimitUploadHandler(request, STORY_UPLOAD_LIMITS))
+    return _create_story(request)
+
+@csrf_protect
+def _create_story(request):
     if request.method == 'POST':
-        # Handle story creation
-        pass
-    return render(request, 'social/create_story.html')
+        files = request.FILES  # Parsing the body sets upload_rejected
+        if request.upload_rejected:
+            limit = STORY_UPLOAD_LIMITS.get(request.upload_rejected, max(STORY_UPLOAD_LIMITS.values()))
+            messages.error(request, f'That file is too large for a story (max {limit // (1024 * 1024)} MB).')
+            return redirect('social:create_story')
+        
+        content = request.POST.get('content', '').strip()[:500]
+        background_color = request.POST.get('background_color', '')
+        image = files.get('image')
+        video = files.get('video')
+        
+        if image and not (image.content_type or '').startswith('image/'):
+            messages.error(request, 'Please choose an image file.')
+            return redirect('social:create_story')
+        if video and not (video.content_type or '').startswith('video/'):
+            messages.error(request, 'Please choose a video file.')
+            return redirect('social:create_story')
+        
+        upload = None
+        upload_id = request.POST.get('video_upload')
+        if upload_id and not video:
+            try:
+                upload = completed_upload(request.user, upload_id, 'story_video')
+            except UploadError as error:
+                messages.error(request, str(error))
+                return redirect('social:create_story')
+        
+        if not (content or image or video or upload):
+            messages.error(request, 'Add some text, a photo or a video to your story.')
+            return redirect('social:create_story')
+        
+        # Set up front so an unprocessed story still expires and is purged;
+        # process_story_media restarts the clock when it publishes the story
+        story = Story(author=request.user, content=content, expires_at=timezone.now() + STORY_LIFETIME)
+        if HEX_COLOR_RE.match(background_color):
+            story.background_color = background_color
+        if image:
+            story.image = image
+        elif video or upload:
+            story.video = video or upload
+        has_media = bool(story.image or story.video)
+        if has_media:
+            # Hidden until the worker has processed it
+            story.media_status = 'processing'
+        story.save()
+        if upload is not None:
+            finish_upload(upload)
+        
+        if has_media:
+            enqueue(process_story_media, story.pk)
+            messages.success(request, 'Your story is being processed and will appear shortly.')
+        else:
+            messages.success(request, 'Your story has been shared!')
+        return redirect('social:feed')
+    
+    return render(request, 'social/create_story.html', {'upload_limits': STORY_UPLOAD_LIMITS})
+
+@login_required
+def view_story(request, story_id):
+    """Show an active story and record the view"""
+    story = get_object_or_404(active_stories().select_related('author'), pk=story_id)
+    record_story_view(story, request.user)
+    
+    # The author's other active stories, for previous/next navigation
+    story_ids = list(
+        active_stories().filter(author=story.author).order_by('id').values_list('id', flat=True)
+    )
+    position = story_ids.index(story.pk)
+    context = {
+        'story': story,
+        'previous_id': story_ids[position - 1] if position > 0 else None,
+        'next_id': story_ids[position + 1] if position + 1 < len(story_ids) else None,
+    }
+    return render(request, 'social/story_detail.html', context)
 
 @login_required
 def groups_list(request):
-    """List all groups"""
-    from .models import Group
-    groups = Group.objects.filter(group_type='public').order_by('-members_count')
-    return render(request, 'social/groups_list.html', {'groups': groups})
+    """List public groups, most members first"""
+    page = groups.group_directory(request.GET.get('page'))
+    joined_ids = set(
+        GroupMembership.objects.filter(user=request.user, group_id__in=[group['id'] for group in page])
+        .values_list('group_id', flat=True)
+    )
+    for group in page:
+        group['joined'] = group['id'] in joined_ids
+    return render(request, 'social/groups_list.html', {'groups': page, 'page_obj': page})
+
+@login_required
+@require_POST
+def join_group(request, group_id):
+    """Join a public group"""
+    group = get_object_or_404(Group, pk=group_id)
+    if group.group_type != 'public':
+        messages.error(request, 'This group is not open to new members.')
+    elif groups.join_group(group, request.user):
+        messages.success(request, f'You joined {group.name}.')
+    return _redirect_back(request, 'social:groups')
+
+@login_required
+@require_POST
+def leave_group(request, group_id):
+    """Leave a group"""
+    group = get_object_or_404(Group, pk=group_id)
+    if group.creator_id == request.user.pk:
+        messages.error(request, 'The group creator cannot leave the group.')
+    elif groups.leave_group(group, request.user):
+        messages.success(request, f'You left {group.name}.')
+    return _redirect_back(request, 'social:groups')
+
+@login_required
+def group_detail(request, group_id):
+    """A group's timeline"""
+    group = get_object_or_404(Group, pk=group_id)
+    is_member = GroupMembership.objects.filter(group=group, user=request.user).exists()
+    if group.group_type == 'secret' and not is_member:
+        raise Http404('No such group')
+    can_view = groups.can_view_group(group, request.user, is_member)
+    posts, next_cursor, calendar_url = [], None, None
+    if can_view:
+        posts, next_cursor = groups.group_timeline(group, request.GET.get('after'))
+        calendar_url = feed_url(request, 'group', group.pk)
+    context = {
+        'group': group,
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'is_member': is_member,
+        'can_view': can_view,
+        'calendar_url': calendar_url,
+    }
+    return render(request, 'social/group_detail.html', context)
+
+@login_required
+def groups_feed(request):
+    """Latest posts from all of the user's groups"""
+    posts, next_cursor = groups.member_feed(request.user, request.GET.get('after'))
+    return render(request, 'social/groups_feed.html', {'posts': posts, 'next_cursor': next_cursor})
+
+@login_required
+def group_members(request, group_id):
+    """Members of a group, admins and moderators first"""
+    group = get_object_or_404(Group, pk=group_id)
+    is_member = GroupMembership.objects.filter(group=group, user=request.user).exists()
+    if not groups.can_view_group(group, request.user, is_member):
+        raise Http404('No such group')
+    memberships, next_cursor = groups.group_members(group, request.GET.get('after'))
+    context = {
+        'group': group,
+        'memberships': memberships,
+        'next_cursor': next_cursor,
+        'is_member': is_member,
+    }
+    return render(request, 'social/group_members.html', context)
+
+def _redirect_back(request, default):
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect(default)
 
 @login_required
 def friends_list(request):
     """List user's friends"""
-    # Get user's friends from Friendship model
-    from .models import Friendship
-    friendships = Friendship.objects.filter(
-        models.Q(user1=request.user) | models.Q(user2=request.user)
-    )
-    
-    friend_ids = []
-    for friendship in friendships:
-        if friendship.user1 == request.user:
-            friend_ids.append(friendship.user2.id)
-        else:
-            friend_ids.append(friendship.user1.id)
-    
-    friends_users = User.objects.filter(id__in=friend_ids)
-    return render(request, 'social/friends_list.html', {'friends': friends_users})
+    friends = list(User.objects.filter(
+        models.Q(friendships_as_user1__user2=request.user) | models.Q(friendships_as_user2__user1=request.user)
+    ).distinct())
+    attach_relationships(request.user, friends)
+    return render(request, 'social/friends_list.html', {'friends': friends})
 
 @login_required
 def find_friends(request):
     """Find and suggest friends"""
-    # Get current friends
-    friendships = Friendship.objects.filter(
-        models.Q(user1=request.user) | models.Q(user2=request.user)
+    # Everyone who is not a friend yet
+    suggested_users = list(
+        User.objects.exclude(id=request.user.id)
+        .exclude(id__in=Friendship.objects.filter(user1=request.user).values('user2'))
+        .exclude(id__in=Friendship.objects.filter(user2=request.user).values('user1'))[:20]
     )
-    
-    current_friend_ids = []
-    for friendship in friendships:
-        if friendship.user1 == request.user:
-            current_friend_ids.append(friendship.user2.id)
-        else:
-            current_friend_ids.append(friendship.user1.id)
-    
-    # Get users who are not friends yet
-    suggested_users = User.objects.exclude(
-        id__in=current_friend_ids
-    ).exclude(id=request.user.id)[:20]
-    
+    attach_relationships(request.user, suggested_users)
     return render(request, 'social/find_friends.html', {'suggested_users': suggested_users})
 
 @login_required
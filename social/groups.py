@@ -0,0 +1,266 @@
+"""
+Group membership and the public group directory
+
+join_group/leave_group are the only writers of GroupMembership, so
+Group.members_count is adjusted in the same transaction with an F() UPDATE
+and never drifts. Member lists are keyset-paginated over the
+(group, role, joined_at) index, one role after another. The public
+directory is cached a page at a time; any saved or deleted group, and any
+join or leave (which moves members_count), bumps the cache version.
+
+Group posts are read per group over the (group, created_at) index. A
+member's feed pulls one short, sorted run from each of their groups and
+k-way merges them (heapq.merge) instead of issuing a single OR across every
+group, so each query stays a cheap index range scan. Posts of private and
+secret groups are visible to members only; visible_group_ids decides that
+for a whole list of groups in one query (search results use it through
+filter_visible_posts).
+"""
+
+import base64
+import heapq
+import uuid
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils.functional import cached_property
+
+from .models import Group, GroupMembership, Post
+
+# Member lists show admins first, then moderators, then everyone else
+ROLE_ORDER = ['admin', 'moderator', 'member']
+
+MEMBERS_PAGE_SIZE = 30
+POSTS_PAGE_SIZE = 20
+DIRECTORY_PAGE_SIZE = 24
+DIRECTORY_CACHE_SECONDS = 5 * 60
+DIRECTORY_VERSION_KEY = 'group-directory:version'
+
+
+def join_group(group, user, role='member'):
+    """Add user to group; returns True if they were not a member yet"""
+    with transaction.atomic():
+        _, created = GroupMembership.objects.get_or_create(group=group, user=user, defaults={'role': role})
+        if created:
+            Group.objects.filter(pk=group.pk).update(members_count=F('members_count') + 1)
+            transaction.on_commit(invalidate_group_directory)
+    return created
+
+
+def leave_group(group, user):
+    """Remove user from group; returns True if they were a member"""
+    with transaction.atomic():
+        deleted, _ = GroupMembership.objects.filter(group=group, user=user).delete()
+        if deleted:
+            Group.objects.filter(pk=group.pk).update(members_count=Greatest(F('members_count') - 1, 0))
+            transaction.on_commit(invalidate_group_directory)
+    return bool(deleted)
+
+
+def publish_group_post(post, group):
+    """Save an unsaved post into group's timeline and bump its posts_count
+
+    Posts in private and secret groups are never public, which keeps them
+    out of the main feed and search.
+    """
+    post.group = group
+    post.is_public = group.group_type == 'public'
+    with transaction.atomic():
+        post.save()
+        Group.objects.filter(pk=group.pk).update(posts_count=F('posts_count') + 1)
+    return post
+
+
+# Visibility
+
+def visible_group_ids(user, group_ids):
+    """The subset of group_ids whose posts user may see, in one query"""
+    return set(
+        Group.objects.filter(id__in=set(group_ids))
+        .filter(Q(group_type='public') | Q(groupmembership__user=user))
+        .values_list('id', flat=True).distinct()
+    )
+
+
+def can_view_group(group, user, is_member=None):
+    """Whether user may see group's posts and members
+
+    Pass is_member when the caller already knows it to save the query.
+    """
+    if group.group_type == 'public':
+        return True
+    if is_member is None:
+        return group.pk in visible_group_ids(user, [group.pk])
+    return is_member
+
+
+def visible_posts_q(user, prefix=''):
+    """Q limiting a Post queryset to posts outside groups or in groups user can see
+
+    prefix reaches the post through a relation, e.g. 'post__' for PostImage.
+    """
+    q = Q(**{f'{prefix}group__isnull': True}) | Q(**{f'{prefix}group__group_type': 'public'})
+    if user.is_authenticated:
+        member_of = GroupMembership.objects.filter(user=user).values('group_id')
+        q |= Q(**{f'{prefix}group_id__in': member_of})
+    return q
+
+
+def filter_visible_posts(posts, user):
+    """Drop posts from groups user cannot see; one query for the whole list"""
+    visible = visible_group_ids(user, {post.group_id for post in posts if post.group_id})
+    return [post for post in posts if post.group_id is None or post.group_id in visible]
+
+
+# Member lists
+
+def encode_member_cursor(membership):
+    raw = f'{membership.role}|{membership.joined_at.isoformat()}|{membership.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_member_cursor(token):
+    """Return (role, joined_at, id) or None for a missing or malformed cursor"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        role, joined_at, pk = raw.split('|')
+        if role not in ROLE_ORDER:
+            return None
+        return role, datetime.fromisoformat(joined_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def group_members(group, cursor=None, page_size=MEMBERS_PAGE_SIZE):
+    """One page of memberships (with users); returns (memberships, next_cursor)
+
+    Walks ROLE_ORDER with one index range scan per role, so a page costs at
+    most three queries however deep it is.
+    """
+    position = decode_member_cursor(cursor)
+    roles = ROLE_ORDER[ROLE_ORDER.index(position[0]):] if position else ROLE_ORDER
+
+    page = []
+    for role in roles:
+        queryset = GroupMembership.objects.filter(group=group, role=role)
+        if position and role == position[0]:
+            _, joined_at, pk = position
+            queryset = queryset.filter(Q(joined_at__gt=joined_at) | Q(joined_at=joined_at, id__gt=pk))
+        page += queryset.select_related('user').order_by('joined_at', 'id')[:page_size + 1 - len(page)]
+        if len(page) > page_size:
+            break
+
+    next_cursor = encode_member_cursor(page[page_size - 1]) if len(page) > page_size else None
+    return page[:page_size], next_cursor
+
+
+# Timelines
+
+def encode_post_cursor(created_at, post_id):
+    raw = f'{created_at.isoformat()}|{post_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_post_cursor(token):
+    """Return (created_at, id) or None for a missing or malformed cursor"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _timeline(group_id, position):
+    """(created_at, id) of a group's posts older than position, newest first"""
+    queryset = Post.objects.filter(group_id=group_id)
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset.order_by('-created_at', '-id').values_list('created_at', 'id')
+
+
+def _load_posts(keys):
+    posts = Post.objects.select_related('author', 'group').prefetch_related('images').in_bulk(
+        [pk for _, pk in keys]
+    )
+    return [posts[pk] for _, pk in keys if pk in posts]
+
+
+def _page(keys, page_size):
+    next_cursor = encode_post_cursor(*keys[page_size - 1]) if len(keys) > page_size else None
+    return _load_posts(keys[:page_size]), next_cursor
+
+
+def group_timeline(group, cursor=None, page_size=POSTS_PAGE_SIZE):
+    """One page of a group's posts; returns (posts, next_cursor)"""
+    keys = list(_timeline(group.pk, decode_post_cursor(cursor))[:page_size + 1])
+    return _page(keys, page_size)
+
+
+def member_feed(user, cursor=None, page_size=POSTS_PAGE_SIZE):
+    """One page of posts from all of user's groups, newest first
+
+    Each group contributes at most page_size + 1 keys from its own timeline;
+    heapq.merge interleaves the sorted runs. That is one index scan per
+    group plus one query loading the page's posts.
+    """
+    position = decode_post_cursor(cursor)
+    group_ids = GroupMembership.objects.filter(user=user).values_list('group_id', flat=True)
+    runs = [_timeline(group_id, position)[:page_size + 1] for group_id in group_ids]
+    merged = heapq.merge(*runs, reverse=True)
+    keys = [key for _, key in zip(range(page_size + 1), merged)]
+    return _page(keys, page_size)
+
+
+# Directory
+
+def invalidate_group_directory():
+    try:
+        cache.incr(DIRECTORY_VERSION_KEY)
+    except ValueError:
+        cache.set(DIRECTORY_VERSION_KEY, 2, None)
+
+
+class DirectoryPaginator(Paginator):
+    """Paginator whose count, the expensive part, is cached under count_key"""
+
+    def __init__(self, object_list, per_page, count_key):
+        super().__init__(object_list, per_page)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        return cache.get_or_set(self.count_key, self.object_list.count, DIRECTORY_CACHE_SECONDS)
+
+
+def group_directory(page_number):
+    """A page of public groups, most members first, cached per page
+
+    Returns a Paginator page whose object_list holds plain dicts.
+    """
+    version = cache.get_or_set(DIRECTORY_VERSION_KEY, 1, None)
+    paginator = DirectoryPaginator(
+        Group.objects.filter(group_type='public').order_by('-members_count', 'id'),
+        DIRECTORY_PAGE_SIZE,
+        count_key=f'group-directory:{version}:count',
+    )
+    page = paginator.get_page(page_number)
+
+    key = f'group-directory:{version}:page:{page.number}'
+    groups = cache.get(key)
+    if groups is None:
+        groups = list(page.object_list.values(
+            'id', 'name', 'description', 'cover_image', 'members_count', 'posts_count',
+        ))
+        cache.set(key, groups, DIRECTORY_CACHE_SECONDS)
+    page.object_list = groups
+    return page
@@ -0,0 +1,128 @@
+"""
+Hashtag extraction and indexing for GreenLink posts
+"""
+
+import re
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Hashtag
+from .trending import record_hashtag_usage
+
+# A '#' that doesn't follow a word character, '#' or '&' (HTML entities), then
+# the tag body. The Bengali block is listed explicitly because \w misses its
+# vowel signs. Tags are capped at Hashtag.name's max_length.
+HASHTAG_RE = re.compile(r'(?<![\w#&])#([\w\u0980-\u09ff]{1,100})')
+
+
+def extract_hashtags(text):
+    """Return the distinct, lower-cased hashtags in text, in order of appearance"""
+    if not text or '#' not in text:
+        return []
+    seen = {}
+    for match in HASHTAG_RE.finditer(text):
+        name = match.group(1).lower()
+        # Skip pure numbers such as issue references (#42)
+        if not name.isdigit():
+            seen.setdefault(name, None)
+    return list(seen)
+
+
+def _apply_usage_deltas(usage_deltas):
+    """Atomically apply {hashtag_id: delta}, one UPDATE per distinct delta"""
+    ids_by_delta = defaultdict(list)
+    for hashtag_id, delta in usage_deltas.items():
+        if delta:
+            ids_by_delta[delta].append(hashtag_id)
+
+    for delta, ids in ids_by_delta.items():
+        if delta > 0:
+            expression = F('usage_count') + delta
+        else:
+            expression = Greatest(F('usage_count') + delta, 0)
+        Hashtag.objects.filter(id__in=ids).update(usage_count=expression)
+
+
+def index_hashtags(posts):
+    """Sync the hashtag index for a batch of posts with their current content
+
+    Costs a constant number of queries per batch regardless of how many posts
+    or tags it contains: one read of the existing through-rows, a bulk upsert
+    of Hashtag rows, bulk insert/delete of through-rows and one counter
+    UPDATE per distinct delta. Added and dropped uses are also added to or
+    taken out of the trending buckets for the hour each post was created.
+    """
+    posts = list(posts)
+    _sync_hashtags(posts, {post.pk: set(extract_hashtags(post.content)) for post in posts})
+
+
+def unindex_post_hashtags(post):
+    """Drop a post about to be deleted from the hashtag index and trending"""
+    _sync_hashtags([post], {post.pk: set()})
+
+
+def _sync_hashtags(posts, wanted):
+    """Make the tags indexed for each post equal wanted[post.pk]"""
+    if not posts:
+        return
+
+    Through = Hashtag.posts.through
+    created_at = {post.pk: post.created_at for post in posts}
+
+    current = defaultdict(set)
+    row_ids = {}
+    name_to_id = {}
+    existing_rows = Through.objects.filter(post_id__in=wanted).values_list(
+        'id', 'post_id', 'hashtag_id', 'hashtag__name'
+    )
+    for row_id, post_id, hashtag_id, name in existing_rows:
+        current[post_id].add(name)
+        row_ids[post_id, name] = row_id
+        name_to_id[name] = hashtag_id
+
+    added = {pk: names - current[pk] for pk, names in wanted.items()}
+    removed = {pk: current[pk] - names for pk, names in wanted.items()}
+    if not any(added.values()) and not any(removed.values()):
+        return
+
+    with transaction.atomic():
+        new_names = set().union(*added.values()) - set(name_to_id)
+        if new_names:
+            Hashtag.objects.bulk_create(
+                [Hashtag(name=name) for name in new_names], ignore_conflicts=True
+            )
+            name_to_id.update(
+                Hashtag.objects.filter(name__in=new_names).values_list('name', 'id')
+            )
+
+        usage_deltas = defaultdict(int)
+        trend_uses = defaultdict(int)
+
+        through_rows = []
+        for post_id, names in added.items():
+            for name in names:
+                through_rows.append(Through(post_id=post_id, hashtag_id=name_to_id[name]))
+                usage_deltas[name_to_id[name]] += 1
+                trend_uses[name_to_id[name], created_at[post_id]] += 1
+        if through_rows:
+            Through.objects.bulk_create(through_rows, ignore_conflicts=True)
+
+        stale_row_ids = []
+        for post_id, names in removed.items():
+            for name in names:
+                stale_row_ids.append(row_ids[post_id, name])
+                usage_deltas[name_to_id[name]] -= 1
+                trend_uses[name_to_id[name], created_at[post_id]] -= 1
+        if stale_row_ids:
+            Through.objects.filter(id__in=stale_row_ids).delete()
+
+        _apply_usage_deltas(usage_deltas)
+        record_hashtag_usage(trend_uses)
+
+
+def index_post_hashtags(post):
+    """Sync the hashtag index for a single post"""
+    index_hashtags([post])
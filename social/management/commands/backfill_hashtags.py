@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from social.hashtags import index_hashtags
+from social.models import Post
+
+
+class Command(BaseCommand):
+    """Index hashtags for posts created before the indexing pipeline existed"""
+
+    help = 'Extract #hashtags from existing posts and index them in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of posts indexed per batch',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = (
+            Post.objects.only('id', 'content', 'created_at')
+            .order_by()
+            .iterator(chunk_size=chunk_size)
+        )
+
+        processed = 0
+        chunk = []
+        for post in posts:
+            chunk.append(post)
+            if len(chunk) >= chunk_size:
+                index_hashtags(chunk)
+                processed += len(chunk)
+                chunk = []
+        if chunk:
+            index_hashtags(chunk)
+            processed += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed hashtags for {processed} post(s)'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from social.stories import PURGE_BATCH_SIZE, purge_expired_stories
+
+
+class Command(BaseCommand):
+    """Remove stories past their expires_at now
+
+    Workers already do this hourly as the social.purge_expired_stories
+    periodic job; the command is for clearing a backlog by hand.
+    """
+
+    help = 'Delete expired stories together with their viewer rows and media files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help='Number of stories deleted per batch',
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_stories(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired stor{"y" if deleted == 1 else "ies"}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from social.trending import purge_usage_buckets, refresh_trending
+
+
+class Command(BaseCommand):
+    """Materialize the trending hashtag lists now
+
+    Workers already run this every 10 minutes as the social.refresh_trending
+    periodic job; the command is for a fresh install or a manual refresh.
+    """
+
+    help = 'Recompute time-decayed trending hashtags and prune old usage buckets'
+
+    def handle(self, *args, **options):
+        rows = refresh_trending()
+        purged = purge_usage_buckets()
+        self.stdout.write(self.style.SUCCESS(
+            f'Materialized {len(rows)} trending entries, purged {purged} old bucket(s)'
+        ))
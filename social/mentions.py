@@ -0,0 +1,81 @@
+"""
+@mention extraction and resolution for posts
+"""
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from .notifications import notify_users
+
+User = get_user_model()
+
+# '@' not preceded by a word character (so emails are ignored), followed by a
+# username or a 9-digit student ID
+MENTION_RE = re.compile(r'(?<![\w@.])@([\w.+-]{1,150})')
+
+# Upper bound on how many distinct people one post can mention
+MAX_MENTIONS = 50
+
+
+def extract_mentions(text):
+    """Return the distinct handles mentioned in text, in order of appearance"""
+    if not text or '@' not in text:
+        return []
+    seen = {}
+    for match in MENTION_RE.finditer(text):
+        handle = match.group(1).rstrip('.-+')
+        if handle:
+            seen.setdefault(handle, None)
+    return list(seen)[:MAX_MENTIONS]
+
+
+def resolve_mentions(handles):
+    """Resolve handles (usernames or student IDs) to active users in one query"""
+    if not handles:
+        return []
+    return list(
+        User.objects.filter(
+            Q(username__in=handles) | Q(student_id__in=handles),
+            is_active=True,
+        ).only('id', 'username', 'student_id')
+    )
+
+
+def index_post_mentions(post):
+    """Tag and notify everyone newly @mentioned in a post
+
+    Uses a constant number of queries however many people are mentioned:
+    one to resolve handles, one to read existing tags, one bulk insert of
+    tagged-user rows and one bulk insert of notifications. Mentions removed
+    by an edit keep their tag, and nobody is notified twice for one post.
+    """
+    mentioned = resolve_mentions(extract_mentions(post.content))
+    mentioned_ids = {user.pk for user in mentioned} - {post.author_id}
+    if not mentioned_ids:
+        return []
+
+    Through = post.tagged_users.through
+    user_column = f'{type(post).tagged_users.field.m2m_reverse_field_name()}_id'
+    already_tagged = set(
+        Through.objects.filter(post_id=post.pk, **{f'{user_column}__in': mentioned_ids})
+        .values_list(user_column, flat=True)
+    )
+    new_ids = mentioned_ids - already_tagged
+    if not new_ids:
+        return []
+
+    with transaction.atomic():
+        Through.objects.bulk_create(
+            [Through(post_id=post.pk, **{user_column: user_id}) for user_id in new_ids],
+            ignore_conflicts=True,
+        )
+        notify_users(
+            new_ids,
+            sender=post.author_id,
+            notification_type='mention',
+            message=f'{post.author.get_display_name} mentioned you in a post',
+        )
+    return sorted(new_ids)
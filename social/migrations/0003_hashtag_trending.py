@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_event_group_remove_post_image_post_images_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('24h', 'Last 24 hours'), ('7d', 'Last 7 days')], max_length=5)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('uses', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_entries', to='social.hashtag')),
+            ],
+            options={
+                'ordering': ['window', 'rank'],
+                'unique_together': {('window', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HashtagUsageBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_buckets', to='social.hashtag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='social_hash_hour_23dd31_idx')],
+                'unique_together': {('hashtag', 'hour')},
+            },
+        ),
+    ]
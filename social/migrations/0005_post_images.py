@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_post_media_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(height_field='height', upload_to='post_images/', width_field='width')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('placeholder', models.TextField(blank=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='social.post')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['post', 'position'], name='social_post_post_id_ce3d35_idx')],
+            },
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='images',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0005_post_images'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['author', 'expires_at'], name='social_stor_author__57a10d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['expires_at'], name='social_stor_expires_2883fe_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+COUNTER_FIELDS = {
+    'going': 'going_count',
+    'maybe': 'maybe_count',
+    'not_going': 'not_going_count',
+    'interested': 'interested_count',
+}
+
+
+def backfill_attendance_counters(apps, schema_editor):
+    Event = apps.get_model('social', 'Event')
+    EventAttendance = apps.get_model('social', 'EventAttendance')
+    counts = {}
+    rows = EventAttendance.objects.values_list('event_id', 'status').annotate(n=Count('id')).order_by()
+    for event_id, status, n in rows:
+        if status in COUNTER_FIELDS:
+            counts.setdefault(event_id, {})[COUNTER_FIELDS[status]] = n
+    events = [Event(id=event_id, **fields) for event_id, fields in counts.items()]
+    Event.objects.bulk_update(events, list(COUNTER_FIELDS.values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0007_story_media_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='going_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='interested_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='maybe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='not_going_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_public', 'start_datetime'], name='social_even_is_publ_ca17ed_idx'),
+        ),
+        migrations.RunPython(backfill_attendance_counters, migrations.RunPython.noop),
+    ]
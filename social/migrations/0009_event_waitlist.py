@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0008_event_attendance_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='waitlisted_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='eventattendance',
+            name='status',
+            field=models.CharField(choices=[('going', 'Going'), ('maybe', 'Maybe'), ('not_going', 'Not Going'), ('interested', 'Interested'), ('waitlisted', 'Waitlisted')], default='interested', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('like', 'Post Liked'), ('comment', 'New Comment'), ('follow', 'New Follower'), ('connection', 'Connection Request'), ('endorsement', 'Skill Endorsed'), ('mention', 'Mentioned in Post'), ('group_invite', 'Study Group Invite'), ('event', 'Event Update')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='eventattendance',
+            index=models.Index(fields=['event', 'status', 'created_at'], name='social_even_event_i_3788aa_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_members_count(apps, schema_editor):
+    Group = apps.get_model('social', 'Group')
+    GroupMembership = apps.get_model('social', 'GroupMembership')
+    members = (
+        GroupMembership.objects.filter(group=OuterRef('pk'))
+        .order_by().values('group').annotate(n=Count('id')).values('n')
+    )
+    Group.objects.update(members_count=Coalesce(Subquery(members), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0010_event_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(fields=['group', 'role', 'joined_at'], name='social_grou_group_i_98d2dc_idx'),
+        ),
+        migrations.RunPython(backfill_members_count, migrations.RunPython.noop),
+    ]
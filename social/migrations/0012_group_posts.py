@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0011_group_membership_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to='social.group'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'created_at'], name='social_post_group_i_d0d7ca_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:58
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_study_groups(apps, schema_editor):
+    StudyGroup = apps.get_model('social', 'StudyGroup')
+    Member = StudyGroup.members.through
+    members = (
+        Member.objects.filter(studygroup=OuterRef('pk'))
+        .order_by().values('studygroup').annotate(n=Count('id')).values('n')
+    )
+    StudyGroup.objects.update(members_count=Coalesce(Subquery(members), 0))
+
+    # Same normalization as social.study_groups.normalize_course_code
+    for group in StudyGroup.objects.exclude(course_code='').only('id', 'course_code').iterator():
+        code = re.sub(r'\s+', '', group.course_code).upper()
+        if code != group.course_code:
+            StudyGroup.objects.filter(pk=group.pk).update(course_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0012_group_posts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='members_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['course_code', 'id'], name='social_stud_course__2a9d15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['subject', 'id'], name='social_stud_subject_62d189_idx'),
+        ),
+        migrations.RunPython(backfill_study_groups, migrations.RunPython.noop),
+    ]
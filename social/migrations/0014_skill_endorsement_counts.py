@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_endorsements_count(apps, schema_editor):
+    UserSkill = apps.get_model('social', 'UserSkill')
+    SkillEndorsement = apps.get_model('social', 'SkillEndorsement')
+    endorsements = (
+        SkillEndorsement.objects.filter(user_skill=OuterRef('pk'))
+        .order_by().values('user_skill').annotate(n=Count('id')).values('n')
+    )
+    UserSkill.objects.update(endorsements_count=Coalesce(Subquery(endorsements), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0013_study_group_directory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='skillendorsement',
+            index=models.Index(fields=['user_skill', 'created_at'], name='social_skil_user_sk_de63c2_idx'),
+        ),
+        migrations.RunPython(backfill_endorsements_count, migrations.RunPython.noop),
+    ]
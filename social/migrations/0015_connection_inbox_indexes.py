@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:03
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_connections_count(apps, schema_editor):
+    User = apps.get_model('accounts', 'CustomUser')
+    Connection = apps.get_model('social', 'Connection')
+    accepted = Connection.objects.filter(status='accepted')
+    counts = Counter(dict(accepted.values_list('sender').annotate(n=Count('id')).order_by()))
+    counts.update(dict(accepted.values_list('receiver').annotate(n=Count('id')).order_by()))
+    users = [User(pk=user_id, connections_count=n) for user_id, n in counts.items()]
+    User.objects.bulk_update(users, ['connections_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_customuser_connections_count'),
+        ('social', '0014_skill_endorsement_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['receiver', 'status', 'created_at'], name='social_conn_receive_c78f52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='connection',
+            index=models.Index(fields=['sender', 'status', 'created_at'], name='social_conn_sender__d3c4b1_idx'),
+        ),
+        migrations.RunPython(backfill_connections_count, migrations.RunPython.noop),
+    ]
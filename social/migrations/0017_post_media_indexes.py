@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0016_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='document',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='post_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='video',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='post_videos/'),
+        ),
+        migrations.AlterField(
+            model_name='postimage',
+            name='image',
+            field=models.ImageField(db_index=True, height_field='height', upload_to='post_images/', width_field='width'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from PIL import Image
+from uploads.images import pending_images, process_images
 import uuid
 
 User = get_user_model()
@@ -30,15 +31,25 @@ class Post(models.Model):
         ('angry', '😡 Angry'),
     ]
     
+    MEDIA_STATUS = [
+        ('ready', 'Ready'),
+        ('processing', 'Processing'),
+        ('failed', 'Failed'),
+    ]
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField(max_length=5000, blank=True)  # Facebook-like longer posts
     post_type = models.CharField(max_length=20, choices=POST_TYPES, default='status')
     
-    # Media attachments (multiple files support)
-    images = models.JSONField(default=list, blank=True)  # Store multiple image URLs
-    video = models.FileField(upload_to='post_videos/', blank=True, null=True)
-    document = models.FileField(upload_to='post_documents/', blank=True, null=True)
+    # Media attachments (images live in PostImage, related_name='images')
+    # Indexed for the media access check (uploads.access)
+    video = models.FileField(upload_to='post_videos/', blank=True, null=True, db_index=True)
+    document = models.FileField(upload_to='post_documents/', blank=True, null=True, db_index=True)
+    
+    # Background media processing (see social.tasks)
+    media_status = models.CharField(max_length=10, choices=MEDIA_STATUS, default='ready')
+    media_info = models.JSONField(default=dict, blank=True)  # Probed video duration/dimensions
     
     # Location and tagging
     location = models.CharField(max_length=255, blank=True)
@@ -55,15 +66,48 @@ class Post(models.Model):
     is_pinned = models.BooleanField(default=False)
     shared_from = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='shares')
     
+    # Posted into a group's timeline rather than the author's own (see social.groups)
+    group = models.ForeignKey('Group', on_delete=models.CASCADE, null=True, blank=True, related_name='posts')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Group timelines, newest first
+            models.Index(fields=['group', 'created_at']),
+        ]
         
     def __str__(self):
         return f"{self.author.get_display_name}: {self.content[:50]}..."
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored content so save() only re-indexes real edits
+        instance._indexed_content = instance.__dict__.get('content')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        content_changed = (
+            (update_fields is None or 'content' in update_fields)
+            and 'content' in self.__dict__
+            and (self._state.adding or self.content != getattr(self, '_indexed_content', None))
+        )
+        super().save(*args, **kwargs)
+        if content_changed:
+            self.index_content()
+    
+    def index_content(self):
+        """Run the post-save indexing stages for this post's content"""
+        from .hashtags import index_post_hashtags
+        from .mentions import index_post_mentions
+        index_post_hashtags(self)
+        index_post_mentions(self)
+        self._indexed_content = self.content
+    
     def get_absolute_url(self):
         return reverse('social:post_detail', kwargs={'pk': self.pk})
     
@@ -99,6 +143,26 @@ class Post(models.Model):
         return ""
 
 
+class PostImage(models.Model):
+    """One image of a multi-image post, in display order"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='images')
+    image = models.ImageField(upload_to='post_images/', width_field='width', height_field='height', db_index=True)
+    position = models.PositiveSmallIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True)  # Tiny blurred data: URI shown while loading
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Variant files (uploads.images.record_variants)
+    
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['post', 'position']),
+        ]
+    
+    def __str__(self):
+        return f"Image {self.position} of post {self.post_id}"
+
+
 class PostReaction(models.Model):
     """Facebook-style reactions (like, love, haha, etc.)"""
     REACTION_TYPES = [
@@ -172,6 +236,44 @@ class Hashtag(models.Model):
         return f"#{self.name}"
 
 
+class HashtagUsageBucket(models.Model):
+    """Per-hour hashtag usage counts feeding the trending engine"""
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='usage_buckets')
+    hour = models.DateTimeField()  # Truncated to the start of the hour
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hashtag', 'hour')
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f"#{self.hashtag.name} @ {self.hour:%Y-%m-%d %H:00}: {self.count}"
+
+
+class TrendingHashtag(models.Model):
+    """Materialized top hashtags per window, rebuilt by the social.refresh_trending job"""
+    WINDOWS = [
+        ('24h', 'Last 24 hours'),
+        ('7d', 'Last 7 days'),
+    ]
+
+    window = models.CharField(max_length=5, choices=WINDOWS)
+    rank = models.PositiveSmallIntegerField()
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='trending_entries')
+    score = models.FloatField()
+    uses = models.PositiveIntegerField(default=0)  # Raw uses inside the window
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['window', 'rank']
+        unique_together = ('window', 'rank')
+
+    def __str__(self):
+        return f"{self.window} #{self.rank}: {self.hashtag}"
+
+
 class Experience(models.Model):
     """LinkedIn-like work experience"""
     EXPERIENCE_TYPES = [
@@ -266,6 +368,10 @@ class SkillEndorsement(models.Model):
     
     class Meta:
         unique_together = ('endorser', 'user_skill')
+        indexes = [
+            # First endorsers of each skill
+            models.Index(fields=['user_skill', 'created_at']),
+        ]
 
 
 class Story(models.Model):
@@ -273,9 +379,14 @@ class Story(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stories')
     content = models.TextField(max_length=500, blank=True)
     image = models.ImageField(upload_to='story_images/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Variant files (uploads.images.record_variants)
     video = models.FileField(upload_to='story_videos/', blank=True, null=True)
     background_color = models.CharField(max_length=7, default='#1877f2')  # Hex color
     
+    # Stories with media stay hidden until a background worker has processed it
+    media_status = models.CharField(max_length=10, choices=Post.MEDIA_STATUS, default='ready')
+    media_info = models.JSONField(default=dict, blank=True)  # Probed video duration/dimensions
+    
     views_count = models.PositiveIntegerField(default=0)
     viewers = models.ManyToManyField(User, blank=True, related_name='viewed_stories')
     
@@ -285,6 +396,10 @@ class Story(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Stories'
+        indexes = [
+            models.Index(fields=['author', 'expires_at']),
+            models.Index(fields=['expires_at']),  # Expiry sweeps across all authors
+        ]
     
     def __str__(self):
         return f"{self.author.get_display_name}'s story"
@@ -298,7 +413,11 @@ class Story(models.Model):
             from django.utils import timezone
             from datetime import timedelta
             self.expires_at = timezone.now() + timedelta(hours=24)
+        new_images = pending_images(self, 'image')
         super().save(*args, **kwargs)
+        if self.media_status != 'processing':
+            # Otherwise social.tasks.process_story_media handles the image
+            process_images(self, new_images)
 
 
 class Group(models.Model):
@@ -312,6 +431,7 @@ class Group(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(max_length=1000)
     cover_image = models.ImageField(upload_to='group_covers/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Variant files (uploads.images.record_variants)
     group_type = models.CharField(max_length=10, choices=GROUP_TYPES, default='public')
     
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_social_groups')
@@ -328,6 +448,19 @@ class Group(models.Model):
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        new_images = pending_images(self, 'cover_image')
+        super().save(*args, **kwargs)
+        process_images(self, new_images)
+        from .groups import invalidate_group_directory
+        invalidate_group_directory()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .groups import invalidate_group_directory
+        invalidate_group_directory()
+        return result
 
 
 class GroupMembership(models.Model):
@@ -345,6 +478,10 @@ class GroupMembership(models.Model):
     
     class Meta:
         unique_together = ('user', 'group')
+        indexes = [
+            # Member lists, walked role by role in join order
+            models.Index(fields=['group', 'role', 'joined_at']),
+        ]
 
 
 class Event(models.Model):
@@ -362,9 +499,11 @@ class Event(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(max_length=2000)
     cover_image = models.ImageField(upload_to='event_covers/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Variant files (uploads.images.record_variants)
     event_type = models.CharField(max_length=20, choices=EVENT_TYPES, default='academic')
     
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organized_events')
+    group = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
     location = models.CharField(max_length=255)
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
@@ -375,13 +514,29 @@ class Event(models.Model):
     is_public = models.BooleanField(default=True)
     requires_approval = models.BooleanField(default=False)
     
+    # Denormalized EventAttendance counts per status (see events.attendance)
+    going_count = models.PositiveIntegerField(default=0)
+    maybe_count = models.PositiveIntegerField(default=0)
+    interested_count = models.PositiveIntegerField(default=0)
+    not_going_count = models.PositiveIntegerField(default=0)
+    waitlisted_count = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Not touched by counter updates
     
     class Meta:
         ordering = ['start_datetime']
+        indexes = [
+            models.Index(fields=['is_public', 'start_datetime']),
+        ]
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        new_images = pending_images(self, 'cover_image')
+        super().save(*args, **kwargs)
+        process_images(self, new_images)
 
 
 class EventAttendance(models.Model):
@@ -391,15 +546,30 @@ class EventAttendance(models.Model):
         ('maybe', 'Maybe'),
         ('not_going', 'Not Going'),
         ('interested', 'Interested'),
+        ('waitlisted', 'Waitlisted'),  # Asked to go while the event was full
     ]
     
+    # status -> Event counter column
+    COUNTER_FIELDS = {
+        'going': 'going_count',
+        'maybe': 'maybe_count',
+        'not_going': 'not_going_count',
+        'interested': 'interested_count',
+        'waitlisted': 'waitlisted_count',
+    }
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=ATTENDANCE_STATUS, default='interested')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ('user', 'event')
+        indexes = [
+            # Waitlist order and per-status attendee lists
+            models.Index(fields=['event', 'status', 'created_at']),
+        ]
 
 
 class FriendRequest(models.Model):
@@ -456,6 +626,11 @@ class Connection(models.Model):
     
     class Meta:
         unique_together = ('sender', 'receiver')
+        indexes = [
+            # Connection inbox: received, sent and accepted lists
+            models.Index(fields=['receiver', 'status', 'created_at']),
+            models.Index(fields=['sender', 'status', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.sender.get_display_name} -> {self.receiver.get_display_name} ({self.status})"
@@ -472,16 +647,33 @@ class StudyGroup(models.Model):
     members = models.ManyToManyField(User, related_name='study_groups')
     
     max_members = models.PositiveIntegerField(default=20)
+    members_count = models.PositiveIntegerField(default=0)  # Maintained by social.study_groups
     is_public = models.BooleanField(default=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Directory filters; id keeps each filter's pages in index order
+            models.Index(fields=['course_code', 'id']),
+            models.Index(fields=['subject', 'id']),
+        ]
+    
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        from .study_groups import normalize_course_code
+        self.course_code = normalize_course_code(self.course_code)
+        super().save(*args, **kwargs)
+    
     @property
     def member_count(self):
-        return self.members.count()
+        return self.members_count
+    
+    @property
+    def is_full(self):
+        return self.members_count >= self.max_members
 
 
 class Notification(models.Model):
@@ -494,6 +686,7 @@ class Notification(models.Model):
         ('endorsement', 'Skill Endorsed'),
         ('mention', 'Mentioned in Post'),
         ('group_invite', 'Study Group Invite'),
+        ('event', 'Event Update'),
     ]
     
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
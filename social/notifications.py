@@ -0,0 +1,28 @@
+"""
+Batched notification delivery
+"""
+
+from .models import Notification
+
+
+def notify_users(recipients, sender, notification_type, message):
+    """Notify many users with a single bulk INSERT
+
+    recipients may be users or user ids; the sender is never notified about
+    their own actions and duplicates are collapsed.
+    """
+    sender_id = getattr(sender, 'pk', sender)
+    recipient_ids = {getattr(recipient, 'pk', recipient) for recipient in recipients}
+    recipient_ids.discard(sender_id)
+    if not recipient_ids:
+        return []
+
+    return Notification.objects.bulk_create([
+        Notification(
+            recipient_id=recipient_id,
+            sender_id=sender_id,
+            notification_type=notification_type,
+            message=message,
+        )
+        for recipient_id in sorted(recipient_ids)
+    ])
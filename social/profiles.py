@@ -0,0 +1,106 @@
+"""
+Profile page assembly
+
+A profile is read far more often than it is edited, so the viewer-independent
+part (the user's public fields, experiences, education and skills with
+endorser previews) is loaded in five queries and cached whole. The user is
+cached as a plain dict of the fields the profile templates show, never the
+model instance with its password hash and email. Edits to any of those
+rows delete the cached copy once their transaction commits (see
+social.signals); CACHES is shared by every process, so the delete reaches
+all web workers. Everything that depends on the viewer is cheap to compute
+per request: follow, friend and connection state between viewer and profile
+come from one social.relationships query, and the viewer's endorsements are
+one more query.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from .endorsements import profile_skills
+from .models import SkillEndorsement
+from .relationships import Relationship, relationships
+
+User = get_user_model()
+
+PROFILE_CACHE_SECONDS = 10 * 60
+# Bump when the cached layout changes so old entries are never read
+PROFILE_CACHE_VERSION = 2
+
+# CustomUser fields the profile templates show
+PROFILE_USER_FIELDS = [
+    'id', 'username', 'first_name', 'last_name', 'student_id', 'department', 'batch', 'graduation_year',
+    'gpa', 'headline', 'bio', 'interests', 'location', 'website', 'linkedin_url', 'github_username',
+    'is_verified', 'date_joined', 'followers_count', 'following_count', 'posts_count',
+]
+
+
+def _cache_key(user_id):
+    return f'profile:v{PROFILE_CACHE_VERSION}:{user_id}'
+
+
+def _public_user(user):
+    """The template-facing part of user as a plain dict"""
+    data = {field: getattr(user, field) for field in PROFILE_USER_FIELDS}
+    data.update(
+        profile_picture=user.profile_picture.name,
+        get_profile_picture=user.get_profile_picture(),
+        get_display_name=user.get_display_name,
+        get_department_display=user.get_department_display(),
+    )
+    return data
+
+
+def load_profile(user_id):
+    """The cached profile of user_id as a dict, or None if there is no such user
+
+    Keys: user (a dict, see _public_user), experiences, education, skills.
+    Skills carry top_endorsers.
+    """
+    key = _cache_key(user_id)
+    profile = cache.get(key)
+    if profile is None:
+        user = User.objects.filter(pk=user_id).only(*PROFILE_USER_FIELDS, 'profile_picture', 'image_variants').first()
+        if user is None:
+            return None
+        profile = {
+            'user': _public_user(user),
+            'experiences': list(user.experiences.all()),
+            'education': list(user.education.all()),
+            'skills': profile_skills(user),
+        }
+        cache.set(key, profile, PROFILE_CACHE_SECONDS)
+    return profile
+
+
+def invalidate_profile(user_id):
+    """Drop the cached profile once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(_cache_key(user_id)))
+
+
+def profile_for_viewer(user_id, viewer):
+    """load_profile plus the viewer's relationship to the profile"""
+    profile = load_profile(user_id)
+    if profile is None:
+        return None
+    user_id = profile['user']['id']
+    relationship = relationships(viewer, [user_id]).get(user_id) or Relationship()
+    profile = dict(
+        profile,
+        relationship=relationship,
+        is_connected=relationship.is_connected,
+        pending_request=relationship.connection == 'sent',
+        incoming_request=relationship.connection == 'received',
+    )
+
+    endorsed = set()
+    if viewer.pk != user_id and profile['skills']:
+        endorsed = set(
+            SkillEndorsement.objects.filter(
+                endorser=viewer, user_skill__in=[user_skill.pk for user_skill in profile['skills']]
+            ).values_list('user_skill_id', flat=True)
+        )
+    for user_skill in profile['skills']:
+        user_skill.endorsed_by_viewer = user_skill.pk in endorsed
+    return profile
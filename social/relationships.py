@@ -0,0 +1,90 @@
+"""
+Bulk relationship lookups
+
+Which buttons a profile card shows depends on four tables: Follow,
+Friendship, FriendRequest and Connection, each of which can point either
+way between two students. relationships() resolves all of them for a
+viewer and a whole list of other students with one UNION ALL query. Each
+branch filters on the viewer's side of an indexed foreign key.
+"""
+
+from django.db.models import CharField, F, Q, Value
+
+from .models import Connection, Follow, FriendRequest, Friendship
+
+
+class Relationship:
+    """How the viewer relates to one other student
+
+    friend_request and connection are None, 'sent' or 'received' for pending
+    requests; connection is 'connected' once accepted.
+    """
+
+    def __init__(self):
+        self.following = False
+        self.followed_by = False
+        self.friend = False
+        self.friend_request = None
+        self.connection = None
+
+    @property
+    def is_connected(self):
+        return self.connection == 'connected'
+
+    def __repr__(self):
+        return f'<Relationship {self.__dict__}>'
+
+
+def _pairs(model, kind, left, right, viewer_id, user_ids, statuses=None):
+    """(kind, left_id, right_id, status) rows between viewer and user_ids, either way round"""
+    rows = model.objects.filter(
+        Q(**{left: viewer_id, f'{right}__in': user_ids}) | Q(**{right: viewer_id, f'{left}__in': user_ids})
+    )
+    if statuses:
+        rows = rows.filter(status__in=statuses)
+    return (
+        rows.annotate(kind=Value(kind, output_field=CharField()), row_status=F('status') if statuses else Value(''))
+        .values_list('kind', f'{left}_id', f'{right}_id', 'row_status')
+        .order_by()
+    )
+
+
+def relationships(viewer, user_ids):
+    """{user_id: Relationship} for every id in user_ids, in one query"""
+    user_ids = {int(user_id) for user_id in user_ids}
+    user_ids.discard(viewer.pk)
+    result = {user_id: Relationship() for user_id in user_ids}
+    if not user_ids:
+        return result
+
+    rows = _pairs(Follow, 'follow', 'follower', 'following', viewer.pk, user_ids).union(
+        _pairs(Friendship, 'friend', 'user1', 'user2', viewer.pk, user_ids),
+        _pairs(FriendRequest, 'friend_request', 'sender', 'receiver', viewer.pk, user_ids, ['pending']),
+        _pairs(Connection, 'connection', 'sender', 'receiver', viewer.pk, user_ids, ['pending', 'accepted']),
+        all=True,
+    )
+    for kind, left_id, right_id, status in rows:
+        outgoing = left_id == viewer.pk
+        relationship = result[right_id if outgoing else left_id]
+        if kind == 'follow':
+            if outgoing:
+                relationship.following = True
+            else:
+                relationship.followed_by = True
+        elif kind == 'friend':
+            relationship.friend = True
+        elif kind == 'friend_request':
+            relationship.friend_request = 'sent' if outgoing else 'received'
+        elif status == 'accepted':
+            relationship.connection = 'connected'
+        elif relationship.connection is None:
+            relationship.connection = 'sent' if outgoing else 'received'
+    return result
+
+
+def attach_relationships(viewer, users):
+    """Set user.relationship on each of users; one query"""
+    found = relationships(viewer, [user.pk for user in users])
+    for user in users:
+        user.relationship = found.get(user.pk) or Relationship()
+    return users
@@ -0,0 +1,52 @@
+"""
+Cache invalidation for social.profiles, and hashtag cleanup for deleted posts
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from accounts.signals import social_counters_adjusted
+
+from .hashtags import unindex_post_hashtags
+from .models import Post, UserSkill
+from .profiles import invalidate_profile
+
+
+def _user_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_profile(instance.pk)
+
+
+def _profile_row_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_profile(instance.user_id)
+
+
+def _endorsement_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Endorsements removed along with their skill find nothing here; the
+    # skill's own post_delete covers them
+    user_id = UserSkill.objects.filter(pk=instance.user_skill_id).values_list('user_id', flat=True).first()
+    if user_id:
+        invalidate_profile(user_id)
+
+
+for _signal, _action in ((post_save, 'save'), (post_delete, 'delete')):
+    _signal.connect(_user_changed, sender=settings.AUTH_USER_MODEL,
+                    dispatch_uid=f'profile_cache_user_{_action}')
+    for _model in ('social.Experience', 'social.Education', 'social.UserSkill'):
+        _signal.connect(_profile_row_changed, sender=_model,
+                        dispatch_uid=f'profile_cache_{_model}_{_action}')
+    _signal.connect(_endorsement_changed, sender='social.SkillEndorsement',
+                    dispatch_uid=f'profile_cache_endorsement_{_action}')
+
+social_counters_adjusted.connect(_user_changed, dispatch_uid='profile_cache_counters')
+
+
+def _post_deleted(sender, instance, **kwargs):
+    # Before the cascade removes the through-rows the tags are read from
+    unindex_post_hashtags(instance)
+
+
+pre_delete.connect(_post_deleted, sender=Post, dispatch_uid='hashtags_post_delete')
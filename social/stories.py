@@ -0,0 +1,198 @@
+"""
+Active story lookups and expiry
+
+Stories live for 24 hours (Story.expires_at). Active-story queries filter on
+expires_at so they are served by the (author, expires_at) index, and expired
+rows, their viewer rows and their media are removed in batches by the
+hourly social.purge_expired_stories job.
+
+Story views are buffered in the shared cache and written in bulk:
+record_story_view costs a few cache operations and no queries of its own,
+and the social.flush_story_views job, run every minute by the worker,
+inserts the viewer rows with one bulk INSERT and bumps views_count with one
+UPDATE grouped by count.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, IntegerField, Max, Value, When
+from django.utils import timezone
+
+from uploads.images import delete_variants
+
+from .models import Story
+
+STORY_LIFETIME = timedelta(hours=24)
+
+# Authors shown in the feed's story tray
+STORY_TRAY_LIMIT = 30
+
+MB = 1024 * 1024
+
+# Limits enforced while a story upload streams in; longer videos go through
+# the resumable 'story_video' upload (uploads.chunked)
+STORY_UPLOAD_LIMITS = {
+    'image': 10 * MB,
+    'video': 50 * MB,
+}
+MAX_STORY_VIDEO_SECONDS = 60
+
+PURGE_BATCH_SIZE = 500
+
+VIEW_KEY_PREFIX = 'story-views'
+# Seen markers and buffered views live as long as a story can
+VIEW_EVENT_TIMEOUT = 24 * 60 * 60
+
+
+def active_stories(now=None):
+    """Unexpired stories whose media has finished processing"""
+    return Story.objects.filter(expires_at__gt=now or timezone.now(), media_status='ready')
+
+
+def story_tray(author_ids, limit=STORY_TRAY_LIMIT, first_author=None, now=None):
+    """One entry per author with active stories, most recently updated first
+
+    Returns the latest Story of each author with an extra active_count
+    attribute. first_author (usually the viewer) is pinned to the front.
+    Two queries regardless of how many stories the authors have posted.
+    """
+    author_ids = set(author_ids)
+    if first_author is not None:
+        author_ids.add(first_author.pk)
+    if not author_ids:
+        return []
+
+    # Ids grow with created_at, so Max('id') is each author's latest story
+    groups = list(
+        active_stories(now).filter(author__in=author_ids)
+        .values('author').annotate(latest_id=Max('id'), active_count=Count('id'))
+        .order_by('-latest_id')[:limit]
+    )
+    latest = Story.objects.select_related('author').in_bulk([group['latest_id'] for group in groups])
+
+    tray = []
+    for group in groups:
+        story = latest.get(group['latest_id'])
+        if story is None:
+            continue
+        story.active_count = group['active_count']
+        tray.append(story)
+    if first_author is not None:
+        tray.sort(key=lambda story: story.author_id != first_author.pk)
+    return tray
+
+
+def purge_expired_stories(batch_size=PURGE_BATCH_SIZE, now=None):
+    """Delete expired stories, their viewer rows and their media files
+
+    Works in batches so a backlog never turns into one huge transaction.
+    Returns the number of stories deleted.
+    """
+    now = now or timezone.now()
+    storage = Story._meta.get_field('image').storage
+    deleted = 0
+    while True:
+        batch = list(
+            Story.objects.filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', 'image', 'video')[:batch_size]
+        )
+        if not batch:
+            return deleted
+
+        ids = [story_id for story_id, _, _ in batch]
+        # Viewer through-rows are removed by the same cascade
+        Story.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+        # Files go only once the rows are gone
+        for _, image, video in batch:
+            if image:
+                delete_variants(image, storage)
+                storage.delete(image)
+            if video:
+                storage.delete(video)
+
+
+
+def _view_key(*parts):
+    return ':'.join([VIEW_KEY_PREFIX, *map(str, parts)])
+
+
+def record_story_view(story, user):
+    """Buffer a view of story by user; returns True for a first view
+
+    Repeat views are dropped by the seen marker. The view is appended to a
+    cache-backed sequence: head counts the views recorded, flushed the ones
+    written, and event:N holds the Nth (story_id, user_id) pair.
+    """
+    if story.author_id == user.pk:
+        return False
+    if not cache.add(_view_key('seen', story.pk, user.pk), 1, VIEW_EVENT_TIMEOUT):
+        return False
+
+    cache.add(_view_key('head'), 0, None)
+    # incr is only atomic on some backends; add() refuses a slot another
+    # process took, so a clash moves on to the next number
+    while not cache.add(_view_key('event', cache.incr(_view_key('head'))), (story.pk, user.pk), VIEW_EVENT_TIMEOUT):
+        pass
+    return True
+
+
+def flush_story_views():
+    """Write buffered views to the database; returns the number of new views"""
+    lock = _view_key('flush-lock')
+    if not cache.add(lock, 1, 60):
+        return 0  # Another flush is running
+    try:
+        flushed = cache.get(_view_key('flushed')) or 0
+        head = cache.get(_view_key('head')) or 0
+        if head < flushed:
+            flushed = 0  # The counters were evicted and head started over
+        if head <= flushed:
+            return 0
+        keys = [_view_key('event', sequence) for sequence in range(flushed + 1, head + 1)]
+        pairs = set(cache.get_many(keys).values())
+        cache.set(_view_key('flushed'), head, None)
+        cache.delete_many(keys)
+        return _write_views(pairs)
+    finally:
+        cache.delete(lock)
+
+
+def _write_views(pairs):
+    if not pairs:
+        return 0
+    Viewer = Story.viewers.through
+    user_column = f'{Story.viewers.field.m2m_reverse_field_name()}_id'
+    story_ids = {story_id for story_id, _ in pairs}
+
+    # Skip pairs already stored (the cache was cleared since) and stories
+    # purged in the meantime
+    existing = set(
+        Viewer.objects.filter(story_id__in=story_ids, **{f'{user_column}__in': {user_id for _, user_id in pairs}})
+        .values_list('story_id', user_column)
+    )
+    live = set(Story.objects.filter(id__in=story_ids).values_list('id', flat=True))
+    new = [pair for pair in pairs if pair[0] in live and pair not in existing]
+    if not new:
+        return 0
+
+    Viewer.objects.bulk_create(
+        [Viewer(story_id=story_id, **{user_column: user_id}) for story_id, user_id in new],
+        ignore_conflicts=True,
+    )
+
+    views = defaultdict(int)
+    for story_id, _ in new:
+        views[story_id] += 1
+    ids_by_count = defaultdict(list)
+    for story_id, count in views.items():
+        ids_by_count[count].append(story_id)
+    Story.objects.filter(id__in=views).update(views_count=F('views_count') + Case(
+        *[When(id__in=ids, then=Value(count)) for count, ids in ids_by_count.items()],
+        output_field=IntegerField(),
+    ))
+    return len(new)
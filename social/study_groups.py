@@ -0,0 +1,92 @@
+"""
+Study group membership and the study group directory
+
+StudyGroup.members_count is kept in step with the members M2M by the join
+and leave functions here. A join claims a seat with a conditional UPDATE
+
+    UPDATE studygroup SET members_count = members_count + 1
+    WHERE id = %s AND members_count < max_members
+
+so max_members holds under concurrent joins. The directory filters public
+groups by course code or subject over the (course_code, id) and
+(subject, id) indexes and pages with an id keyset. Course codes
+are stored normalized so a lookup is a single equality match.
+"""
+
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import StudyGroup
+
+DIRECTORY_PAGE_SIZE = 24
+
+Member = StudyGroup.members.through
+
+
+def normalize_course_code(code):
+    """'cse 101 ' -> 'CSE101'"""
+    return re.sub(r'\s+', '', code or '').upper()
+
+
+def join_study_group(group, user):
+    """Add user to group; returns 'joined', 'member' or 'full'"""
+    if Member.objects.filter(studygroup=group, customuser=user).exists():
+        return 'member'
+    try:
+        with transaction.atomic():
+            claimed = StudyGroup.objects.filter(
+                pk=group.pk, members_count__lt=F('max_members')
+            ).update(members_count=F('members_count') + 1)
+            if not claimed:
+                return 'full'
+            # The M2M's unique constraint rolls the seat back on a double join
+            Member.objects.create(studygroup=group, customuser=user)
+    except IntegrityError:
+        return 'member'
+    return 'joined'
+
+
+def leave_study_group(group, user):
+    """Remove user from group; returns True if they were a member"""
+    with transaction.atomic():
+        deleted, _ = Member.objects.filter(studygroup=group, customuser=user).delete()
+        if deleted:
+            StudyGroup.objects.filter(pk=group.pk).update(members_count=Greatest(F('members_count') - 1, 0))
+    return bool(deleted)
+
+
+def study_group_directory(course_code='', subject='', after=None, page_size=DIRECTORY_PAGE_SIZE):
+    """One page of public study groups, newest first; returns (groups, next_id)
+
+    One query per page. after is the last id of the previous page.
+    """
+    groups = StudyGroup.objects.filter(is_public=True)
+    course_code = normalize_course_code(course_code)
+    if course_code:
+        groups = groups.filter(course_code=course_code)
+    if subject:
+        groups = groups.filter(subject=subject)
+    if after:
+        groups = groups.filter(id__lt=after)
+    groups = list(groups.select_related('creator').order_by('-id')[:page_size + 1])
+    next_id = groups[page_size - 1].pk if len(groups) > page_size else None
+    return groups[:page_size], next_id
+
+
+def directory_subjects():
+    """Distinct subjects of public study groups, for the filter menu"""
+    return list(
+        StudyGroup.objects.filter(is_public=True).order_by('subject')
+        .values_list('subject', flat=True).distinct()
+    )
+
+
+def joined_study_group_ids(user, groups):
+    """Ids among groups that user belongs to, in one query"""
+    return set(
+        Member.objects.filter(customuser=user, studygroup__in=[group.pk for group in groups])
+        .values_list('studygroup_id', flat=True)
+    )
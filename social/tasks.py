@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from jobs.queue import task
+from uploads.images import generate_variants, make_placeholder, record_variants, strip_metadata, variant_record
+from uploads.video import probe_video
+
+from .models import Post, PostImage, Story
+from .stories import MAX_STORY_VIDEO_SECONDS, STORY_LIFETIME, flush_story_views, purge_expired_stories
+from .trending import purge_usage_buckets, refresh_trending
+
+
+def _mark_media_failed(post_id):
+    Post.objects.filter(pk=post_id).update(media_status='failed')
+
+
+@task('social.process_post_media', on_failure=_mark_media_failed)
+def process_post_media(post_id):
+    """Process a post's images and video off the request path, then mark it ready"""
+    post = Post.objects.filter(pk=post_id).only('id', 'video', 'media_info').first()
+    if post is None:
+        return
+
+    images = list(PostImage.objects.filter(post_id=post_id))
+    for image in images:
+        strip_metadata(image.image)
+        variants = generate_variants(image.image)
+        if variants:
+            image.image_variants = {'image': variant_record(image.image, variants)}
+        image.width, image.height, image.placeholder = make_placeholder(image.image)
+    if images:
+        PostImage.objects.bulk_update(images, ['width', 'height', 'placeholder', 'image_variants'])
+
+    media_info = {}
+    if post.video:
+        media_info['video'] = probe_video(post.video.path)
+
+    Post.objects.filter(pk=post_id).update(media_status='ready', media_info=media_info)
+
+
+def _mark_story_failed(story_id):
+    Story.objects.filter(pk=story_id).update(media_status='failed')
+
+
+@task('social.process_story_media', on_failure=_mark_story_failed)
+def process_story_media(story_id):
+    """Process a new story's image or video, then publish it for 24 hours"""
+    story = Story.objects.filter(pk=story_id).only('id', 'image', 'video', 'image_variants').first()
+    if story is None:
+        return
+
+    if story.image:
+        strip_metadata(story.image)
+        record_variants(story, {'image': generate_variants(story.image)})
+
+    media_info = {}
+    if story.video:
+        media_info['video'] = probe_video(story.video.path)
+        duration = media_info['video'].get('duration')
+        if duration and duration > MAX_STORY_VIDEO_SECONDS:
+            Story.objects.filter(pk=story_id).update(media_status='failed', media_info=media_info)
+            return
+
+    # The story's 24 hours start once it is visible
+    Story.objects.filter(pk=story_id).update(
+        media_status='ready',
+        media_info=media_info,
+        expires_at=timezone.now() + STORY_LIFETIME,
+    )
+
+
+@task('social.refresh_trending', every=timedelta(minutes=10))
+def refresh_trending_hashtags():
+    """Rematerialize the trending lists and drop usage buckets too old to count"""
+    refresh_trending()
+    purge_usage_buckets()
+
+
+@task('social.purge_expired_stories', every=timedelta(hours=1))
+def purge_stories():
+    """Delete stories past their expires_at with their viewer rows and media"""
+    purge_expired_stories()
+
+
+@task('social.flush_story_views', every=timedelta(minutes=1))
+def flush_buffered_story_views():
+    """Write the story views buffered in the cache since the last run"""
+    flush_story_views()
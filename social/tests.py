@@ -0,0 +1,406 @@
+import io
+import os
+import pickle
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import claim_jobs, run_job
+from uploads.chunked import part_path, start_upload, write_chunk
+from uploads.models import UploadSession
+from uploads.testing import MediaTestCase, make_photo
+
+from .groups import group_directory, join_group, leave_group, publish_group_post
+from .models import Follow, Group, Hashtag, HashtagUsageBucket, Post, PostImage, Story, TrendingHashtag
+from .profiles import _cache_key
+from .stories import flush_story_views, story_tray
+from .trending import compute_trending, refresh_trending
+
+User = get_user_model()
+
+
+def make_student(n, **extra):
+    student_id = str(222000000 + n)
+    return User.objects.create_user(
+        username=student_id,
+        email=f'{student_id}@student.green.ac.bd',
+        password='campus-pass-123',
+        student_id=student_id,
+        department='CSE',
+        batch='Fall 2023',
+        **extra,
+    )
+
+
+class TrendingViewTests(TestCase):
+    def setUp(self):
+        self.student = make_student(1)
+        self.client.force_login(self.student)
+
+    def test_empty_list(self):
+        response = self.client.get(reverse('social:trending'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Nothing is trending yet')
+
+    def test_lists_materialized_hashtags(self):
+        hashtag = Hashtag.objects.create(name='finals')
+        TrendingHashtag.objects.create(
+            window='7d', rank=1, hashtag=hashtag, score=4.2, uses=5, computed_at=timezone.now()
+        )
+        response = self.client.get(reverse('social:trending'), {'window': '7d'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '#finals')
+        self.assertContains(response, '5 posts')
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.student = make_student(1)
+        self.now = timezone.now()
+
+    def bucket(self, name, hours_ago, count):
+        hashtag, _ = Hashtag.objects.get_or_create(name=name)
+        hour = (self.now - timedelta(hours=hours_ago)).replace(minute=0, second=0, microsecond=0)
+        HashtagUsageBucket.objects.create(hashtag=hashtag, hour=hour, count=count)
+        return hashtag
+
+    def uses(self, name):
+        return sum(HashtagUsageBucket.objects.filter(hashtag__name=name).values_list('count', flat=True))
+
+    def test_recent_burst_outranks_older_volume(self):
+        steady = self.bucket('library', 20, 10)
+        burst = self.bucket('fest', 0, 4)
+        self.bucket('orientation', 30, 50)  # Outside the 24h window
+        ranked = compute_trending('24h', now=self.now)
+        self.assertEqual([(hashtag_id, uses) for hashtag_id, _, uses in ranked], [(burst.pk, 4), (steady.pk, 10)])
+        self.assertAlmostEqual(ranked[1][1], 10 * 0.5 ** (20 / 6))
+
+    def test_refresh_materializes_every_window(self):
+        self.bucket('fest', 0, 4)
+        self.bucket('orientation', 30, 50)
+        refresh_trending(now=self.now)
+        self.assertEqual(
+            list(TrendingHashtag.objects.order_by('window', 'rank').values_list('window', 'hashtag__name')),
+            [('24h', 'fest'), ('7d', 'orientation'), ('7d', 'fest')],
+        )
+
+    def test_edit_takes_removed_tags_out_of_trending(self):
+        post = Post.objects.create(author=self.student, content='#fest tonight #cse')
+        post.content = 'Tonight #cse'
+        post.save()
+        self.assertEqual((self.uses('fest'), self.uses('cse')), (0, 1))
+        self.assertEqual(Hashtag.objects.get(name='fest').usage_count, 0)
+
+    def test_delete_takes_tags_out_of_trending(self):
+        post = Post.objects.create(author=self.student, content='#fest tonight')
+        post.delete()
+        self.assertEqual(self.uses('fest'), 0)
+        self.assertEqual(Hashtag.objects.get(name='fest').usage_count, 0)
+
+
+class CreatePostMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student(1)
+        self.client.force_login(self.student)
+
+    def create_photo_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('social:create_post'), {'content': 'Campus at dawn', 'images': [make_photo()]})
+        return Post.objects.get(author=self.student)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_photo_post_is_processed_inline(self):
+        post = self.create_photo_post()
+        self.assertEqual(post.media_status, 'ready')
+        self.assertEqual(post.images.get().width, 64)
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.get(reverse('social:facebook_feed'))
+        self.assertContains(response, 'Campus at dawn')
+        self.assertNotContains(response, 'post-media post-media-processing')
+
+    @override_settings(JOBS_EAGER=False)
+    def test_photo_post_is_published_by_worker(self):
+        post = self.create_photo_post()
+        self.assertEqual(post.media_status, 'processing')
+
+        for job in claim_jobs('test-worker', limit=10):
+            self.assertEqual(run_job(job), 'done')
+        post.refresh_from_db()
+        self.assertEqual(post.media_status, 'ready')
+
+    def test_rejected_group_post_leaves_uploads_reusable(self):
+        content = b'Plain text lecture notes'
+        session = start_upload(self.student, 'post_document', 'notes.txt', len(content))
+        write_chunk(session, 0, io.BytesIO(content), len(content))
+        outsider_group = Group.objects.create(name='Robotics Club', description='Robots', creator=make_student(2))
+
+        response = self.client.post(reverse('social:create_post'), {
+            'content': 'Notes for everyone', 'group': outsider_group.pk, 'document_upload': str(session.pk),
+        })
+        self.assertRedirects(response, reverse('social:groups'), fetch_redirect_response=False)
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(UploadSession.objects.filter(pk=session.pk, status='complete').exists())
+        self.assertTrue(os.path.exists(part_path(session)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('social:create_post'), {'content': 'Notes', 'document_upload': str(session.pk)})
+        self.assertTrue(Post.objects.get(author=self.student).document)
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+
+
+    @override_settings(JOBS_EAGER=False)
+    def test_short_video_is_attached(self):
+        video = SimpleUploadedFile('clip.mp4', b'\x00\x00\x00\x18ftypmp42' + bytes(64), content_type='video/mp4')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('social:create_post'), {'content': 'Lab demo', 'images': [video]})
+        post = Post.objects.get(author=self.student)
+        self.assertTrue(post.video.name.endswith('.mp4'))
+        self.assertEqual(post.media_status, 'processing')
+        self.assertEqual(list(Job.objects.values_list('task', flat=True)), ['social.process_post_media'])
+
+    def test_invalid_files_are_rejected(self):
+        for upload in [
+            SimpleUploadedFile('clip.mp4', b'<html>not a video</html>', content_type='video/mp4'),
+            SimpleUploadedFile('photo.jpg', b'not an image', content_type='image/jpeg'),
+            SimpleUploadedFile('notes.pdf', b'%PDF-1.7', content_type='application/pdf'),
+        ]:
+            response = self.client.post(reverse('social:create_post'), {'content': 'Hi', 'images': [upload]})
+            self.assertRedirects(response, reverse('social:facebook_feed'), fetch_redirect_response=False)
+        self.assertFalse(Post.objects.exists())
+
+    def test_oversized_image_is_rejected(self):
+        with mock.patch('social.views.MAX_POST_IMAGE_SIZE', 100):
+            self.client.post(reverse('social:create_post'), {'content': 'Hi', 'images': [make_photo()]})
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(JOBS_EAGER=False)
+    def test_failed_image_insert_leaves_no_post(self):
+        with mock.patch.object(PostImage.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('social:create_post'), {'content': 'Hi', 'images': [make_photo()]})
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Job.objects.exists())
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.posts_count, 0)
+
+
+class StoryViewTests(TestCase):
+    def setUp(self):
+        self.author = make_student(1)
+        self.viewer = make_student(2)
+        self.story = Story.objects.create(author=self.author, content='Exam week!')
+        cache.clear()
+
+    def view(self, viewer=None):
+        self.client.force_login(viewer or self.viewer)
+        return self.client.get(reverse('social:view_story', args=[self.story.pk]))
+
+    def test_views_are_buffered_until_the_flush(self):
+        self.assertEqual(self.view().status_code, 200)
+        self.assertFalse(self.story.viewers.exists())
+        self.assertEqual(flush_story_views(), 1)
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.views_count, 1)
+        self.assertTrue(self.story.viewers.filter(pk=self.viewer.pk).exists())
+
+    def test_many_views_are_written_in_one_flush(self):
+        other = Story.objects.create(author=self.author, content='Library open late')
+        viewers = [make_student(number) for number in range(10, 15)]
+        for viewer in viewers:
+            self.view(viewer)
+            self.client.get(reverse('social:view_story', args=[other.pk]))
+
+        Viewer = Story.viewers.through
+        with mock.patch.object(Viewer.objects, 'bulk_create', wraps=Viewer.objects.bulk_create) as bulk_create:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(flush_story_views(), 10)
+        bulk_create.assert_called_once()
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "social_story"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(dict(Story.objects.values_list('pk', 'views_count')), {self.story.pk: 5, other.pk: 5})
+        self.assertEqual(flush_story_views(), 0)
+
+    def test_repeat_views_count_once(self):
+        self.view()
+        flush_story_views()
+        cache.clear()  # Even without the seen marker the viewer row decides
+        self.view()
+        flush_story_views()
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.views_count, 1)
+
+    def test_author_views_are_not_counted(self):
+        self.view(self.author)
+        self.assertEqual(flush_story_views(), 0)
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.views_count, 0)
+
+
+class CreateStoryTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_student(1)
+        self.friend = make_student(2)
+        Follow.objects.create(follower=self.friend, following=self.author)
+
+    def create_photo_story(self):
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('social:create_story'), {'image': make_photo()})
+        self.assertRedirects(response, reverse('social:feed'), fetch_redirect_response=False)
+        return Story.objects.get(author=self.author)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_photo_story_reaches_the_tray(self):
+        story = self.create_photo_story()
+        self.assertEqual(story.media_status, 'ready')
+        self.assertGreater(story.expires_at, timezone.now())
+        self.assertEqual([entry.pk for entry in story_tray([self.author.pk])], [story.pk])
+
+        self.client.force_login(self.friend)
+        response = self.client.get(reverse('social:facebook_feed'))
+        self.assertIn(story, response.context['active_stories'])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_photo_story_waits_for_the_worker(self):
+        story = self.create_photo_story()
+        self.assertEqual(story.media_status, 'processing')
+        self.assertIsNotNone(story.expires_at)
+        self.assertEqual(story_tray([self.author.pk]), [])
+
+        for job in claim_jobs('test-worker', limit=10):
+            self.assertEqual(run_job(job), 'done')
+        self.assertEqual([entry.pk for entry in story_tray([self.author.pk])], [story.pk])
+
+
+    def test_oversized_photo_is_refused_with_a_message(self):
+        self.client.force_login(self.author)
+        with mock.patch.dict('social.stories.STORY_UPLOAD_LIMITS', {'image': 100, 'video': 100}):
+            response = self.client.post(reverse('social:create_story'), {'image': make_photo()})
+        self.assertRedirects(response, reverse('social:create_story'), fetch_redirect_response=False)
+        [message] = get_messages(response.wsgi_request)
+        self.assertIn('too large for a story', str(message))
+        self.assertFalse(Story.objects.exists())
+
+    def test_oversized_body_is_refused_with_a_message(self):
+        self.client.force_login(self.author)
+        video = SimpleUploadedFile('clip.mp4', b'\0' * 200 * 1024, content_type='video/mp4')
+        with mock.patch.dict('social.stories.STORY_UPLOAD_LIMITS', {'image': 1024, 'video': 1024}):
+            response = self.client.post(reverse('social:create_story'), {'video': video})
+        self.assertRedirects(response, reverse('social:create_story'), fetch_redirect_response=False)
+        [message] = get_messages(response.wsgi_request)
+        self.assertIn('too large for a story', str(message))
+        self.assertFalse(Story.objects.exists())
+
+
+class PrivateGroupTests(TestCase):
+    def setUp(self):
+        self.member = make_student(1)
+        self.outsider = make_student(2)
+        self.group = Group.objects.create(
+            name='Thesis Circle', description='Drafts', creator=self.member, group_type='private'
+        )
+        join_group(self.group, self.member)
+        publish_group_post(Post(author=self.member, content='Chapter 2 draft'), self.group)
+
+    def test_members_see_posts_and_members(self):
+        self.client.force_login(self.member)
+        self.assertContains(self.client.get(reverse('social:group_detail', args=[self.group.pk])), 'Chapter 2 draft')
+        self.assertEqual(self.client.get(reverse('social:group_members', args=[self.group.pk])).status_code, 200)
+
+    def test_outsiders_see_neither(self):
+        self.client.force_login(self.outsider)
+        response = self.client.get(reverse('social:group_detail', args=[self.group.pk]))
+        self.assertContains(response, 'Only members can see posts in this group.')
+        self.assertNotContains(response, 'Chapter 2 draft')
+        self.assertEqual(self.client.get(reverse('social:group_members', args=[self.group.pk])).status_code, 404)
+
+
+class GroupDirectoryTests(TestCase):
+    def setUp(self):
+        self.creator = make_student(1)
+        self.robotics = Group.objects.create(name='Robotics Club', description='Robots', creator=self.creator)
+        self.debate = Group.objects.create(name='Debate Society', description='Motions', creator=self.creator)
+        join_group(self.robotics, self.creator)
+        cache.clear()
+
+    def directory(self):
+        return [(group['name'], group['members_count']) for group in group_directory(1)]
+
+    def test_joining_and_leaving_refresh_the_cached_pages(self):
+        self.assertEqual(self.directory(), [('Robotics Club', 1), ('Debate Society', 0)])
+        with self.captureOnCommitCallbacks(execute=True):
+            join_group(self.debate, make_student(2))
+            join_group(self.debate, make_student(3))
+        self.assertEqual(self.directory(), [('Debate Society', 2), ('Robotics Club', 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            leave_group(self.robotics, self.creator)
+        self.assertEqual(self.directory(), [('Debate Society', 2), ('Robotics Club', 0)])
+
+    def test_count_comes_from_the_cache(self):
+        self.assertEqual(group_directory(1).paginator.count, 2)
+        # bulk_create skips Group.save(), so nothing invalidates the cache
+        Group.objects.bulk_create([Group(name='Chess Club', description='Openings', creator=self.creator)])
+        self.assertEqual(group_directory(1).paginator.count, 2)
+
+
+class PrivateGroupMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = make_student(1)
+        group = Group.objects.create(name='Thesis Circle', description='Drafts', creator=self.member, group_type='private')
+        join_group(group, self.member)
+        post = publish_group_post(Post(author=self.member, content='Chapter 2 figures'), group)
+        self.url = PostImage.objects.create(post=post, image=make_photo()).image.url
+
+    def test_members_get_the_file_privately_cached(self):
+        self.client.force_login(self.member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+
+    def test_outsiders_and_visitors_get_404(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(make_student(2))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        self.student = make_student(1, headline='First-year CSE')
+        self.client.force_login(make_student(2))
+        cache.clear()
+
+    def test_cache_is_shared_between_processes(self):
+        self.assertIsInstance(caches['default'], DatabaseCache)
+
+    def test_edit_replaces_the_cached_profile(self):
+        url = reverse('social:professional_profile', args=[self.student.pk])
+        self.assertContains(self.client.get(url), 'First-year CSE')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.headline = 'ML research assistant'
+            self.student.save()
+        self.assertContains(self.client.get(url), 'ML research assistant')
+
+    def test_only_public_fields_are_cached(self):
+        response = self.client.get(reverse('social:professional_profile', args=[self.student.pk]))
+        self.assertContains(response, self.student.get_display_name)
+        cached = cache.get(_cache_key(self.student.pk))['user']
+        self.assertIsInstance(cached, dict)
+        self.assertEqual(cached['headline'], 'First-year CSE')
+        self.assertNotIn('password', cached)
+        self.assertNotIn('email', cached)
+        self.assertNotIn(self.student.password.encode(), pickle.dumps(cached))
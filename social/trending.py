@@ -0,0 +1,125 @@
+"""
+Time-decayed trending hashtags built from per-hour usage buckets
+
+Posts add their hashtag uses to the bucket of the hour they were created in,
+and take them back out when an edit or delete drops a tag. The periodic
+social.refresh_trending job (see social.tasks) materializes the top lists.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import HashtagUsageBucket, TrendingHashtag
+
+TRENDING_LIMIT = 50
+
+# window -> (span, half-life of a single use)
+TRENDING_WINDOWS = {
+    '24h': (timedelta(hours=24), timedelta(hours=6)),
+    '7d': (timedelta(days=7), timedelta(hours=36)),
+}
+
+DEFAULT_WINDOW = '24h'
+
+
+def _bucket_hour(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def record_hashtag_usage(uses, now=None):
+    """Add hashtag uses to their hourly buckets, or take them out
+
+    uses maps (hashtag_id, used_at) to a number of uses; negative numbers
+    remove uses, never taking a bucket below zero. Uses older than the
+    longest trending window are dropped since they can never affect a score.
+    """
+    now = now or timezone.now()
+    horizon = now - max(span for span, _ in TRENDING_WINDOWS.values())
+    counts = defaultdict(int)
+    for (hashtag_id, used_at), n in uses.items():
+        if used_at > horizon:
+            counts[hashtag_id, _bucket_hour(used_at)] += n
+    counts = {key: n for key, n in counts.items() if n}
+    if not counts:
+        return
+
+    HashtagUsageBucket.objects.bulk_create(
+        [HashtagUsageBucket(hashtag_id=hashtag_id, hour=hour) for (hashtag_id, hour), n in counts.items() if n > 0],
+        ignore_conflicts=True,
+    )
+
+    # One UPDATE per (hour, uses) pair; in practice almost always a single hour
+    ids_by_key = defaultdict(list)
+    for (hashtag_id, hour), n in counts.items():
+        ids_by_key[hour, n].append(hashtag_id)
+    for (hour, n), ids in ids_by_key.items():
+        expression = F('count') + n if n > 0 else Greatest(F('count') + n, 0)
+        HashtagUsageBucket.objects.filter(hashtag_id__in=ids, hour=hour).update(count=expression)
+
+
+def compute_trending(window=DEFAULT_WINDOW, now=None, limit=TRENDING_LIMIT):
+    """Return [(hashtag_id, score, uses)] for the top hashtags in a window
+
+    Each use contributes 0.5 ** (age / half_life), so a burst of recent uses
+    outranks a tag that has merely been popular for a long time.
+    """
+    span, half_life = TRENDING_WINDOWS[window]
+    now = now or timezone.now()
+    current_hour = _bucket_hour(now)
+
+    scores = defaultdict(float)
+    uses = defaultdict(int)
+    buckets = HashtagUsageBucket.objects.filter(hour__gt=now - span).values_list(
+        'hashtag_id', 'hour', 'count'
+    )
+    for hashtag_id, hour, count in buckets.iterator():
+        age = (current_hour - hour) / half_life
+        scores[hashtag_id] += count * 0.5 ** age
+        uses[hashtag_id] += count
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [(hashtag_id, score, uses[hashtag_id]) for hashtag_id, score in ranked]
+
+
+def refresh_trending(now=None, limit=TRENDING_LIMIT):
+    """Rebuild the materialized TrendingHashtag rows for every window"""
+    now = now or timezone.now()
+    rows = []
+    for window in TRENDING_WINDOWS:
+        for rank, (hashtag_id, score, uses) in enumerate(compute_trending(window, now, limit), 1):
+            rows.append(TrendingHashtag(
+                window=window,
+                rank=rank,
+                hashtag_id=hashtag_id,
+                score=score,
+                uses=uses,
+                computed_at=now,
+            ))
+
+    with transaction.atomic():
+        TrendingHashtag.objects.all().delete()
+        TrendingHashtag.objects.bulk_create(rows)
+    return rows
+
+
+def purge_usage_buckets(now=None):
+    """Drop buckets older than the longest trending window"""
+    now = now or timezone.now()
+    oldest = max(span for span, _ in TRENDING_WINDOWS.values())
+    return HashtagUsageBucket.objects.filter(hour__lte=now - oldest).delete()[0]
+
+
+def get_trending(window=DEFAULT_WINDOW, limit=TRENDING_LIMIT):
+    """Read the materialized trending list for a window in a single query"""
+    if window not in TRENDING_WINDOWS:
+        window = DEFAULT_WINDOW
+    return list(
+        TrendingHashtag.objects.filter(window=window)
+        .select_related('hashtag')
+        .order_by('rank')[:limit]
+    )
@@ -18,7 +18,16 @@ urlpatterns = [
     
     # Additional pages
     path('create-story/', facebook_views.create_story, name='create_story'),
+    path('story/<int:story_id>/', facebook_views.view_story, name='view_story'),
     path('groups/', facebook_views.groups_list, name='groups'),
+    path('groups/feed/', facebook_views.groups_feed, name='groups_feed'),
+    path('groups/<int:group_id>/', facebook_views.group_detail, name='group_detail'),
+    path('groups/<int:group_id>/join/', facebook_views.join_group, name='join_group'),
+    path('groups/<int:group_id>/leave/', facebook_views.leave_group, name='leave_group'),
+    path('groups/<int:group_id>/members/', facebook_views.group_members, name='group_members'),
+    path('study-groups/', views.study_groups, name='study_groups'),
+    path('study-groups/<int:group_id>/join/', views.join_study_group, name='join_study_group'),
+    path('study-groups/<int:group_id>/leave/', views.leave_study_group, name='leave_study_group'),
     path('friends/', facebook_views.friends_list, name='friends'),
     path('find-friends/', facebook_views.find_friends, name='find_friends'),
     path('marketplace/', facebook_views.marketplace, name='marketplace'),
@@ -27,7 +36,10 @@ urlpatterns = [
     # Original views
     path('user/<int:user_id>/follow/', views.follow_user, name='follow_user'),
     path('profile/<int:user_id>/', views.professional_profile, name='professional_profile'),
+    path('skills/<int:user_skill_id>/endorse/', views.endorse_skill, name='endorse_skill'),
     path('connect/<int:user_id>/', views.send_connection_request, name='send_connection_request'),
+    path('connections/', views.connection_inbox, name='connections'),
+    path('connections/<int:connection_id>/respond/', views.respond_to_connection, name='respond_to_connection'),
     path('trending/', views.trending_hashtags, name='trending'),
     path('notifications/', views.notifications, name='notifications'),
 ]
@@ -1,20 +1,42 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 from datetime import timedelta
+from functools import partial
+import os
 from .models import (
-    Post, PostLike, PostReaction, Comment, Follow, Hashtag, Experience, 
-    Education, Skill, UserSkill, Connection, StudyGroup, Notification,
-    Story, Group, Event, FriendRequest, Friendship
+    Post, PostImage, PostLike, PostReaction, Comment, Follow, Experience, 
+    Education, UserSkill, Connection, StudyGroup, Notification,
+    Group, Event, FriendRequest, Friendship, TrendingHashtag
 )
+from . import connections, endorsements
+from .groups import publish_group_post, visible_posts_q
+from .profiles import profile_for_viewer
+from .stories import story_tray
+from . import study_groups as study_group_service
+from .tasks import process_post_media
+from .trending import DEFAULT_WINDOW, TRENDING_WINDOWS, get_trending
+from jobs.queue import enqueue
+from uploads.chunked import MB, UPLOAD_KINDS, UploadError, completed_upload, finish_upload, sniff_upload
+from uploads.images import is_image
 
 User = get_user_model()
 
+MAX_POST_IMAGES = 10
+
+# Files attached to the post form itself; longer videos go through the
+# resumable 'post_video' upload (uploads.chunked)
+MAX_POST_IMAGE_SIZE = 10 * MB
+MAX_POST_VIDEO_SIZE = 100 * MB
+
 @login_required
 def facebook_feed(request):
     """Modern Facebook-like feed with stories, posts, and sidebar content"""
@@ -25,17 +47,14 @@ def facebook_feed(request):
     
     posts = Post.objects.filter(
         Q(author__in=all_connections) | Q(author=request.user),
+        visible_posts_q(request.user),
         is_public=True
     ).select_related('author').prefetch_related(
-        'reactions', 'comments__author', 'tagged_users'
+        'images', 'reactions', 'comments__author', 'tagged_users'
     ).order_by('-created_at')
     
-    # Get active stories (last 24 hours)
-    yesterday = timezone.now() - timedelta(hours=24)
-    active_stories = Story.objects.filter(
-        author__in=all_connections,
-        created_at__gte=yesterday
-    ).select_related('author').order_by('-created_at')
+    # Story tray: one entry per author with unexpired stories
+    active_stories = story_tray(all_connections, first_author=request.user)
     
     # Friend requests
     friend_requests = FriendRequest.objects.filter(
@@ -85,6 +104,39 @@ def facebook_feed(request):
     }
     return render(request, 'social/facebook_feed.html', context)
 
+def _sort_post_uploads(uploads):
+    """Split the post form's files into (images, videos) after checking each one
+
+    Raises UploadError naming the first file that is not an acceptable
+    photo or video.
+    """
+    images, videos = [], []
+    for upload in uploads:
+        content_type = upload.content_type or ''
+        if content_type.startswith('video/'):
+            extension = os.path.splitext(upload.name)[1].lower()
+            if extension not in UPLOAD_KINDS['post_video'][1] or not sniff_upload(upload):
+                raise UploadError(f'{upload.name} is not a supported video (MP4, MOV, WebM or MKV).')
+            if upload.size > MAX_POST_VIDEO_SIZE:
+                raise UploadError(
+                    f'{upload.name} is larger than {MAX_POST_VIDEO_SIZE // MB} MB; '
+                    'use the video button to upload it.'
+                )
+            videos.append(upload)
+        elif content_type.startswith('image/'):
+            if upload.size > MAX_POST_IMAGE_SIZE:
+                raise UploadError(f'{upload.name} is larger than {MAX_POST_IMAGE_SIZE // MB} MB.')
+            if not is_image(upload):
+                raise UploadError(f'{upload.name} is not a valid image.')
+            images.append(upload)
+        else:
+            raise UploadError(f'{upload.name} is not a photo or a video.')
+    if len(videos) > 1:
+        raise UploadError('A post can have one video.')
+    if len(images) > MAX_POST_IMAGES:
+        raise UploadError(f'A post can have up to {MAX_POST_IMAGES} photos.')
+    return images, videos
+
 def get_user_friends(user):
     """Get all friends of a user"""
     friendships1 = Friendship.objects.filter(user1=user).values_list('user2', flat=True)
@@ -97,33 +149,79 @@ def create_post(request):
     if request.method == 'POST':
         content = request.POST.get('content')
         post_type = request.POST.get('post_type', 'post')
-        images = request.FILES.getlist('images')  # Handle multiple images
+        uploads = request.FILES.getlist('images')  # Photos, and at most one short video
+        
+        # Checked before any upload is claimed, so a rejected post leaves the
+        # user's finished uploads untouched for another attempt
+        group = None
+        if request.POST.get('group'):
+            group = Group.objects.filter(
+                pk=request.POST['group'], groupmembership__user=request.user
+            ).first()
+            if group is None:
+                messages.error(request, 'You can only post in groups you have joined.')
+                return redirect('social:groups')
         
-        if content or images:
-            post = Post.objects.create(
+        try:
+            images, videos = _sort_post_uploads(uploads)
+        except UploadError as error:
+            messages.error(request, str(error))
+            if group:
+                return redirect('social:group_detail', group_id=group.pk)
+            return redirect('social:facebook_feed')
+        
+        # Large videos and documents arrive beforehand as resumable uploads
+        chunked = {}
+        try:
+            for field in ('video', 'document'):
+                upload_id = request.POST.get(f'{field}_upload')
+                if upload_id:
+                    chunked[field] = completed_upload(request.user, upload_id, f'post_{field}')
+        except UploadError as error:
+            for upload in chunked.values():
+                upload.close()
+            messages.error(request, str(error))
+            return redirect('social:facebook_feed')
+        
+        if content or uploads or chunked:
+            post = Post(
                 author=request.user,
                 content=content,
                 post_type=post_type
             )
-            
-            # Handle multiple images
-            if images:
-                image_urls = []
-                for image in images:
-                    # For now, just store the first image in the image field
-                    if not post.image:
-                        post.image = image
-                        post.save()
-                    # Store all image URLs in the images JSONField
-                    image_urls.append(image.url if hasattr(image, 'url') else str(image))
-                
-                if image_urls:
-                    post.images = image_urls
+            if videos:
+                post.video = videos[0]
+            for field, upload in chunked.items():
+                setattr(post, field, upload)
+            has_video = bool(videos) or 'video' in chunked
+            if images or has_video:
+                # Processed by a background worker; the feed shows a placeholder meanwhile
+                post.media_status = 'processing'
+            # All or nothing: a failure part way must not leave a post stuck
+            # in 'processing' with only some of its images
+            with transaction.atomic():
+                if group:
+                    publish_group_post(post, group)
+                else:
                     post.save()
+                
+                # Each file is written to storage once, all rows in one INSERT
+                PostImage.objects.bulk_create([
+                    PostImage(post=post, image=image, position=position)
+                    for position, image in enumerate(images)
+                ])
+                
+                request.user.adjust_social_counters(refresh=False, posts_count=1)
+                for upload in chunked.values():
+                    transaction.on_commit(partial(finish_upload, upload))
+                if images or has_video:
+                    transaction.on_commit(partial(enqueue, process_post_media, str(post.pk)))
             
             messages.success(request, 'Post created successfully!')
         else:
             messages.error(request, 'Post content cannot be empty.')
+        if group:
+            return redirect('social:group_detail', group_id=group.pk)
     
     return redirect('social:facebook_feed')
 
@@ -176,12 +274,10 @@ def follow_user(request, user_id):
         
         if not created:
             follow.delete()
-            request.user.following_count -= 1
-            user_to_follow.followers_count -= 1
+            delta = -1
             following = False
         else:
-            request.user.following_count += 1
-            user_to_follow.followers_count += 1
+            delta = 1
             following = True
             
             # Create notification
@@ -192,8 +288,8 @@ def follow_user(request, user_id):
                 message=f'{request.user.get_display_name} started following you'
             )
         
-        request.user.save()
-        user_to_follow.save()
+        request.user.adjust_social_counters(refresh=False, following_count=delta)
+        user_to_follow.adjust_social_counters(followers_count=delta)
         
         return JsonResponse({
             'following': following,
@@ -205,80 +301,171 @@ def follow_user(request, user_id):
 @login_required
 def professional_profile(request, user_id):
     """LinkedIn-like professional profile view"""
-    profile_user = get_object_or_404(User, id=user_id)
-    experiences = profile_user.experiences.all()
-    education = profile_user.education.all()
-    skills = UserSkill.objects.filter(user=profile_user).select_related('skill')
-    
-    # Check if users are connected
-    is_connected = Connection.objects.filter(
-        Q(sender=request.user, receiver=profile_user) |
-        Q(sender=profile_user, receiver=request.user),
-        status='accepted'
-    ).exists()
-    
-    # Check for pending connection request
-    pending_request = Connection.objects.filter(
-        sender=request.user,
-        receiver=profile_user,
-        status='pending'
-    ).exists()
+    profile = profile_for_viewer(user_id, request.user)
+    if profile is None:
+        raise Http404('No such student')
     
     context = {
-        'profile_user': profile_user,
-        'experiences': experiences,
-        'education': education,
-        'skills': skills,
-        'is_connected': is_connected,
-        'pending_request': pending_request,
+        'profile_user': profile['user'],
+        'experiences': profile['experiences'],
+        'education': profile['education'],
+        'skills': profile['skills'],
+        'is_connected': profile['is_connected'],
+        'pending_request': profile['pending_request'],
+        'incoming_request': profile['incoming_request'],
+        'relationship': profile['relationship'],
     }
     return render(request, 'social/professional_profile.html', context)
 
+@login_required
+@require_POST
+def endorse_skill(request, user_skill_id):
+    """Endorse a skill on someone's profile, or withdraw the endorsement"""
+    user_skill = get_object_or_404(UserSkill.objects.select_related('skill'), pk=user_skill_id)
+    if user_skill.user_id == request.user.pk:
+        return JsonResponse({'error': 'Cannot endorse your own skill'}, status=400)
+    
+    if request.POST.get('action') == 'withdraw':
+        endorsements.withdraw_endorsement(user_skill, request.user)
+        endorsed = False
+    else:
+        endorsements.endorse_skill(user_skill, request.user)
+        endorsed = True
+    
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        user_skill.refresh_from_db(fields=['endorsements_count'])
+        return JsonResponse({'endorsed': endorsed, 'endorsements_count': user_skill.endorsements_count})
+    return redirect('social:professional_profile', user_id=user_skill.user_id)
+
 @login_required
 def send_connection_request(request, user_id):
     """Send LinkedIn-like connection request"""
     if request.method == 'POST':
         receiver = get_object_or_404(User, id=user_id)
-        message = request.POST.get('message', '')
         
         if receiver == request.user:
             messages.error(request, 'Cannot connect with yourself.')
             return redirect('social:professional_profile', user_id=user_id)
         
-        # Check if connection already exists
-        existing_connection = Connection.objects.filter(
-            Q(sender=request.user, receiver=receiver) |
-            Q(sender=receiver, receiver=request.user)
-        ).first()
-        
-        if existing_connection:
-            messages.warning(request, 'Connection request already exists.')
-        else:
-            Connection.objects.create(
-                sender=request.user,
-                receiver=receiver,
-                message=message
-            )
-            
-            # Create notification
-            Notification.objects.create(
-                recipient=receiver,
-                sender=request.user,
-                notification_type='connection',
-                message=f'{request.user.get_display_name} sent you a connection request'
-            )
-            
+        state = connections.send_connection_request(request.user, receiver, request.POST.get('message', ''))
+        if state == 'sent':
             messages.success(request, 'Connection request sent successfully!')
+        elif state == 'connected':
+            messages.success(request, f'You are connected with {receiver.get_display_name}.')
+        else:
+            messages.warning(request, 'Connection request already exists.')
     
     return redirect('social:professional_profile', user_id=user_id)
 
+@login_required
+def connection_inbox(request):
+    """Received and sent connection requests, and accepted connections"""
+    box = request.GET.get('box', 'received')
+    if box not in connections.INBOXES:
+        box = 'received'
+    page, next_cursor = connections.connection_inbox(request.user, box, request.GET.get('after'))
+    
+    context = {
+        'connections': page,
+        'next_cursor': next_cursor,
+        'box': box,
+        'boxes': connections.INBOXES,
+        'pending_count': connections.pending_count(request.user),
+    }
+    return render(request, 'social/connections.html', context)
+
+@login_required
+@require_POST
+def respond_to_connection(request, connection_id):
+    """Accept, decline or withdraw a pending connection request"""
+    connection = get_object_or_404(
+        Connection.objects.select_related('sender'),
+        Q(receiver=request.user) | Q(sender=request.user),
+        pk=connection_id,
+    )
+    action = request.POST.get('action')
+    if action == 'accept':
+        done = connections.accept_connection(connection, request.user)
+        success = f'You are now connected with {connection.sender.get_display_name}.'
+    elif action == 'decline':
+        done = connections.decline_connection(connection, request.user)
+        success = 'Connection request declined.'
+    elif action == 'withdraw':
+        done = connections.withdraw_connection(connection, request.user)
+        success = 'Connection request withdrawn.'
+    else:
+        return JsonResponse({'error': 'Invalid action'}, status=400)
+    
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({'success': done})
+    if done:
+        messages.success(request, success)
+    else:
+        messages.warning(request, 'This request has already been answered.')
+    return redirect(_safe_next(request, 'social:connections'))
+
+@login_required
+def study_groups(request):
+    """Directory of public study groups, filterable by course code or subject"""
+    course_code = request.GET.get('course', '')
+    subject = request.GET.get('subject', '')
+    after = request.GET.get('after', '')
+    groups, next_id = study_group_service.study_group_directory(course_code, subject, after if after.isdigit() else None)
+    joined_ids = study_group_service.joined_study_group_ids(request.user, groups)
+    for group in groups:
+        group.joined = group.pk in joined_ids
+    
+    context = {
+        'study_groups': groups,
+        'next_id': next_id,
+        'course_code': study_group_service.normalize_course_code(course_code),
+        'subject': subject,
+        'subjects': study_group_service.directory_subjects(),
+    }
+    return render(request, 'social/study_groups.html', context)
+
+@login_required
+@require_POST
+def join_study_group(request, group_id):
+    """Join a study group if it has room"""
+    group = get_object_or_404(StudyGroup, pk=group_id, is_public=True)
+    result = study_group_service.join_study_group(group, request.user)
+    if result == 'joined':
+        messages.success(request, f'You joined {group.name}.')
+    elif result == 'full':
+        messages.error(request, f'{group.name} is full.')
+    return redirect(_safe_next(request, 'social:study_groups'))
+
+@login_required
+@require_POST
+def leave_study_group(request, group_id):
+    """Leave a study group"""
+    group = get_object_or_404(StudyGroup, pk=group_id)
+    if study_group_service.leave_study_group(group, request.user):
+        messages.success(request, f'You left {group.name}.')
+    return redirect(_safe_next(request, 'social:study_groups'))
+
+def _safe_next(request, default):
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return next_url
+    return default
+
 @login_required
 def trending_hashtags(request):
     """View trending hashtags"""
-    hashtags = Hashtag.objects.order_by('-usage_count')[:50]
+    window = request.GET.get('window', DEFAULT_WINDOW)
+    if window not in TRENDING_WINDOWS:
+        window = DEFAULT_WINDOW
+    
+    # Materialized by the periodic social.refresh_trending job
+    trending = get_trending(window)
     
     context = {
-        'hashtags': hashtags,
+        'hashtags': [entry.hashtag for entry in trending],
+        'trending': trending,
+        'window': window,
+        'windows': TrendingHashtag.WINDOWS,
     }
     return render(request, 'social/trending.html', context)
 
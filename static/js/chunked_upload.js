@@ -0,0 +1,120 @@
+// Resumable chunked uploads (see uploads/chunked.py)
+//
+// <input type="file" data-chunked-upload="post_video" data-target="video_upload">
+// uploads the chosen file in chunks and stores the finished upload id in the
+// hidden input named by data-target. Interrupted chunks are retried from the
+// offset the server reports.
+
+(function() {
+    const MAX_RETRIES = 5;
+
+    function csrfToken() {
+        const input = document.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    // Proxies and error pages answer with HTML; turn those into a readable message
+    async function readJson(response) {
+        const type = response.headers.get('Content-Type') || '';
+        if (!type.includes('application/json')) {
+            if (response.status === 413) {
+                throw new Error('This file is too large for the server to accept.');
+            }
+            throw new Error(response.ok
+                ? 'Unexpected response from the server.'
+                : `Upload failed (server error ${response.status}). Please try again.`);
+        }
+        return response.json();
+    }
+
+    async function startUpload(kind, file) {
+        const body = new FormData();
+        body.append('kind', kind);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        body.append('content_type', file.type);
+        const response = await fetch('/uploads/', {
+            method: 'POST',
+            headers: {'X-CSRFToken': csrfToken()},
+            body: body,
+        });
+        const data = await readJson(response);
+        if (!response.ok) {
+            throw new Error(data.error || 'Upload failed');
+        }
+        return data;
+    }
+
+    async function currentOffset(session) {
+        const response = await fetch(session.url);
+        return (await readJson(response)).offset;
+    }
+
+    async function uploadFile(kind, file, onProgress) {
+        const session = await startUpload(kind, file);
+        let offset = 0;
+        let retries = 0;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + session.chunk_size);
+            try {
+                const response = await fetch(session.url, {
+                    method: 'PUT',
+                    headers: {'X-CSRFToken': csrfToken(), 'Upload-Offset': String(offset)},
+                    body: chunk,
+                });
+                const data = await readJson(response);
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(data.error || 'Upload failed');
+                }
+                offset = data.offset;
+                retries = 0;
+            } catch (error) {
+                if (error instanceof TypeError && retries < MAX_RETRIES) {
+                    // Network error: wait, then resume from what the server has
+                    retries += 1;
+                    await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** retries));
+                    offset = await currentOffset(session);
+                    continue;
+                }
+                throw error;
+            }
+            onProgress(offset / file.size);
+        }
+        return session.id;
+    }
+
+    document.addEventListener('change', async function(event) {
+        const input = event.target;
+        if (!input.matches || !input.matches('input[data-chunked-upload]') || !input.files.length) {
+            return;
+        }
+        const form = input.form;
+        const target = form.querySelector(`input[name="${input.dataset.target}"]`);
+        const submit = form.querySelector('[type="submit"]');
+        const label = input.closest('label');
+        const status = label ? label.querySelector('span') : null;
+        const original = status ? status.textContent : '';
+
+        submit.disabled = true;
+        try {
+            target.value = await uploadFile(input.dataset.chunkedUpload, input.files[0], function(progress) {
+                if (status) {
+                    status.textContent = Math.floor(progress * 100) + '%';
+                }
+            });
+            if (status) {
+                status.textContent = input.files[0].name;
+            }
+        } catch (error) {
+            target.value = '';
+            if (status) {
+                status.textContent = original;
+            }
+            showToast(error.message, 'danger');
+        } finally {
+            // Only the upload id is submitted with the form
+            input.value = '';
+            submit.disabled = false;
+        }
+    });
+})();
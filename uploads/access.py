@@ -0,0 +1,70 @@
+"""
+Who may fetch an uploaded file through serve_media
+
+Uploads are public unless an app restricts the file field they are stored
+in. A restricted field comes with a function returning a Q of the rows a
+given user may see (user may be anonymous). A file is served when:
+
+    no restricted row references it          public
+    a restricted row the user can see does   private (not cached by proxies)
+    only hidden restricted rows do, but an
+    unrestricted row does too (deduplicated
+    content, see uploads.storage)            public
+
+Image variants are checked against the upload they were made from.
+"""
+
+import os
+
+from django.apps import apps
+from django.db import models
+from django.db.models import Q
+
+from .images import IMAGE_VARIANTS
+
+# (model, field_name, visible_q) registered with restrict_media()
+RESTRICTED_FIELDS = []
+
+
+def restrict_media(model, field_name, visible_q):
+    """Serve files stored in model.field_name only to users visible_q(user) selects
+
+    The field should have db_index=True; every media request looks it up.
+    """
+    RESTRICTED_FIELDS.append((model, field_name, visible_q))
+
+
+def _references(field_name, name):
+    """Q matching rows that store name, or the upload name is a variant of"""
+    root, extension = os.path.splitext(name)
+    stem, size = os.path.splitext(root)
+    q = Q(**{field_name: name})
+    if size[1:] in IMAGE_VARIANTS:
+        q |= Q(**{f'{field_name}__startswith': f'{stem}.'})
+    return q
+
+
+def media_access(name, user):
+    """'public', 'private', or None if user may not fetch the file"""
+    restricted = False
+    for model, field_name, visible_q in RESTRICTED_FIELDS:
+        rows = model._default_manager.filter(_references(field_name, name))
+        if not rows.exists():
+            continue
+        if rows.filter(visible_q(user)).exists():
+            return 'private'
+        restricted = True
+    if not restricted or _referenced_unrestricted(name):
+        return 'public'
+    return None
+
+
+def _referenced_unrestricted(name):
+    restricted = {(model, field_name) for model, field_name, _ in RESTRICTED_FIELDS}
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, models.FileField) or (model, field.name) in restricted:
+                continue
+            if model._default_manager.filter(_references(field.attname, name)).exists():
+                return True
+    return False
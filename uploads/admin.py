@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Blob, UploadSession
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'created_at')
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'kind', 'offset', 'size', 'status', 'updated_at')
+    list_filter = ('kind', 'status')
@@ -0,0 +1,262 @@
+"""
+Resumable chunked uploads for large videos and documents
+
+A client opens an UploadSession declaring the file name and total size,
+then PUTs the file in consecutive chunks with an Upload-Offset header. Each
+chunk is streamed from the request straight into its place in a single part
+file, so nothing is held in memory, no chunk files pile up and there is no
+assembly step. After a dropped connection the client asks for the current
+offset and carries on from there.
+
+Size is enforced on every chunk and the file's leading bytes are checked
+against its extension as soon as they arrive, so a bad upload is rejected
+before the rest of it is sent.
+
+A finished upload is attached to a model by assigning completed_upload() to
+the FileField; since it reports a temporary_file_path(), the storage moves
+the part file into place instead of copying it. Abandoned sessions are
+removed by `manage.py gc_media`.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import File
+from django.utils import timezone
+
+from .models import UploadSession
+
+MB = 1024 * 1024
+
+# kind -> (maximum size in bytes, allowed extensions)
+UPLOAD_KINDS = {
+    'post_video': (1024 * MB, {'.mp4', '.m4v', '.mov', '.webm', '.mkv'}),
+    'post_document': (50 * MB, {'.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.txt', '.zip'}),
+    'story_video': (100 * MB, {'.mp4', '.m4v', '.mov', '.webm'}),
+}
+
+MAX_CHUNK_SIZE = 8 * MB
+READ_SIZE = 64 * 1024
+
+# Sessions untouched for this long are considered abandoned
+SESSION_TTL = timedelta(hours=24)
+
+SNIFF_BYTES = 16
+
+_OLE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # Legacy Office documents
+_ZIP = b'PK\x03\x04'  # Office Open XML and zip archives
+_EBML = b'\x1a\x45\xdf\xa3'  # WebM / Matroska
+
+
+# Atoms an older QuickTime file may start with instead of 'ftyp'
+_QUICKTIME_ATOMS = {b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot'}
+
+
+def _is_iso_media(head):
+    return head[4:8] == b'ftyp'
+
+
+def _is_quicktime(head):
+    return head[4:8] in _QUICKTIME_ATOMS
+
+
+SIGNATURES = {
+    '.mp4': _is_iso_media,
+    '.m4v': _is_iso_media,
+    '.mov': _is_quicktime,
+    '.webm': lambda head: head.startswith(_EBML),
+    '.mkv': lambda head: head.startswith(_EBML),
+    '.pdf': lambda head: head.startswith(b'%PDF-'),
+    '.doc': lambda head: head.startswith(_OLE),
+    '.ppt': lambda head: head.startswith(_OLE),
+    '.xls': lambda head: head.startswith(_OLE),
+    '.docx': lambda head: head.startswith(_ZIP),
+    '.pptx': lambda head: head.startswith(_ZIP),
+    '.xlsx': lambda head: head.startswith(_ZIP),
+    '.zip': lambda head: head.startswith(_ZIP),
+    '.txt': lambda head: b'\x00' not in head,
+}
+
+
+def signature_matches(filename, head):
+    """Whether a file's leading bytes fit its extension (unknown types pass)"""
+    check = SIGNATURES.get(_extension(filename))
+    return check is None or check(head)
+
+
+def sniff_upload(uploaded):
+    """signature_matches() for an UploadedFile, leaving it rewound"""
+    uploaded.seek(0)
+    head = uploaded.read(SNIFF_BYTES)
+    uploaded.seek(0)
+    return signature_matches(uploaded.name, head)
+
+
+class UploadError(Exception):
+    """A rejected upload request; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def partial_dir():
+    # Must be on the same filesystem as MEDIA_ROOT for the final move to be a rename
+    return getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'partial'))
+
+
+def part_path(session):
+    return os.path.join(partial_dir(), f'{session.pk}.part')
+
+
+def _extension(filename):
+    return os.path.splitext(filename)[1].lower()
+
+
+def start_upload(user, kind, filename, size, content_type=''):
+    """Validate the declared file and open a session for it"""
+    if kind not in UPLOAD_KINDS:
+        raise UploadError('Unknown upload type.')
+    max_size, extensions = UPLOAD_KINDS[kind]
+    filename = os.path.basename(filename or '').strip()
+    if _extension(filename) not in extensions:
+        raise UploadError('This file type is not allowed.', status=415)
+    if size <= 0:
+        raise UploadError('The file is empty.')
+    if size > max_size:
+        raise UploadError(f'The file is larger than {max_size // MB} MB.', status=413)
+
+    session = UploadSession.objects.create(
+        user=user,
+        kind=kind,
+        filename=filename[:255],
+        content_type=content_type[:100],
+        size=size,
+    )
+    os.makedirs(partial_dir(), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length):
+    """Stream length bytes from stream into the part file at offset
+
+    Returns the new offset. A short read (client went away) still records
+    what arrived so the client can resume from there.
+    """
+    if session.status != 'open':
+        raise UploadError('This upload is already complete.', status=409, offset=session.offset)
+    if offset != session.offset:
+        raise UploadError('Unexpected offset.', status=409, offset=session.offset)
+    if length > MAX_CHUNK_SIZE:
+        raise UploadError('Chunk too large.', status=413, offset=session.offset)
+    if offset + length > session.size:
+        raise UploadError('More data than the declared size.', status=413, offset=session.offset)
+
+    received = 0
+    with open(part_path(session), 'r+b') as part:
+        part.seek(offset)
+        if offset < SNIFF_BYTES:
+            # Check the signature before accepting anything else
+            head = stream.read(min(length, SNIFF_BYTES - offset))
+            part.write(head)
+            received += len(head)
+            if offset + received >= min(SNIFF_BYTES, session.size):
+                part.flush()
+                _check_signature(session)
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            part.write(data)
+            received += len(data)
+
+    new_offset = offset + received
+    updated = UploadSession.objects.filter(pk=session.pk, offset=offset, status='open').update(
+        offset=new_offset,
+        status='complete' if new_offset == session.size else 'open',
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        # Another request for the same chunk won the race
+        session.refresh_from_db(fields=['offset', 'status'])
+        raise UploadError('Unexpected offset.', status=409, offset=session.offset)
+    session.offset = new_offset
+    session.status = 'complete' if new_offset == session.size else 'open'
+    return new_offset
+
+
+def _check_signature(session):
+    with open(part_path(session), 'rb') as part:
+        head = part.read(SNIFF_BYTES)
+    if not signature_matches(session.filename, head):
+        discard_upload(session)
+        raise UploadError('The file content does not match its type.', status=415)
+
+
+class CompletedUpload(File):
+    """A finished part file, moved rather than copied when saved to storage"""
+
+    def __init__(self, session):
+        self.session = session
+        self._path = part_path(session)
+        super().__init__(open(self._path, 'rb'), name=session.filename)
+        self.content_type = session.content_type
+        self.size = session.size
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def completed_upload(user, upload_id, kind):
+    """Return the user's finished upload as a File to assign to a FileField"""
+    try:
+        session = UploadSession.objects.get(pk=upload_id, user=user, kind=kind)
+    except (UploadSession.DoesNotExist, ValidationError):
+        raise UploadError('Upload not found.', status=404)
+    if session.status != 'complete':
+        raise UploadError('This upload is not finished yet.', status=409, offset=session.offset)
+    return CompletedUpload(session)
+
+
+def finish_upload(upload):
+    """Drop the session once its file has been saved to a model"""
+    upload.close()
+    discard_upload(upload.session)
+
+
+def discard_upload(session):
+    # The part file is gone if the storage moved it; it remains when the
+    # content already existed (deduplicated) or the upload was abandoned.
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    UploadSession.objects.filter(pk=session.pk).delete()
+
+
+def stale_uploads(now=None):
+    """Sessions nobody has written to within SESSION_TTL, finished or not"""
+    cutoff = (now or timezone.now()) - SESSION_TTL
+    return UploadSession.objects.filter(updated_at__lt=cutoff)
+
+
+def purge_stale_uploads(now=None):
+    """Remove stale sessions with their part files, plus part files without a session"""
+    stale = list(stale_uploads(now))
+    for session in stale:
+        discard_upload(session)
+
+    directory = partial_dir()
+    if os.path.isdir(directory):
+        cutoff = ((now or timezone.now()) - SESSION_TTL).timestamp()
+        names = {name for name in os.listdir(directory) if name.endswith('.part')}
+        live = {f'{pk}.part' for pk in UploadSession.objects.values_list('pk', flat=True)}
+        for name in names - live:
+            path = os.path.join(directory, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    return len(stale)
@@ -0,0 +1,50 @@
+"""
+Upload handlers that enforce per-field size limits while the body streams in
+"""
+
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Abort a multipart upload as soon as a file exceeds its field's limit
+
+    Install it before request.POST or request.FILES is touched:
+
+        request.upload_handlers.insert(0, SizeLimitUploadHandler(request, {'image': 10 * MB}))
+
+    The rest of the body is drained without being stored, so the view can
+    still answer normally (e.g. redirect with a message) on a connection the
+    client is waiting on. The offending field name is left in
+    request.upload_rejected (None when every file fit).
+    """
+
+    def __init__(self, request, limits, default_limit=None):
+        super().__init__(request)
+        self.limits = limits
+        self.default_limit = default_limit
+        self.received = 0
+        self.limit = None
+        request.upload_rejected = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Cheap early rejection when the whole body is bigger than any limit
+        ceiling = max([*self.limits.values(), self.default_limit or 0])
+        if content_length and content_length > ceiling + 64 * 1024:
+            self.request.upload_rejected = '__all__'
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        self.limit = self.limits.get(field_name, self.default_limit)
+        if self.request.upload_rejected:
+            raise StopUpload()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.limit is not None and self.received > self.limit:
+            self.request.upload_rejected = self.field_name
+            raise StopUpload()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -0,0 +1,282 @@
+"""
+Resized, re-encoded variants for uploaded images
+
+Each processed upload gets one file per size in IMAGE_VARIANTS, stored next
+to the original with the size as an extra suffix:
+
+    profile_pics/rahim.jpg -> profile_pics/rahim.avatar.jpg
+                              profile_pics/rahim.avatar.webp
+                              profile_pics/rahim.card.jpg ...
+
+The variants written are recorded on the owning model's image_variants
+JSON field (record_variants), so rendering an image builds its URLs from
+the row instead of asking the storage which files exist.
+"""
+
+import base64
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+# size -> (width, height, crop). Without crop the image is scaled to fit.
+IMAGE_VARIANTS = {
+    'avatar': (160, 160, True),
+    'card': (640, 640, False),
+    'full': (1600, 1600, False),
+}
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Formats whose originals are rewritten without metadata
+STRIPPABLE_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+
+def webp_enabled():
+    return getattr(settings, 'IMAGE_VARIANTS_WEBP', True) and features.check('webp')
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def variant_name(name, size, webp=False, has_alpha=False):
+    root, _ = os.path.splitext(name)
+    if webp:
+        extension = 'webp'
+    else:
+        extension = 'png' if has_alpha else 'jpg'
+    return f'{root}.{size}.{extension}'
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _resize(image, size):
+    width, height, crop = IMAGE_VARIANTS[size]
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.LANCZOS)
+    return resized
+
+
+def _replace(storage, name, data):
+    # Content-addressed storage overwrites derived files atomically; a
+    # delete() there would drop a reference to the blob instead.
+    if not getattr(storage, 'overwrite_in_place', False) and storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def generate_variants(fieldfile, sizes=None):
+    """Write every variant of an uploaded image; returns {size: {extension: name}}
+
+    The original is left untouched. EXIF orientation is applied before
+    resizing and no metadata is copied into the variants.
+    """
+    if not fieldfile:
+        return {}
+    storage = fieldfile.storage
+    try:
+        with storage.open(fieldfile.name, 'rb') as source:
+            image = Image.open(source)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        logger.warning('Could not generate variants for %s', fieldfile.name, exc_info=True)
+        return {}
+
+    has_alpha = _has_alpha(image)
+    if has_alpha:
+        image = image.convert('RGBA')
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    written = {}
+    with_webp = webp_enabled()
+    for size in sizes or IMAGE_VARIANTS:
+        resized = _resize(image, size)
+        formats = written[size] = {}
+        name = variant_name(fieldfile.name, size, has_alpha=has_alpha)
+        formats['png' if has_alpha else 'jpg'] = _replace(
+            storage, name, _encode(resized, 'PNG' if has_alpha else 'JPEG')
+        )
+        if with_webp:
+            name = variant_name(fieldfile.name, size, webp=True)
+            formats['webp'] = _replace(storage, name, _encode(resized, 'WEBP'))
+    return written
+
+
+def variant_record(fieldfile, variants):
+    """The image_variants entry for variants generated from fieldfile"""
+    return {'source': fieldfile.name, 'sizes': variants}
+
+
+def record_variants(instance, variants):
+    """Store {field_name: generate_variants() result} on instance.image_variants
+
+    One UPDATE of the row, which also bumps updated_at where the model has
+    one so processes polling for changes pick the new URLs up.
+    """
+    variants = {field_name: sizes for field_name, sizes in variants.items() if sizes}
+    if not variants:
+        return
+    record = dict(instance.image_variants)
+    for field_name, sizes in variants.items():
+        record[field_name] = variant_record(getattr(instance, field_name), sizes)
+    updates = {'image_variants': record}
+    if any(field.name == 'updated_at' for field in instance._meta.concrete_fields):
+        updates['updated_at'] = timezone.now()
+    type(instance)._default_manager.filter(pk=instance.pk).update(**updates)
+    instance.image_variants = record
+
+
+def delete_variants(fieldfile_or_name, storage=None):
+    """Remove every variant of an image, whatever format it was written in"""
+    name = getattr(fieldfile_or_name, 'name', fieldfile_or_name)
+    storage = storage or getattr(fieldfile_or_name, 'storage', default_storage)
+    if not name:
+        return
+    for size in IMAGE_VARIANTS:
+        for candidate in {
+            variant_name(name, size),
+            variant_name(name, size, has_alpha=True),
+            variant_name(name, size, webp=True),
+        }:
+            if storage.exists(candidate):
+                storage.delete(candidate)
+
+
+def recorded_variants(fieldfile):
+    """{size: {extension: name}} recorded for the file a field holds now"""
+    instance = getattr(fieldfile, 'instance', None)
+    record = (getattr(instance, 'image_variants', None) or {}).get(fieldfile.field.name)
+    # A replaced upload keeps the old record until its own variants exist
+    if not record or record.get('source') != fieldfile.name:
+        return {}
+    return record['sizes']
+
+
+def variant_url(fieldfile, size='full', webp=False):
+    """URL of a variant, falling back to the original until it exists
+
+    Built from the model's image_variants record, without storage lookups.
+    """
+    if not fieldfile:
+        return ''
+    formats = recorded_variants(fieldfile).get(size, {})
+    name = (webp and formats.get('webp')) or formats.get('jpg') or formats.get('png')
+    return fieldfile.storage.url(name) if name else fieldfile.url
+
+
+def is_image(uploaded):
+    """Whether an uploaded file is an image Pillow can read; leaves it rewound"""
+    try:
+        uploaded.seek(0)
+        Image.open(uploaded).verify()
+        return True
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        return False
+    finally:
+        uploaded.seek(0)
+
+
+def pending_images(instance, *field_names):
+    """Names of image fields holding a fresh upload not yet saved to storage
+
+    Call before Model.save(); the upload is committed by the save itself.
+    """
+    pending = []
+    for field_name in field_names:
+        fieldfile = getattr(instance, field_name)
+        if fieldfile and not fieldfile._committed:
+            pending.append(field_name)
+    return pending
+
+
+def make_placeholder(fieldfile, width=16):
+    """Return (width, height, data_uri) with a tiny blurred preview of an image
+
+    The data: URI is a few hundred bytes and can be inlined in the page as a
+    background while the real variant loads.
+    """
+    try:
+        with fieldfile.storage.open(fieldfile.name, 'rb') as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        logger.warning('Could not build a placeholder for %s', fieldfile.name, exc_info=True)
+        return None, None, ''
+
+    full_width, full_height = image.size
+    height = max(1, round(width * full_height / full_width))
+    tiny = image.convert('RGB').resize((width, height), Image.BILINEAR)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    tiny.save(buffer, 'JPEG', quality=40)
+    data_uri = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    return full_width, full_height, data_uri
+
+
+def strip_metadata(fieldfile):
+    """Rewrite an original upload without EXIF data (GPS, camera serials...)
+
+    Orientation is baked into the pixels first so the photo still displays
+    the right way up. Returns True if the file was rewritten.
+    """
+    if not fieldfile:
+        return False
+    storage = fieldfile.storage
+    try:
+        with storage.open(fieldfile.name, 'rb') as source:
+            image = Image.open(source)
+            fmt = image.format
+            if fmt not in STRIPPABLE_FORMATS or not image.getexif():
+                return False
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        logger.warning('Could not strip metadata from %s', fieldfile.name, exc_info=True)
+        return False
+
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, 'JPEG', quality=90, optimize=True)
+    else:
+        image.save(buffer, fmt)
+    _replace(storage, fieldfile.name, buffer.getvalue())
+    return True
+
+
+def process_images(instance, field_names):
+    """Queue metadata stripping and variant generation for fresh uploads
+
+    Runs after the instance has been saved; the work itself happens in a
+    background worker (see uploads.tasks).
+    """
+    if not field_names:
+        return
+    from jobs.queue import enqueue
+    enqueue(
+        'uploads.process_image_fields',
+        instance._meta.label,
+        str(instance.pk),
+        list(field_names),
+    )
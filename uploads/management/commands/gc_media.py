@@ -0,0 +1,153 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.utils import timezone
+
+from uploads.chunked import purge_stale_uploads, stale_uploads
+from uploads.models import Blob
+from uploads.storage import CAS_ROOT
+
+
+class Command(BaseCommand):
+    """Recount blob references and delete blobs nothing points at any more
+
+    Uploads of existing content bump a blob's ref_count while this runs, so
+    a blob is only deleted if its ref_count was already zero when the run
+    started and still is under a row lock, after a fresh recount of its
+    references. Its files are purged inside that same transaction. A blob
+    whose count drifted is set to zero by one run and deleted by the next.
+    """
+
+    help = 'Garbage-collect unreferenced media files and abandoned chunked uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep unreferenced blobs younger than this (uploads still being saved)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of blobs written per bulk UPDATE',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be deleted without touching anything',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        references = self.collect_references()
+
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        # Bring every ref_count back in line with the actual FileField values
+        drifted = []
+        candidates = []
+        for blob in Blob.objects.only('id', 'name', 'sha256', 'ref_count', 'created_at').iterator(chunk_size=2000):
+            actual = references.get(blob.name, 0)
+            if not actual and not blob.ref_count and blob.created_at < cutoff:
+                candidates.append(blob)
+            elif blob.ref_count != actual:
+                blob.ref_count = actual
+                drifted.append(blob)
+        if drifted and not dry_run:
+            Blob.objects.bulk_update(drifted, ['ref_count'], batch_size=options['batch_size'])
+
+        removed_blobs = removed_files = 0
+        for blob in candidates:
+            if dry_run:
+                removed_blobs += 1
+                removed_files += len(self.blob_files(blob))
+                continue
+            purged = self.delete_blob(blob)
+            if purged is not None:
+                removed_blobs += 1
+                removed_files += purged
+
+        removed_files += self.remove_stale_temp_files(cutoff, dry_run)
+        abandoned = stale_uploads().count() if dry_run else purge_stale_uploads()
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{len(drifted)} ref counts corrected, {removed_blobs} blobs '
+            f'and {removed_files} files removed, {abandoned} abandoned uploads discarded'
+        ))
+
+    def delete_blob(self, blob):
+        """Delete an unreferenced blob and its files; returns files purged, or None if kept"""
+        with transaction.atomic():
+            # The lock makes a concurrent upload of the same bytes wait until
+            # the row and the files are both gone (see ContentAddressedStorage)
+            if not Blob.objects.select_for_update().filter(pk=blob.pk, ref_count=0).exists():
+                return None
+            actual = self.count_references(blob.name)
+            if actual:
+                Blob.objects.filter(pk=blob.pk).update(ref_count=actual)
+                return None
+            deleted, _ = Blob.objects.filter(pk=blob.pk, ref_count=0).delete()
+            if deleted != 1:
+                return None
+            files = self.blob_files(blob)
+            for name in files:
+                default_storage.purge(name)
+        return len(files)
+
+    def collect_references(self):
+        """Count how many FileField values point at each addressed file"""
+        references = Counter()
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, models.FileField):
+                    continue
+                names = model._default_manager.filter(
+                    **{f'{field.attname}__startswith': f'{CAS_ROOT}/'}
+                ).values_list(field.attname, flat=True).order_by()
+                references.update(names.iterator(chunk_size=5000))
+        return references
+
+    def count_references(self, name):
+        """FileField values pointing at one addressed file right now"""
+        total = 0
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField):
+                    total += model._default_manager.filter(**{field.attname: name}).count()
+        return total
+
+    def blob_files(self, blob):
+        """The blob itself plus every file derived from it (image variants)"""
+        directory, filename = os.path.split(blob.name)
+        try:
+            _, files = default_storage.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return [f'{directory}/{name}' for name in files if name.startswith(blob.sha256)]
+
+    def remove_stale_temp_files(self, cutoff, dry_run):
+        """Spooled uploads and half-written files left behind by a crashed process
+
+        '.upload-' files sit in the CAS root, '.tmp-' files in the shard
+        directories next to the blob they were about to become.
+        """
+        root = default_storage.path(CAS_ROOT)
+        removed = 0
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if not name.startswith(('.upload-', '.tmp-')):
+                    continue
+                path = os.path.join(directory, name)
+                if os.path.getmtime(path) < cutoff.timestamp():
+                    if not dry_run:
+                        os.remove(path)
+                    removed += 1
+        return removed
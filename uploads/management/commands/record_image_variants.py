@@ -0,0 +1,48 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from uploads.images import IMAGE_VARIANTS, record_variants, recorded_variants, variant_name
+
+
+class Command(BaseCommand):
+    """Record variants written before models kept an image_variants field
+
+    Looks each candidate variant file up in storage once; afterwards URLs
+    are built from the recorded names alone.
+    """
+
+    help = 'Fill image_variants for images processed before variants were recorded'
+
+    def handle(self, *args, **options):
+        recorded = 0
+        for model in apps.get_models():
+            fields = [
+                field.name for field in model._meta.concrete_fields if isinstance(field, models.ImageField)
+            ]
+            if not fields or not any(field.name == 'image_variants' for field in model._meta.concrete_fields):
+                continue
+            for instance in model._default_manager.only('pk', 'image_variants', *fields).iterator(chunk_size=500):
+                variants = {
+                    field_name: self.existing_variants(getattr(instance, field_name))
+                    for field_name in fields
+                    if getattr(instance, field_name) and not recorded_variants(getattr(instance, field_name))
+                }
+                if any(variants.values()):
+                    record_variants(instance, variants)
+                    recorded += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Recorded variants for {recorded} row(s)'))
+
+    def existing_variants(self, fieldfile):
+        storage = fieldfile.storage
+        found = {}
+        for size in IMAGE_VARIANTS:
+            for extension, name in (
+                ('webp', variant_name(fieldfile.name, size, webp=True)),
+                ('jpg', variant_name(fieldfile.name, size)),
+                ('png', variant_name(fieldfile.name, size, has_alpha=True)),
+            ):
+                if storage.exists(name):
+                    found.setdefault(size, {})[extension] = name
+        return found
@@ -0,0 +1,58 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class Blob(models.Model):
+    """A content-addressed file shared by every upload with the same bytes
+
+    ref_count is maintained incrementally by ContentAddressedStorage and
+    recomputed from the actual FileField references by `manage.py gc_media`.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)  # Storage name, e.g. cas/ab/cd/abcd....jpg
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class UploadSession(models.Model):
+    """A resumable upload whose chunks are written straight into one part file"""
+    KINDS = [
+        ('post_video', 'Post video'),
+        ('post_document', 'Post document'),
+        ('story_video', 'Story video'),
+    ]
+
+    STATUS_CHOICES = [
+        ('open', 'Receiving chunks'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()  # Declared total size in bytes
+    offset = models.PositiveBigIntegerField(default=0)  # Bytes received so far
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
@@ -0,0 +1,191 @@
+"""
+Serving uploaded media with conditional and Range request support
+
+media_response() answers GET/HEAD for anything under MEDIA_ROOT with a strong
+ETag, Last-Modified and If-None-Match/If-Modified-Since handling. How the
+bytes are sent depends on MEDIA_SERVE_BACKEND:
+
+    'python'   FileResponse; a Range request gets a 206 for that slice.
+               Open-ended ranges (the usual video seek) hand the open file
+               to the WSGI server, which can use sendfile().
+    'nginx'    An X-Accel-Redirect to MEDIA_ACCEL_REDIRECT_PREFIX, an
+               internal nginx location aliased to MEDIA_ROOT.
+    'sendfile' An X-Sendfile header with the absolute path (Apache
+               mod_xsendfile, lighttpd).
+
+With an offload backend the web server also takes care of Range requests,
+so no file bytes pass through Python. Either way the access check in
+uploads.access runs first: a file only referenced by rows the requester
+cannot see (e.g. posts in a private group) answers 404, and one served
+because of such a row is marked Cache-Control: private.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .access import media_access
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Files that are never served: in-progress chunked uploads and temp files
+PRIVATE_PREFIXES = ('partial/',)
+
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+
+def _resolve(path):
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith(PRIVATE_PREFIXES) or any(part.startswith('.') for part in path.split('/')):
+        raise Http404('Not found')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except ValueError:
+        raise Http404('Not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+    return path, full_path
+
+
+def make_etag(stat):
+    # Any rewrite replaces the file (new inode and mtime), so this is strong
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, None to send
+    the whole file, or False if the range cannot be satisfied
+
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: only honour the range if the client's copy is current"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+class RangeFile:
+    """Read at most length bytes of a file starting at start
+
+    Deliberately has no fileno(), so WSGI servers iterate it instead of
+    sendfile()-ing the rest of the file.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def media_response(request, path):
+    """Build the response for a media file, raising Http404 if there is none
+
+    The file must also be visible to request.user (see uploads.access).
+    """
+    path, full_path = _resolve(path)
+    access = media_access(path, request.user)
+    if access is None:
+        raise Http404('Not found')
+    stat = os.stat(full_path)
+    etag = make_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    backend = getattr(settings, 'MEDIA_SERVE_BACKEND', 'python')
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if backend == 'nginx':
+            prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+        elif backend == 'sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = _file_response(request, full_path, stat, etag, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = f"{access}, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_MAX_AGE)}"
+    if encoding and response.status_code != 304:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def _file_response(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    response_range = None
+    range_header = request.headers.get('Range')
+    if range_header and _range_applies(request, etag, stat.st_mtime):
+        response_range = parse_range(range_header, size)
+
+    if response_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    elif response_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = response_range
+        file = open(full_path, 'rb')
+        if end == size - 1:
+            # To the end of the file: the server may sendfile() from here
+            file.seek(start)
+            response = FileResponse(file, content_type=content_type, status=206)
+        else:
+            response = FileResponse(RangeFile(file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,152 @@
+"""
+Content-addressed file storage with cross-upload deduplication
+
+Every upload is stored once under the SHA-256 of its bytes, sharded into
+two directory levels so no directory grows unbounded:
+
+    post_images/meme.jpg -> cas/3f/a2/3fa2...c9.jpg
+
+upload_to only contributes the file extension. Identical files uploaded by
+different users, to different fields, share one copy on disk and one Blob
+row whose ref_count tracks how many saves point at it.
+
+Files derived from a blob (image variants) are written verbatim under the
+blob's own name, e.g. cas/3f/a2/3fa2...c9.avatar.jpg, so duplicates share
+their variants too. Rewriting a blob in place (metadata stripping) keeps
+its original address; the address always identifies the bytes that were
+uploaded.
+
+Nothing is physically removed on delete(); `manage.py gc_media` recounts
+references and removes orphaned blobs with their derived files.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+CAS_ROOT = 'cas'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_name(digest, extension):
+    return f'{CAS_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_addressed(name):
+    """True for names stored verbatim: blobs and the files derived from them"""
+    return str(name).replace('\\', '/').startswith(f'{CAS_ROOT}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    # Derived files are replaced in place instead of being renamed
+    overwrite_in_place = True
+
+    def get_available_name(self, name, max_length=None):
+        if is_addressed(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if is_addressed(name):
+            return self._save_verbatim(name, content)
+
+        extension = os.path.splitext(name)[1].lower()[:10]
+        os.makedirs(self.path(CAS_ROOT), exist_ok=True)
+
+        if hasattr(content, 'temporary_file_path'):
+            # Large uploads are already on disk: hash in place, then move
+            source = content.temporary_file_path()
+            digest, size = self._hash_file(source)
+            owns_source = False
+        else:
+            source, digest, size = self._spool(content)
+            owns_source = True
+
+        name = blob_name(digest, extension)
+        full_path = self.path(name)
+        # Take the reference before looking for the file: gc_media deletes a
+        # blob's row and its files under one row lock, so either it sees this
+        # reference and keeps the file, or it is done and the file is rewritten
+        self._add_reference(digest, name, size)
+        if os.path.exists(full_path):
+            if owns_source:
+                os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if owns_source:
+                os.replace(source, full_path)
+            else:
+                file_move_safe(source, full_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def delete(self, name):
+        """Drop one reference; addressed files are only removed by gc_media
+
+        Derived files are shared between every upload of the same bytes, so
+        they are left in place as well.
+        """
+        if not is_addressed(name):
+            return super().delete(name)
+        from .models import Blob
+        Blob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+    def purge(self, name):
+        """Physically remove an addressed file (garbage collection only)"""
+        super().delete(name)
+
+    def _save_verbatim(self, name, content):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as temp:
+            for chunk in content.chunks():
+                temp.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+        os.replace(temp_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def _spool(self, content):
+        """Stream content into a temp file inside the store while hashing it"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.path(CAS_ROOT), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path, digest.hexdigest(), size
+
+    def _hash_file(self, path):
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _add_reference(self, digest, name, size):
+        from .models import Blob
+        while True:
+            Blob.objects.bulk_create(
+                [Blob(sha256=digest, name=name, size=size)], ignore_conflicts=True
+            )
+            # Zero rows means gc_media deleted the blob in between; recreate it
+            if Blob.objects.filter(sha256=digest).update(ref_count=F('ref_count') + 1):
+                return
@@ -0,0 +1,19 @@
+from django.apps import apps
+
+from jobs.queue import task
+
+from .images import generate_variants, record_variants, strip_metadata
+
+
+@task('uploads.process_image_fields')
+def process_image_fields(model_label, pk, field_names):
+    """Strip metadata from fresh image uploads, build their variants and record them"""
+    instance = apps.get_model(model_label)._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    variants = {}
+    for field_name in field_names:
+        fieldfile = getattr(instance, field_name)
+        strip_metadata(fieldfile)
+        variants[field_name] = generate_variants(fieldfile)
+    record_variants(instance, variants)
@@ -0,0 +1,23 @@
+from django import template
+
+from uploads.images import variant_url
+
+register = template.Library()
+
+
+@register.filter
+def image_variant(fieldfile, size='full'):
+    """{{ story.image|image_variant:'card' }}"""
+    return variant_url(fieldfile, size)
+
+
+@register.filter
+def image_variant_webp(fieldfile, size='full'):
+    """{{ story.image|image_variant_webp:'card' }} for <source type="image/webp">"""
+    return variant_url(fieldfile, size, webp=True)
+
+
+@register.filter
+def profile_picture(user, size='avatar'):
+    """{{ profile_user|profile_picture:'card' }}"""
+    return user.get_profile_picture(size)
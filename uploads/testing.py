@@ -0,0 +1,28 @@
+"""
+Test helpers shared by the apps that store uploads
+"""
+
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+
+def make_photo(name='photo.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'green').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class MediaTestCase(TestCase):
+    """Writes uploads to a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
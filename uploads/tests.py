@@ -0,0 +1,193 @@
+import io
+import os
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .management.commands.gc_media import Command as GcMedia
+from .chunked import UploadError, part_path, start_upload, write_chunk
+from .models import Blob, UploadSession
+from .storage import ContentAddressedStorage
+from .testing import MediaTestCase, make_photo
+
+
+class GcMediaTests(MediaTestCase):
+    def save_blob(self, content=b'lecture notes'):
+        name = default_storage.save('post_documents/notes.txt', ContentFile(content))
+        Blob.objects.filter(name=name).update(created_at=timezone.now() - timedelta(days=2))
+        return name
+
+    def gc(self):
+        call_command('gc_media', stdout=io.StringIO())
+
+    def test_unreferenced_blob_is_removed(self):
+        name = self.save_blob()
+        default_storage.delete(name)
+        self.gc()
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_drifted_blob_is_removed_on_the_next_run(self):
+        name = self.save_blob()  # ref_count 1, but no FileField points at it
+        self.gc()
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 0)
+        self.assertTrue(default_storage.exists(name))
+        self.gc()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_reupload_after_collection_restores_the_file(self):
+        name = self.save_blob()
+        default_storage.delete(name)
+        self.gc()
+        self.assertEqual(self.save_blob(), name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+
+    def test_blob_referenced_during_the_run_is_kept(self):
+        name = self.save_blob()
+        default_storage.delete(name)
+        candidate = Blob.objects.get(name=name)
+        # An identical upload lands between the scan and the delete
+        self.assertEqual(self.save_blob(), name)
+        self.assertIsNone(GcMedia().delete_blob(candidate))
+        self.assertTrue(default_storage.exists(name))
+
+
+    def test_stale_temp_files_and_sessions_are_removed(self):
+        name = self.save_blob()
+        shard = os.path.dirname(default_storage.path(name))
+        temp_path = os.path.join(shard, '.tmp-abandoned')
+        open(temp_path, 'wb').close()
+        old = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(temp_path, (old, old))
+
+        student = get_user_model().objects.create_user(
+            username='222000001', email='222000001@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000001', department='CSE', batch='Fall 2023',
+        )
+        session = start_upload(student, 'post_document', 'notes.txt', 100)
+        UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(days=2))
+
+        self.gc()
+        self.assertFalse(os.path.exists(temp_path))
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+        self.assertFalse(os.path.exists(part_path(session)))
+        self.assertTrue(default_storage.exists(name))
+
+
+class ChunkedUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = get_user_model().objects.create_user(
+            username='222000001', email='222000001@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000001', department='CSE', batch='Fall 2023',
+        )
+        self.client.force_login(self.student)
+
+    def test_resume_from_the_reported_offset(self):
+        content = b'%PDF-1.7 ' + b'lecture slides ' * 100
+        response = self.client.post(reverse('uploads:start_chunked_upload'), {
+            'kind': 'post_document', 'filename': 'slides.pdf', 'size': len(content),
+        })
+        self.assertEqual(response.status_code, 201)
+        url = response.json()['url']
+        session = UploadSession.objects.get()
+
+        # The connection drops 500 bytes into a 1000 byte chunk
+        write_chunk(session, 0, io.BytesIO(content[:500]), 1000)
+
+        offset = int(self.client.get(url)['Upload-Offset'])
+        self.assertEqual(offset, 500)
+        response = self.client.put(
+            url, content[offset:], content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+        self.assertEqual(response.json()['status'], 'complete')
+        with open(part_path(session), 'rb') as part:
+            self.assertEqual(part.read(), content)
+
+    def test_wrong_offset_reports_the_right_one(self):
+        session = start_upload(self.student, 'post_document', 'notes.txt', 40)
+        write_chunk(session, 0, io.BytesIO(b'x' * 20), 20)
+        url = reverse('uploads:upload_chunk', args=[session.pk])
+        response = self.client.put(url, b'y' * 20, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '20')
+
+    def test_legacy_quicktime_is_accepted(self):
+        for atom in (b'ftyp', b'moov', b'mdat', b'wide'):
+            session = start_upload(self.student, 'post_video', 'clip.mov', 32)
+            write_chunk(session, 0, io.BytesIO(b'\x00\x00\x00\x08' + atom + bytes(24)), 32)
+            self.assertEqual(session.status, 'complete')
+
+    def test_mismatched_content_is_rejected(self):
+        session = start_upload(self.student, 'post_video', 'clip.mov', 32)
+        with self.assertRaises(UploadError):
+            write_chunk(session, 0, io.BytesIO(b'<html>' + bytes(26)), 32)
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+
+
+class ServeMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save('post_documents/notes.txt', ContentFile(b'0123456789'))
+        self.url = default_storage.url(self.name)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response.getvalue(), b'2345')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=999-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response['Cache-Control'].startswith('public'))
+
+
+class VariantUrlTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = get_user_model().objects.create_user(
+            username='222000001', email='222000001@student.green.ac.bd', password='campus-pass-123',
+            student_id='222000001', department='CSE', batch='Fall 2023',
+        )
+
+    def upload_picture(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.profile_picture = make_photo()
+            self.student.save(update_fields=['profile_picture'])
+        self.student.refresh_from_db()
+
+    @override_settings(JOBS_EAGER=True)
+    def test_urls_come_from_the_recorded_variants(self):
+        self.upload_picture()
+        with mock.patch.object(ContentAddressedStorage, 'exists', side_effect=AssertionError('storage lookup')):
+            self.assertTrue(self.student.get_profile_picture('avatar').endswith('.avatar.jpg'))
+            self.assertTrue(self.student.get_profile_picture('card').endswith('.card.jpg'))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_original_is_served_until_processed(self):
+        self.upload_picture()
+        self.assertEqual(self.student.get_profile_picture('avatar'), self.student.profile_picture.url)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_variants_written_earlier_can_be_recorded(self):
+        self.upload_picture()
+        get_user_model().objects.filter(pk=self.student.pk).update(image_variants={})
+        call_command('record_image_variants', stdout=io.StringIO())
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.get_profile_picture('avatar').endswith('.avatar.jpg'))
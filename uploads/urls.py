@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'uploads'
+
+urlpatterns = [
+    path('', views.start_chunked_upload, name='start_chunked_upload'),
+    path('<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+]
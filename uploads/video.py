@@ -0,0 +1,46 @@
+"""
+Video metadata probing with ffprobe
+"""
+
+import json
+import logging
+import shutil
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+PROBE_TIMEOUT = 60
+
+
+def probe_video(path):
+    """Return {'duration', 'width', 'height', 'codec'} for a local video file
+
+    Returns an empty dict when ffprobe isn't installed; raises ValueError if
+    the file isn't a readable video.
+    """
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None:
+        logger.info('ffprobe not found, skipping probe of %s', path)
+        return {}
+
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True,
+        timeout=PROBE_TIMEOUT,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise ValueError(f'ffprobe could not read {path}: {result.stderr.decode(errors="replace")[:200]}')
+
+    data = json.loads(result.stdout or b'{}')
+    video = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), None)
+    if video is None:
+        raise ValueError(f'{path} has no video stream')
+
+    duration = data.get('format', {}).get('duration') or video.get('duration')
+    return {
+        'duration': round(float(duration), 2) if duration else None,
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'codec': video.get('codec_name', ''),
+    }
@@ -0,0 +1,90 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+
+from .chunked import MAX_CHUNK_SIZE, UploadError, discard_upload, start_upload, write_chunk
+from .models import UploadSession
+from .serving import media_response
+
+
+def _session_json(session, status=200):
+    response = JsonResponse({
+        'id': str(session.pk),
+        'url': reverse('uploads:upload_chunk', args=[session.pk]),
+        'offset': session.offset,
+        'size': session.size,
+        'status': session.status,
+        'chunk_size': MAX_CHUNK_SIZE,
+    }, status=status)
+    response['Upload-Offset'] = str(session.offset)
+    return response
+
+
+def _error_json(error):
+    data = {'error': str(error)}
+    if error.offset is not None:
+        data['offset'] = error.offset
+    response = JsonResponse(data, status=error.status)
+    if error.offset is not None:
+        response['Upload-Offset'] = str(error.offset)
+    return response
+
+
+@login_required
+@require_POST
+def start_chunked_upload(request):
+    """Open a resumable upload session (AJAX)"""
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'A file size is required.'}, status=400)
+
+    try:
+        session = start_upload(
+            request.user,
+            kind=request.POST.get('kind', ''),
+            filename=request.POST.get('filename', ''),
+            size=size,
+            content_type=request.POST.get('content_type', ''),
+        )
+    except UploadError as error:
+        return _error_json(error)
+    return _session_json(session, status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PUT', 'PATCH', 'DELETE'])
+def upload_chunk(request, upload_id):
+    """Report progress, append a chunk or cancel a resumable upload (AJAX)"""
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+
+    if request.method in ('GET', 'HEAD'):
+        return _session_json(session)
+
+    if request.method == 'DELETE':
+        discard_upload(session)
+        return JsonResponse({'deleted': True})
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required.'}, status=400)
+
+    try:
+        # Read the body straight off the socket; request.body would buffer it
+        write_chunk(session, offset, request, length)
+    except UploadError as error:
+        return _error_json(error)
+    return _session_json(session)
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file with Range and conditional request support
+
+    Files attached only to posts the requester cannot see answer 404.
+    """
+    return media_response(request, path)